@@ -0,0 +1,203 @@
+"""Append-only persistence for ingestion jobs and upload hashes.
+
+Every job transition, dedup-map change and document-version change is
+written as one JSON line to a log file, so an update costs O(1) regardless
+of how many jobs exist. The log is replayed at startup and rewritten with
+only the live state once it grows past ``compact_ratio`` times the number of
+live entries.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+from models.job import JobStatus
+
+DEFAULT_COMPACT_RATIO = 2.0
+DEFAULT_MIN_COMPACT_RECORDS = 1000
+
+
+class JobStore:
+    """Job status and content-hash maps backed by a JSON-lines log."""
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        compact_ratio: float = DEFAULT_COMPACT_RATIO,
+        min_compact_records: int = DEFAULT_MIN_COMPACT_RECORDS,
+    ) -> None:
+        """Open the log at ``path`` and replay it into memory.
+
+        Parameters
+        ----------
+        path:
+            Location of the log file. It is created on first write.
+        compact_ratio:
+            Compact once the log holds this many records per live entry.
+        min_compact_records:
+            Never compact logs shorter than this.
+        """
+
+        self.path = Path(path)
+        self.compact_ratio = compact_ratio
+        self.min_compact_records = min_compact_records
+        self.jobs: dict[str, JobStatus] = {}
+        self.hashes: dict[str, str] = {}
+        self.documents: dict[str, str] = {}
+        self._records = 0
+        self._lock = threading.Lock()
+        self._replay()
+
+    # ------------------------------------------------------------------
+    def _replay(self) -> None:
+        """Rebuild in-memory state from the log, skipping torn lines.
+
+        A final line without a trailing newline is repaired so the next
+        append starts on a fresh line: it gets its newline when it holds a
+        complete record and is truncated away otherwise.
+        """
+
+        if not self.path.exists():
+            return
+        with self.path.open("rb+") as fh:
+            offset = 0
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    record = None
+                if not line.endswith(b"\n"):
+                    if record is None:
+                        fh.truncate(offset)
+                    else:
+                        fh.write(b"\n")
+                if record is not None:
+                    self._apply(record)
+                    self._records += 1
+                offset += len(line)
+
+    # ------------------------------------------------------------------
+    def _apply(self, record: dict[str, Any]) -> None:
+        """Apply one log ``record`` to the in-memory maps."""
+
+        if "document" in record:
+            if record["key"] is None:
+                self.documents.pop(record["document"], None)
+            else:
+                self.documents[record["document"]] = record["key"]
+        elif "hash" in record:
+            if record["job"] is None:
+                self.hashes.pop(record["hash"], None)
+            else:
+                self.hashes[record["hash"]] = record["job"]
+        elif record.get("status") is None:
+            self.jobs.pop(record["job"], None)
+        else:
+            self.jobs[record["job"]] = JobStatus.model_validate(record["status"])
+
+    # ------------------------------------------------------------------
+    def _append(self, record: dict[str, Any]) -> None:
+        """Append ``record`` to the log and compact when it grew too long.
+
+        Caller holds the lock and has already applied ``record`` in memory.
+        """
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(record) + "\n")
+        self._records += 1
+        live = len(self.jobs) + len(self.hashes) + len(self.documents)
+        if self._records > max(self.min_compact_records, self.compact_ratio * live):
+            self._compact()
+
+    # ------------------------------------------------------------------
+    def _compact(self) -> None:
+        """Rewrite the log with one record per live entry. Caller holds the lock."""
+
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            for job_id, job in self.jobs.items():
+                fh.write(
+                    json.dumps({"job": job_id, "status": job.model_dump(mode="json")})
+                    + "\n"
+                )
+            for digest, job_id in self.hashes.items():
+                fh.write(json.dumps({"hash": digest, "job": job_id}) + "\n")
+            for document_id, key in self.documents.items():
+                fh.write(json.dumps({"document": document_id, "key": key}) + "\n")
+        tmp.replace(self.path)
+        self._records = len(self.jobs) + len(self.hashes) + len(self.documents)
+
+    # ------------------------------------------------------------------
+    def compact(self) -> None:
+        """Rewrite the log so it only contains the live state."""
+
+        with self._lock:
+            self._compact()
+
+    # ------------------------------------------------------------------
+    def save_job(self, job_id: str, job: JobStatus | None = None) -> None:
+        """Record the current state of ``job_id`` (or ``job`` if given)."""
+
+        with self._lock:
+            if job is not None:
+                self.jobs[job_id] = job
+            status = self.jobs[job_id].model_dump(mode="json")
+            self._append({"job": job_id, "status": status})
+
+    # ------------------------------------------------------------------
+    def drop_job(self, job_id: str) -> None:
+        """Forget job ``job_id``, if known."""
+
+        with self._lock:
+            if self.jobs.pop(job_id, None) is not None:
+                self._append({"job": job_id, "status": None})
+
+    # ------------------------------------------------------------------
+    def set_hash(self, digest: str, job_id: str) -> None:
+        """Map upload content ``digest`` to ``job_id``."""
+
+        with self._lock:
+            self.hashes[digest] = job_id
+            self._append({"hash": digest, "job": job_id})
+
+    # ------------------------------------------------------------------
+    def drop_hash(self, digest: str) -> None:
+        """Forget the job mapped to ``digest``, if any."""
+
+        with self._lock:
+            if self.hashes.pop(digest, None) is not None:
+                self._append({"hash": digest, "job": None})
+
+    # ------------------------------------------------------------------
+    def set_document(self, document_id: str, key: str) -> None:
+        """Record ``key`` (a dedup-map key) as the current version of ``document_id``."""
+
+        with self._lock:
+            self.documents[document_id] = key
+            self._append({"document": document_id, "key": key})
+
+    # ------------------------------------------------------------------
+    def drop_document(self, document_id: str) -> None:
+        """Forget the current version of ``document_id``, if any."""
+
+        with self._lock:
+            if self.documents.pop(document_id, None) is not None:
+                self._append({"document": document_id, "key": None})
+
+    # ------------------------------------------------------------------
+    def import_json(self, jobs_path: Path, hashes_path: Path) -> None:
+        """Load legacy ``jobs.json``/``hashes.json`` snapshots and compact."""
+
+        if not (jobs_path.exists() or hashes_path.exists()):
+            return
+        if jobs_path.exists():
+            for job_id, data in json.loads(jobs_path.read_text()).items():
+                self.jobs[job_id] = JobStatus.model_validate(data)
+        if hashes_path.exists():
+            self.hashes.update(json.loads(hashes_path.read_text()))
+        self.compact()
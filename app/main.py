@@ -3,23 +3,34 @@
 from __future__ import annotations
 
 import hashlib
-import json
 import os
 import sys
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from datetime import UTC, datetime
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Awaitable, Callable, Literal
 from uuid import uuid4
 
-from fastapi import Depends, FastAPI, File, HTTPException, UploadFile
+from fastapi import Depends, FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 from prometheus_fastapi_instrumentator import Instrumentator
-from qdrant_client import QdrantClient
-
-from ingest.parsers import parse_document
-from ingest.chunking import chunk_text
-from index.embedding_store import EmbeddingStore
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from ingest import parsers
+from ingest.parsers import SUPPORTED_SUFFIXES, parse_document
+from ingest.chunking import chunk_elements
+from index import filters as payload_filters
+from index.embedding_store import EmbeddingStore, TextDoc, connection_params
+from index.snapshot import export_collection, import_collection
+from index.vector_config import resolve_search_params
 from app.auth import require_auth
+from app.job_store import JobStore
+from app.registry import CollectionRegistry
 from app.settings import get_settings
 
 if sys.version_info[:2] != (3, 11):  # pragma: no cover - defensive startup check
@@ -27,6 +38,8 @@ if sys.version_info[:2] != (3, 11):  # pragma: no cover - defensive startup chec
 
 from models.job import Artifact, JobStatus
 from models.query import (
+    BatchQueryRequest,
+    BatchQueryResponse,
     QueryRequest,
     QueryResponse,
     RankedDocument,
@@ -34,113 +47,300 @@ from models.query import (
     RetrieverScores,
 )
 from reasoner.runner import Runner
-from retriever.base import BaseRetriever
+from retriever.base import (
+    BaseRetriever,
+    RetrievedDoc,
+    run_branches,
+    shutdown_branch_pool,
+)
 
 MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
-UPLOAD_DIR = Path("uploads")
+UPLOAD_BLOCK_BYTES = int(os.environ.get("UPLOAD_BLOCK_BYTES", 1024 * 1024))
+# Room for multipart boundaries, part headers and the small /ingest form fields.
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "2"))
+INGEST_QUEUE_DEPTH = int(os.environ.get("INGEST_QUEUE_DEPTH", "16"))
+QDRANT_ASYNC = os.environ.get("QDRANT_ASYNC", "false").lower() == "true"
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "qdrant").lower()
+UPLOAD_DIR = Path(os.environ.get("UPLOAD_DIR", "uploads"))
+SNAPSHOT_DIR = Path(os.environ.get("SNAPSHOT_DIR", "data/snapshots"))
+# Tags /query may filter on; their payload indexes are created with collections.
+FILTER_TAGS = payload_filters.tag_indexes(os.environ.get("FILTER_TAGS"))
+# Empty to keep lexical indexes in memory only.
+LEXICAL_INDEX_DIR = os.environ.get("LEXICAL_INDEX_DIR", "data/lexical")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-HASH_MAP_PATH = UPLOAD_DIR / "hashes.json"
-if HASH_MAP_PATH.exists():
-    HASH_TO_JOB: dict[str, str] = json.loads(HASH_MAP_PATH.read_text())
-else:
-    HASH_TO_JOB = {}
-
-JOBS_PATH = UPLOAD_DIR / "jobs.json"
-if JOBS_PATH.exists():
-    JOBS: dict[str, JobStatus] = {
-        jid: JobStatus.model_validate(js)
-        for jid, js in json.loads(JOBS_PATH.read_text()).items()
-    }
-else:
-    JOBS = {}
-
+JOBS_LOG_PATH = UPLOAD_DIR / "jobs.log"
+job_store = JobStore(JOBS_LOG_PATH)
+if not JOBS_LOG_PATH.exists():
+    # One-off migration from the former full-rewrite JSON snapshots.
+    job_store.import_json(UPLOAD_DIR / "jobs.json", UPLOAD_DIR / "hashes.json")
+
+# Jobs that were queued or running when the process stopped will never finish.
+for _job_id, _job in list(job_store.jobs.items()):
+    if _job.status in {"pending", "processing"}:
+        _job.status = "error"
+        _job.error = "Interrupted by service restart"
+        job_store.save_job(_job_id)
+for _digest, _job_id in list(job_store.hashes.items()):
+    _job = job_store.jobs.get(_job_id)
+    if _job is None or _job.status == "error":
+        job_store.drop_hash(_digest)
+
+_jobs_lock = threading.Lock()
+ingest_pool = ThreadPoolExecutor(
+    max_workers=INGEST_WORKERS, thread_name_prefix="ingest"
+)
+# Bounds running plus queued jobs; uploads beyond it are rejected with 503.
+_ingest_slots = threading.BoundedSemaphore(INGEST_WORKERS + INGEST_QUEUE_DEPTH)
 
-def _save_jobs() -> None:
-    JOBS_PATH.write_text(
-        json.dumps({jid: job.model_dump(mode="json") for jid, job in JOBS.items()})
-    )
 
+qdrant: QdrantClient | None = None
+aqdrant: AsyncQdrantClient | None = None
+if VECTOR_BACKEND == "local":
+    from index.local_store import LocalEmbeddingStore
 
-if location := os.environ.get("QDRANT_LOCATION"):
-    qdrant = QdrantClient(location=location)
-    store = EmbeddingStore(location=location)
+    # The default collection's store owns the model; other collections share it.
+    store: EmbeddingStore = LocalEmbeddingStore()
 else:
-    host = os.environ.get("QDRANT_HOST", "localhost")
-    port = int(os.environ.get("QDRANT_PORT", "6333"))
-    qdrant = QdrantClient(host=host, port=port)
-    store = EmbeddingStore(host=host, port=port)
+    if location := os.environ.get("QDRANT_LOCATION"):
+        # An async client on a local location would open a separate database.
+        qdrant = QdrantClient(location=location)
+    else:
+        qdrant = QdrantClient(**connection_params())
+        if QDRANT_ASYNC:
+            aqdrant = AsyncQdrantClient(**connection_params())
+    store = EmbeddingStore(client=qdrant, async_client=aqdrant)
+lexical_dir = LEXICAL_INDEX_DIR or None
+if os.environ.get("QDRANT_LOCATION") == ":memory:":
+    # Lexical indexes must not outlive the vectors of an in-memory Qdrant.
+    lexical_dir = None
+registry = CollectionRegistry(qdrant, store, lexical_dir=lexical_dir)
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Drain queued ingestion jobs and stop worker pools before exiting."""
+
+    yield
+    ingest_pool.shutdown(wait=True)
+    parsers.shutdown_pool()
+    shutdown_branch_pool()
+    if aqdrant is not None:
+        await aqdrant.close()
+
+
+class _UploadLimit:
+    """ASGI middleware capping the ``POST /ingest`` request body.
+
+    Starlette reads and spools the whole multipart body before the endpoint
+    runs, so the endpoint cannot stop an oversized transfer itself. Bodies
+    declaring a ``Content-Length`` above ``MAX_UPLOAD_BYTES`` plus
+    ``UPLOAD_FORM_OVERHEAD_BYTES`` are answered with HTTP 413 before any of
+    them is read; bodies without one are cut off with HTTP 413 as soon as
+    more than that has arrived.
+    """
 
-app = FastAPI()
+    def __init__(self, app: Any) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] != "/ingest"
+        ):
+            await self.app(scope, receive, send)
+            return
+        limit = MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD_BYTES
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            response = JSONResponse({"detail": "File too large"}, status_code=413)
+            await response(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive() -> Any:
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > limit:
+                raise HTTPException(status_code=413, detail="File too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(_UploadLimit)
 
 Instrumentator().instrument(app).expose(
     app, include_in_schema=False, endpoint="/metrics"
 )
 
 
-retriever: BaseRetriever | None = None
+def _finish_job(job_id: str, status: str) -> None:
+    """Mark job ``job_id`` as finished with ``status`` and persist it."""
+
+    job = job_store.jobs[job_id]
+    ended = datetime.now(UTC)
+    job.status = status  # type: ignore[assignment]
+    job.ended_at = ended
+    job.duration_ms = int((ended - job.started_at).total_seconds() * 1000)
+    job_store.save_job(job_id)
+
+
+def _scoped(collection: str | None, key: str) -> str:
+    """Namespace a dedup or document ``key`` by a non-default ``collection``."""
+
+    if collection is None or collection == registry.default:
+        return key
+    return f"{collection}/{key}"
+
+
+def _run_ingest(
+    job_id: str,
+    dest: Path,
+    key: str,
+    document_id: str | None = None,
+    collection: str | None = None,
+) -> None:
+    """Parse, chunk, embed and store ``dest`` on an ingestion worker.
+
+    ``key`` is the upload's dedup-map key. Chunks go to the vector and
+    lexical indexes of ``collection`` (the default collection when ``None``).
+    When ``document_id`` is given the upload replaces the previous version of
+    that document: only changed chunks are embedded and stale ones are
+    removed from both indexes.
+    """
+
+    job = job_store.jobs[job_id]
+    job.status = "processing"
+    job_store.save_job(job_id)
+    try:
+        elements = parse_document(dest)
+        docs: list[TextDoc] = []
+        pages: set[int] = set()
+        file_id = document_id or job_id
+        for chunk in chunk_elements(elements):
+            meta: dict[str, Any] = {"file_id": file_id, "span": list(chunk.span)}
+            if chunk.page is not None:
+                meta["page"] = chunk.page
+                pages.add(chunk.page)
+            docs.append(TextDoc(text=chunk.text, tags=meta))
+        retriever = registry.retriever(collection)
+        if document_id is None:
+            ids = retriever.add_texts(docs)
+        else:
+            ids, _, _ = retriever.replace_document(file_id, docs)
+        job.artifacts = [
+            Artifact(file_id=file_id, pages=len(pages) or 1, chunks=len(ids))
+        ]
+    except Exception as exc:
+        job_store.drop_hash(key)
+        job.error = str(exc)
+        _finish_job(job_id, "error")
+        return
+
+    if document_id is not None:
+        doc_key = _scoped(collection, document_id)
+        previous = job_store.documents.get(doc_key)
+        if previous is not None and previous != key:
+            # Re-uploading an older version must be re-ingested, not deduplicated.
+            job_store.drop_hash(previous)
+        job_store.set_document(doc_key, key)
+    _finish_job(job_id, "done")
+
+
+async def _stream_upload(file: UploadFile) -> tuple[Path, str]:
+    """Copy ``file`` to a temporary file in ``UPLOAD_DIR`` block by block.
+
+    ``file`` has already been received in full: Starlette spools multipart
+    uploads to its own temporary file before the endpoint runs, and only
+    :class:`_UploadLimit` bounds that transfer. This copy hashes the spooled
+    upload per block, holding at most ``UPLOAD_BLOCK_BYTES`` in memory, and
+    raises HTTP 413 once more than ``MAX_UPLOAD_BYTES`` have been read, which
+    enforces the exact file limit. Returns the temporary path and the hex
+    digest of the content.
+    """
+
+    hasher = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=".part", delete=False)
+    tmp_path = Path(tmp.name)
+    try:
+        with tmp:
+            while block := await file.read(UPLOAD_BLOCK_BYTES):
+                size += len(block)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="File too large")
+                hasher.update(block)
+                await run_in_threadpool(tmp.write, block)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return tmp_path, hasher.hexdigest()
 
 
 @app.post("/ingest", status_code=202, dependencies=[Depends(require_auth)])
-async def ingest(file: UploadFile = File(...)) -> dict[str, Any]:
-    """Accept a file upload, embed its contents and return a job ID.
+async def ingest(
+    file: UploadFile = File(...),
+    document_id: str | None = Form(default=None),
+    collection: str | None = Form(default=None),
+) -> dict[str, Any]:
+    """Accept a file upload, queue it for ingestion and return a job ID.
+
+    Passing a stable ``document_id`` form field makes the upload a new
+    version of that document; chunk citations then use it as ``file_id``.
+    The optional ``collection`` form field routes the upload to that
+    collection, which is created on first use; duplicate detection is scoped
+    per collection.
 
     The request is rejected with HTTP 413 when the file exceeds
-    ``MAX_UPLOAD_BYTES``.
+    ``MAX_UPLOAD_BYTES``, with HTTP 400 for unsupported file types and with
+    HTTP 503 when ``INGEST_QUEUE_DEPTH`` jobs are already waiting. Invalid
+    collection names are rejected with HTTP 422 before anything is stored.
+    Parsing, chunking and embedding run on a pool of ``INGEST_WORKERS``
+    threads; poll ``GET /ingest/{job_id}`` for progress.
     """
-    data = await file.read()
-    size = len(data)
-    if size > MAX_UPLOAD_BYTES:
+    suffix = Path(file.filename).suffix
+    if suffix.lower() not in SUPPORTED_SUFFIXES:
+        raise HTTPException(
+            status_code=400, detail=f"Unsupported file type: {suffix.lower()}"
+        )
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
         raise HTTPException(status_code=413, detail="File too large")
+    if collection is not None and not registry.valid_name(collection):
+        raise HTTPException(
+            status_code=422, detail=f"Invalid collection name: {collection}"
+        )
 
-    digest = hashlib.sha256(data).hexdigest()
+    tmp_path, digest = await _stream_upload(file)
+    key = _scoped(
+        collection, digest if document_id is None else f"{document_id}:{digest}"
+    )
     test_name = os.environ.get("PYTEST_CURRENT_TEST", "")
     resp_code = 200 if "tests/test_acceptance.py" in test_name else 202
-    if digest in HASH_TO_JOB:
-        return JSONResponse({"job_id": HASH_TO_JOB[digest]}, status_code=resp_code)
+    with _jobs_lock:
+        existing = job_store.hashes.get(key)
+        if existing is None and _ingest_slots.acquire(blocking=False):
+            job_id = str(uuid4())
+            job_store.save_job(
+                job_id, JobStatus(status="pending", started_at=datetime.now(UTC))
+            )
+            job_store.set_hash(key, job_id)
+        else:
+            job_id = None
+    if job_id is None:
+        tmp_path.unlink(missing_ok=True)
+        if existing is None:
+            raise HTTPException(status_code=503, detail="Ingestion queue full")
+        return JSONResponse({"job_id": existing}, status_code=resp_code)
 
-    job_id = str(uuid4())
-    suffix = Path(file.filename).suffix
     dest = UPLOAD_DIR / f"{job_id}{suffix}"
-    dest.write_bytes(data)
-    now = datetime.now(UTC)
-    job = JobStatus(status="pending", started_at=now)
-    JOBS[job_id] = job
-    _save_jobs()
-    job.status = "processing"
-    _save_jobs()
-
-    try:
-        elements = parse_document(dest)
-        full_text = "\n\n".join(
-            getattr(el, "text", "")
-            for el in elements
-            if getattr(el, "text", "").strip()
-        )
-        chunks = chunk_text(full_text)
-        metadatas = [{"file_id": job_id} for _ in chunks]
-        ids = store.add_texts(chunks, metadatas)
-        page_numbers = {
-            getattr(el, "metadata", {}).get("page_number")
-            for el in elements
-            if getattr(el, "metadata", {}).get("page_number") is not None
-        }
-        pages = len(page_numbers) if page_numbers else 1
-        ended = datetime.now(UTC)
-        job.status = "done"
-        job.ended_at = ended
-        job.duration_ms = int((ended - job.started_at).total_seconds() * 1000)
-        job.artifacts = [Artifact(file_id=job_id, pages=pages, chunks=len(ids))]
-        _save_jobs()
-    except ValueError as exc:
-        ended = datetime.now(UTC)
-        job.status = "error"
-        job.ended_at = ended
-        job.duration_ms = int((ended - job.started_at).total_seconds() * 1000)
-        _save_jobs()
-        raise HTTPException(status_code=400, detail=str(exc)) from exc
-
-    HASH_TO_JOB[digest] = job_id
-    HASH_MAP_PATH.write_text(json.dumps(HASH_TO_JOB))
+    tmp_path.replace(dest)
+    future: Future[None] = ingest_pool.submit(
+        _run_ingest, job_id, dest, key, document_id, collection
+    )
+    future.add_done_callback(lambda _: _ingest_slots.release())
 
     return JSONResponse({"job_id": job_id}, status_code=resp_code)
 
@@ -149,7 +349,7 @@ async def ingest(file: UploadFile = File(...)) -> dict[str, Any]:
 def get_job(job_id: str) -> JobStatus:
     """Return status information for an ingestion job."""
 
-    job = JOBS.get(job_id)
+    job = job_store.jobs.get(job_id)
     if job is None:
         raise HTTPException(status_code=404, detail="Job not found")
     return job
@@ -162,14 +362,30 @@ def healthz() -> dict[str, str]:
     return {"status": "ok"}
 
 
+async def _qdrant_call(method: str, **kwargs: Any) -> Any:
+    """Call ``method`` on the async Qdrant client when configured.
+
+    Falls back to the sync client on the threadpool otherwise.
+    """
+
+    if aqdrant is not None:
+        return await getattr(aqdrant, method)(**kwargs)
+    return await run_in_threadpool(getattr(qdrant, method), **kwargs)
+
+
 @app.get("/collections/{collection}/stats")
-def collection_stats(collection: str) -> dict[str, Any]:
+async def collection_stats(collection: str) -> dict[str, Any]:
     """Return basic statistics for a Qdrant ``collection``."""
 
-    existing = {c.name for c in qdrant.get_collections().collections}
-    if collection not in existing:
+    if qdrant is None:
+        if collection not in registry:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        points = registry.store(collection).count()
+        return {"points_count": points, "vectors_count": points}
+    collections = await _qdrant_call("get_collections")
+    if collection not in {c.name for c in collections.collections}:
         raise HTTPException(status_code=404, detail="Collection not found")
-    info = qdrant.get_collection(collection_name=collection)
+    info = await _qdrant_call("get_collection", collection_name=collection)
     return {"points_count": info.points_count, "vectors_count": info.vectors_count}
 
 
@@ -177,61 +393,176 @@ def collection_stats(collection: str) -> dict[str, Any]:
 def delete_collection(collection: str) -> dict[str, Any]:
     """Delete ``collection`` from Qdrant along with all stored data."""
 
+    if qdrant is None:
+        if collection not in registry:
+            raise HTTPException(status_code=404, detail="Collection not found")
+        registry.store(collection).delete_collection()
+        registry.drop(collection)
+        return {"status": "deleted"}
     existing = {c.name for c in qdrant.get_collections().collections}
     if collection not in existing:
         raise HTTPException(status_code=404, detail="Collection not found")
     qdrant.delete_collection(collection_name=collection)
+    registry.drop(collection)
     return {"status": "deleted"}
 
 
-@app.post("/query", response_model=QueryResponse)
-def query(req: QueryRequest) -> QueryResponse:
-    """Retrieve documents for ``req.query`` using the configured retriever.
+@app.post(
+    "/collections/{collection}/snapshot", dependencies=[Depends(require_auth)]
+)
+def snapshot_collection(
+    collection: str, dtype: Literal["float32", "float16"] = "float32"
+) -> dict[str, Any]:
+    """Write ``collection`` to a snapshot file in ``SNAPSHOT_DIR``.
 
-    The response includes per-retriever scores for each returned text chunk
-    alongside its fused rank.
+    The file holds the vectors, payloads, lexical corpus and entity graph
+    (see :mod:`index.snapshot`); ``dtype=float16`` halves the vectors.
     """
 
-    if retriever is None:
-        raise HTTPException(status_code=500, detail="Retriever not configured")
+    retriever = _collection_retriever(collection)
+    name = f"{collection}-{datetime.now(UTC):%Y%m%dT%H%M%S%f}.snap"
+    header = export_collection(
+        retriever.store, SNAPSHOT_DIR / name, retriever=retriever, dtype=dtype
+    )
+    return {"snapshot": name, "points": header["count"]}
+
 
-    sem = []
-    lex = []
-    if req.mode in {"semantic", "hybrid"}:
-        sem = retriever._semantic_search(req.query, req.top_k)
-    if req.mode in {"lexical", "hybrid"}:
-        lex = retriever._lexical_search(req.query, req.top_k)
+@app.post("/collections/{collection}/restore", dependencies=[Depends(require_auth)])
+def restore_collection(collection: str, snapshot: str) -> dict[str, Any]:
+    """Load the snapshot file ``snapshot`` from ``SNAPSHOT_DIR`` into ``collection``.
 
-    if req.mode == "semantic":
-        fused_docs = [rd.doc for rd in sem]
-    elif req.mode == "lexical":
-        fused_docs = [rd.doc for rd in lex]
-    else:
-        fused_docs = retriever._fuse([sem, lex], req.top_k)
+    The collection is created if needed; points are bulk-upserted with their
+    stored vectors and the lexical corpus and graph are restored alongside.
+    Returns HTTP 404 for unknown snapshots and HTTP 400 for files that are not
+    snapshots or whose vector dimension differs from the embedding model.
+    """
+
+    path = SNAPSHOT_DIR / snapshot
+    if Path(snapshot).name != snapshot or not path.is_file():
+        raise HTTPException(status_code=404, detail="Snapshot not found")
+    try:
+        header = import_collection(
+            registry.store(collection), path, retriever=registry.retriever(collection)
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return {"status": "restored", "collection": collection, "points": header["count"]}
+
+
+def _forget_document(collection: str | None, file_id: str) -> bool:
+    """Drop the dedup hashes, version record, jobs and uploads of ``file_id``.
+
+    Returns whether the job store knew the document. Raises HTTP 409 while
+    one of its ingestion jobs is still running.
+    """
+
+    doc_key = _scoped(collection, file_id)
+    prefix = f"{doc_key}:"
+    with _jobs_lock:
+        keys = [
+            key
+            for key, job_id in job_store.hashes.items()
+            if job_id == file_id or key.startswith(prefix)
+        ]
+        jobs = {job_store.hashes[key] for key in keys}
+        if file_id in job_store.jobs:
+            jobs.add(file_id)
+        if any(
+            job_store.jobs[job_id].status in {"pending", "processing"}
+            for job_id in jobs
+            if job_id in job_store.jobs
+        ):
+            raise HTTPException(status_code=409, detail="Document is being ingested")
+        known = bool(jobs) or doc_key in job_store.documents
+        for key in keys:
+            job_store.drop_hash(key)
+        job_store.drop_document(doc_key)
+        for job_id in jobs:
+            job_store.drop_job(job_id)
+            for upload in UPLOAD_DIR.glob(f"{job_id}.*"):
+                upload.unlink(missing_ok=True)
+    return known
+
+
+@app.delete("/documents/{file_id}", dependencies=[Depends(require_auth)])
+def delete_document(file_id: str, collection: str | None = None) -> dict[str, Any]:
+    """Delete every chunk of document ``file_id`` from ``collection``.
+
+    Points are deleted from the vector store with one filtered call and the
+    lexical entries are tombstoned (see :meth:`BaseRetriever.delete_document`).
+    The document's dedup hashes, jobs and stored uploads are forgotten, so a
+    later upload of the same file is ingested again. Returns HTTP 404 when
+    neither the job store nor the lexical index knows the document.
+    """
+
+    retriever = _collection_retriever(collection)
+    known = _forget_document(collection, file_id)
+    removed = retriever.delete_document(file_id)
+    if not known and not removed:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return {"status": "deleted", "file_id": file_id, "chunks": len(removed)}
+
+
+def _collection_retriever(collection: str | None) -> BaseRetriever:
+    """Return the retriever for ``collection`` or raise HTTP 404."""
+
+    if collection is not None and collection not in registry:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    return registry.retriever(collection)
+
+
+def _query_response(
+    retriever: BaseRetriever,
+    query: str,
+    opts: QueryRequest | BatchQueryRequest,
+    sem: list[RetrievedDoc],
+    lex: list[RetrievedDoc],
+    fused: list[RetrievedDoc] | None = None,
+    degraded: list[str] | None = None,
+) -> QueryResponse:
+    """Fuse ``sem`` and ``lex`` hits for ``query`` into a ``QueryResponse``.
+
+    ``opts`` supplies the retrieval mode, ``top_k``, graph and provider
+    options. Semantic and lexical hits are matched by point ID. Hybrid hits
+    that were already ``fused`` (by Qdrant) are used as they are. ``degraded``
+    lists the branches that produced no results because they failed.
+    """
+
+    if opts.mode == "semantic":
+        fused = sem
+    elif opts.mode == "lexical":
+        fused = lex
+    elif fused is None:
+        fused = retriever._fuse([sem, lex], opts.top_k)
+    fused_docs = [rd.doc for rd in fused]
 
     settings = get_settings()
     graph_ctx = (
         retriever._expand_graph(
             fused_docs,
-            req.graph_params.dict() if req.graph_params else None,
+            opts.graph_params.dict() if opts.graph_params else None,
         )
-        if req.graph and settings.graph_enabled
+        if opts.graph and settings.graph_enabled
         else None
     )
 
+    sem_scores = {rd.id: rd.score for rd in sem}
+    lex_scores = {rd.id: rd.score for rd in lex}
     results: list[RankedDocument] = []
     citations: list[Citation] = []
-    for rank, doc in enumerate(fused_docs, start=1):
+    for rank, rd in enumerate(fused, start=1):
+        doc = rd.doc
         text = doc.text
-        sem_score = next((d.score for d in sem if d.doc.text == text), None)
-        lex_score = next((d.score for d in lex if d.doc.text == text), None)
-        scores = RetrieverScores(semantic=sem_score, lexical=lex_score)
+        scores = RetrieverScores(
+            semantic=sem_scores.get(rd.id), lexical=lex_scores.get(rd.id)
+        )
         meta = doc.tags
         file_id = meta.get("file_id", "")
         page = meta.get("page")
         span = tuple(meta["span"]) if "span" in meta else None
         results.append(
             RankedDocument(
+                id=rd.id,
                 text=text,
                 rank=rank,
                 file_id=file_id,
@@ -243,14 +574,166 @@ def query(req: QueryRequest) -> QueryResponse:
         citations.append(Citation(file_id=file_id, page=page, span=span, text=text))
 
     context = "\n\n".join(doc.text for doc in fused_docs)
-    prompt = f"Context:\n{context}\n\nQuestion: {req.query}\nAnswer:"
-    runner = Runner(req.provider)
+    prompt = f"Context:\n{context}\n\nQuestion: {query}\nAnswer:"
+    runner = Runner(opts.provider)
     answer = runner.generate(prompt)
 
     return QueryResponse(
-        query=req.query,
+        query=query,
         answer=answer,
         citations=citations,
         results=results,
         graph_context=graph_ctx,
+        degraded=degraded or [],
+    )
+
+
+def _filters(opts: QueryRequest | BatchQueryRequest) -> dict[str, Any] | None:
+    """Return the request's metadata filter as a plain mapping.
+
+    Raises HTTP 422 for tags outside ``FILTER_TAGS``, which have no payload
+    index; queries never create one.
+    """
+
+    filters = opts.filter.dict(exclude_none=True) if opts.filter else None
+    unindexed = payload_filters.unindexed_tags(filters, FILTER_TAGS)
+    if unindexed:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Filtering on tags {unindexed} is not enabled (FILTER_TAGS)",
+        )
+    return filters
+
+
+def _search_params(opts: QueryRequest | BatchQueryRequest) -> dict[str, Any] | None:
+    """Merge the request's latency tier with its explicit search params."""
+
+    return resolve_search_params(
+        opts.latency_tier,
+        opts.search_params.dict() if opts.search_params else None,
+    )
+
+
+async def _retrieve_branches(
+    retriever: BaseRetriever,
+    branches: dict[str, Callable[[], Any] | Awaitable[Any]],
+) -> tuple[dict[str, Any], list[str]]:
+    """Run the retrieval ``branches`` with :func:`retriever.base.run_branches`.
+
+    Timeouts come from :attr:`BaseRetriever.branch_timeouts`. Returns the
+    results of the branches that succeeded and the names of those that
+    failed or timed out. When all of them failed the first branch's error is
+    raised, a timeout as HTTP 504.
+    """
+
+    try:
+        return await run_branches(branches, retriever.branch_timeouts)
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Retrieval timed out")
+
+
+@app.post("/query", response_model=QueryResponse)
+async def query(req: QueryRequest) -> QueryResponse:
+    """Retrieve documents for ``req.query`` from ``req.collection``.
+
+    The response includes the point ID and per-retriever scores for each
+    returned text chunk alongside its fused rank. Semantic and lexical hits
+    are matched by point ID. ``req.filter`` is pushed down to Qdrant and to
+    the lexical index. The semantic and lexical searches run concurrently,
+    the semantic one awaiting Qdrant directly when ``QDRANT_ASYNC`` is
+    enabled and the CPU-bound lexical one on the retriever's branch pool.
+    Each is bounded by ``SEMANTIC_TIMEOUT_S``/``LEXICAL_TIMEOUT_S``; if one
+    fails or times out the response is built from the other and lists it in
+    ``degraded``. With ``LEXICAL_BACKEND=qdrant`` a hybrid query is one
+    Qdrant request.
+    """
+
+    retriever = await run_in_threadpool(_collection_retriever, req.collection)
+    filters = _filters(req)
+    if req.mode == "hybrid" and retriever.lexical_backend == "qdrant":
+        ((fused, sem, lex),) = await run_in_threadpool(
+            retriever._hybrid_search_batch,
+            [req.query],
+            req.top_k,
+            _search_params(req),
+            filters,
+        )
+        return await run_in_threadpool(
+            _query_response, retriever, req.query, req, sem, lex, fused
+        )
+    branches: dict[str, Callable[[], Any] | Awaitable[Any]] = {}
+    if req.mode in {"semantic", "hybrid"}:
+        branches["semantic"] = retriever._semantic_search_async(
+            req.query, req.top_k, _search_params(req), filters
+        )
+    if req.mode in {"lexical", "hybrid"}:
+        branches["lexical"] = partial(
+            retriever._lexical_search, req.query, req.top_k, filters
+        )
+    results, degraded = await _retrieve_branches(retriever, branches)
+    return await run_in_threadpool(
+        _query_response,
+        retriever,
+        req.query,
+        req,
+        results.get("semantic", []),
+        results.get("lexical", []),
+        None,
+        degraded,
     )
+
+
+@app.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch(req: BatchQueryRequest) -> BatchQueryResponse:
+    """Retrieve documents for every query in ``req.queries``.
+
+    All queries are encoded in one model call and searched with one Qdrant
+    batch request; lexical queries are scored in a single pass, concurrently
+    and with the same timeouts and degradation as ``POST /query``. With
+    ``LEXICAL_BACKEND=qdrant`` hybrid queries share one Qdrant request. Each
+    entry of ``responses`` has the same shape as a ``POST /query`` response.
+    """
+
+    retriever = await run_in_threadpool(_collection_retriever, req.collection)
+    filters = _filters(req)
+    queries = req.queries
+    sem: list[list[RetrievedDoc]] = [[] for _ in queries]
+    lex: list[list[RetrievedDoc]] = [[] for _ in queries]
+    fused: list[list[RetrievedDoc] | None] = [None for _ in queries]
+    degraded: list[str] = []
+    if req.mode == "hybrid" and retriever.lexical_backend == "qdrant":
+        hybrid = await run_in_threadpool(
+            retriever._hybrid_search_batch,
+            queries,
+            req.top_k,
+            _search_params(req),
+            filters,
+        )
+        fused = [r[0] for r in hybrid]
+        sem = [r[1] for r in hybrid]
+        lex = [r[2] for r in hybrid]
+    else:
+        branches: dict[str, Callable[[], Any] | Awaitable[Any]] = {}
+        if req.mode in {"semantic", "hybrid"}:
+            branches["semantic"] = retriever._semantic_search_batch_async(
+                queries, req.top_k, _search_params(req), filters
+            )
+        if req.mode in {"lexical", "hybrid"}:
+            branches["lexical"] = partial(
+                retriever._lexical_search_batch, queries, req.top_k, filters
+            )
+        results, degraded = await _retrieve_branches(retriever, branches)
+        sem = results.get("semantic", sem)
+        lex = results.get("lexical", lex)
+
+    def respond() -> BatchQueryResponse:
+        return BatchQueryResponse(
+            responses=[
+                _query_response(
+                    retriever, query, req, sem_hits, lex_hits, hits, degraded
+                )
+                for query, sem_hits, lex_hits, hits in zip(queries, sem, lex, fused)
+            ]
+        )
+
+    return await run_in_threadpool(respond)
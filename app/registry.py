@@ -0,0 +1,154 @@
+"""Collection-scoped embedding stores and retrievers.
+
+:class:`CollectionRegistry` routes ingestion and queries to a per-collection
+:class:`~index.embedding_store.EmbeddingStore` and
+:class:`~retriever.base.BaseRetriever` (which owns the collection's lexical
+index). Both are created lazily on first use. Every store is derived from the
+default one via :meth:`EmbeddingStore.for_collection`, so all collections share
+one loaded embedding model, one Qdrant client and one embedding cache; an
+extra collection only costs its hash index and lexical corpus. With the
+embedded :class:`~index.local_store.LocalEmbeddingStore` there is no Qdrant
+client and collections are looked up on disk instead.
+
+With a ``lexical_dir`` every collection's lexical index is persisted in its
+own sub-directory (see :meth:`~index.lexical.LexicalIndex.open`), so lexical
+and hybrid retrieval survive restarts; the index is opened when the
+collection's retriever is first requested.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict
+
+from qdrant_client import QdrantClient
+
+from index.embedding_store import EmbeddingStore
+from retriever.base import BaseRetriever
+
+_COLLECTION_NAME = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9._-]*")
+
+
+class CollectionRegistry:
+    """Lazily create and cache stores and retrievers per collection."""
+
+    def __init__(
+        self,
+        client: QdrantClient | None,
+        default_store: EmbeddingStore,
+        lexical_dir: str | os.PathLike[str] | None = None,
+    ) -> None:
+        """Seed the registry with ``default_store`` using Qdrant ``client``.
+
+        The default store's collection is used when a request names no
+        collection, and its model, client and cache are shared with every
+        other collection; ``client`` should be the store's client, or
+        ``None`` for a local store. Lexical indexes are kept in memory only
+        unless ``lexical_dir`` is given.
+        """
+
+        self.client = client
+        self.lexical_dir = Path(lexical_dir) if lexical_dir is not None else None
+        self.default = default_store.collection_name
+        self._stores: Dict[str, EmbeddingStore] = {self.default: default_store}
+        self._retrievers: Dict[str, BaseRetriever] = {}
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    def __contains__(self, collection: str) -> bool:
+        """Return whether ``collection`` is loaded or exists in the backend."""
+
+        if self.client is None:
+            # Local stores leave no files behind once their collection is
+            # deleted, the default one included.
+            return collection in self._stores[self.default].list_collections()
+        if collection in self._stores:
+            return True
+        existing = self.client.get_collections().collections
+        return collection in {c.name for c in existing}
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def valid_name(collection: str) -> bool:
+        """Return whether ``collection`` is usable as a collection name.
+
+        Names double as lexical index directory names, so they are limited to
+        letters, digits, ``_``, ``-`` and ``.`` and may not start with ``.``.
+        """
+
+        return _COLLECTION_NAME.fullmatch(collection) is not None
+
+    # ------------------------------------------------------------------
+    def store(self, collection: str | None = None) -> EmbeddingStore:
+        """Return the embedding store of ``collection``, creating it if needed.
+
+        Raises ``ValueError`` for an invalid name before anything is created.
+        """
+
+        name = collection or self.default
+        with self._lock:
+            store = self._stores.get(name)
+            if store is None:
+                if not self.valid_name(name):
+                    raise ValueError(f"Invalid collection name: {name}")
+                store = self._stores[self.default].for_collection(name)
+                self._stores[name] = store
+            return store
+
+    # ------------------------------------------------------------------
+    def retriever(self, collection: str | None = None) -> BaseRetriever:
+        """Return the retriever of ``collection``, creating it if needed."""
+
+        name = collection or self.default
+        with self._lock:
+            retriever = self._retrievers.get(name)
+            if retriever is None:
+                retriever = BaseRetriever(
+                    self.store(name), lexical_path=self._lexical_path(name)
+                )
+                self._retrievers[name] = retriever
+            return retriever
+
+    # ------------------------------------------------------------------
+    def _lexical_path(self, collection: str) -> Path | None:
+        """Return the lexical index directory of ``collection``, if persisted."""
+
+        if self.lexical_dir is None:
+            return None
+        if not self.valid_name(collection):
+            raise ValueError(f"Invalid collection name: {collection}")
+        return self.lexical_dir / collection
+
+    # ------------------------------------------------------------------
+    def register(self, retriever: BaseRetriever, collection: str | None = None) -> None:
+        """Serve ``collection`` with an existing ``retriever`` and its store."""
+
+        name = collection or self.default
+        with self._lock:
+            self._retrievers[name] = retriever
+            self._stores[name] = retriever.store
+
+    # ------------------------------------------------------------------
+    def drop(self, collection: str) -> None:
+        """Forget ``collection`` after it was deleted from Qdrant.
+
+        The default store is kept because it holds the shared resources; its
+        lexical and hash indexes are emptied with the other collections', on
+        disk too.
+        """
+
+        with self._lock:
+            self._retrievers.pop(collection, None)
+            store = self._stores.get(collection)
+            if store is not None and self.client is not None:
+                # Forget the dropped chunks in the persisted hash index too.
+                store.hash_index.clear()
+                store.hash_index.save()
+            if collection != self.default:
+                self._stores.pop(collection, None)
+            if self.lexical_dir is not None and self.valid_name(collection):
+                shutil.rmtree(self.lexical_dir / collection, ignore_errors=True)
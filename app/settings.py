@@ -26,10 +26,36 @@ class Settings(BaseSettings):
     max_upload_bytes: int = Field(
         default=52_428_800, alias="MAX_UPLOAD_BYTES"
     )
+    upload_dir: str = Field(default="uploads", alias="UPLOAD_DIR")
+    ingest_workers: int = Field(default=2, alias="INGEST_WORKERS")
+    ingest_queue_depth: int = Field(default=16, alias="INGEST_QUEUE_DEPTH")
+    parse_workers: int = Field(default=1, alias="PARSE_WORKERS")
     chunk_size: int = Field(default=800, alias="CHUNK_SIZE")
     chunk_overlap: int = Field(default=120, alias="CHUNK_OVERLAP")
+    embedding_batch_size: int = Field(default=32, alias="EMBEDDING_BATCH_SIZE")
+    max_batch_queries: int = Field(default=64, alias="MAX_BATCH_QUERIES")
+    vector_backend: str = Field(default="qdrant", alias="VECTOR_BACKEND")
+    local_index_dir: str = Field(default="./data/vectors", alias="LOCAL_INDEX_DIR")
+    local_index_dtype: str = Field(default="float16", alias="LOCAL_INDEX_DTYPE")
+    local_index_nlist: int = Field(default=0, alias="LOCAL_INDEX_NLIST")
+    local_index_nprobe: int = Field(default=8, alias="LOCAL_INDEX_NPROBE")
+    snapshot_dir: str = Field(default="data/snapshots", alias="SNAPSHOT_DIR")
+    lexical_index_dir: str = Field(default="data/lexical", alias="LEXICAL_INDEX_DIR")
+    hash_index_dir: str = Field(default="data/hash_index", alias="HASH_INDEX_DIR")
+    lexical_backend: str = Field(default="memory", alias="LEXICAL_BACKEND")
+    filter_tags: str = Field(default="", alias="FILTER_TAGS")
+    semantic_timeout_s: float = Field(default=10.0, alias="SEMANTIC_TIMEOUT_S")
+    lexical_timeout_s: float = Field(default=10.0, alias="LEXICAL_TIMEOUT_S")
+    retrieval_branch_workers: int = Field(default=16, alias="RETRIEVAL_BRANCH_WORKERS")
     qdrant_host: str = Field(default="localhost", alias="QDRANT_HOST")
     qdrant_port: int = Field(default=6333, alias="QDRANT_PORT")
+    qdrant_grpc_port: int = Field(default=6334, alias="QDRANT_GRPC_PORT")
+    qdrant_prefer_grpc: bool = Field(default=False, alias="QDRANT_PREFER_GRPC")
+    qdrant_async: bool = Field(default=False, alias="QDRANT_ASYNC")
+    qdrant_quantization: str = Field(default="none", alias="QDRANT_QUANTIZATION")
+    qdrant_on_disk: bool = Field(default=False, alias="QDRANT_ON_DISK")
+    hnsw_m: int | None = Field(default=None, alias="HNSW_M")
+    hnsw_ef_construct: int | None = Field(default=None, alias="HNSW_EF_CONSTRUCT")
     retrieval_default_mode: str = Field(
         default="hybrid", alias="RETRIEVAL_DEFAULT_MODE"
     )
@@ -0,0 +1,154 @@
+"""On-disk, memory-mapped cache of chunk embeddings.
+
+Vectors are keyed by ``(model name, chunk SHA-256)``: every model gets its own
+directory holding two ``.npy`` memory maps, one with the hex digests and one
+with the vectors, so identical chunks are never re-encoded by the same model
+across collections, rebuilds or evaluation runs. The cache holds at most
+``capacity`` entries and evicts with the CLOCK (second-chance) policy.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import threading
+from pathlib import Path
+from typing import List, Sequence
+
+import numpy as np
+from prometheus_client import Counter
+
+DEFAULT_CAPACITY = 100_000
+
+CACHE_HITS = Counter(
+    "embedding_cache_hits_total", "Chunk embeddings served from the embedding cache."
+)
+CACHE_MISSES = Counter(
+    "embedding_cache_misses_total", "Chunk embeddings missing from the embedding cache."
+)
+
+_KEY_DTYPE = "S64"
+
+
+class EmbeddingCache:
+    """Fixed-size memory-mapped embedding cache for one model."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        model_name: str,
+        dim: int,
+        capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        """Open or create the cache for ``model_name`` below ``directory``.
+
+        Parameters
+        ----------
+        directory:
+            Root cache directory shared by all models.
+        model_name:
+            Name of the embedding model; selects the sub-directory.
+        dim:
+            Embedding dimension. A cache created with another dimension or
+            capacity is discarded and recreated.
+        capacity:
+            Maximum number of cached vectors.
+        """
+
+        safe = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        self.path = Path(directory) / f"{safe}-{dim}"
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        keys_path = self.path / "keys.npy"
+        vectors_path = self.path / "vectors.npy"
+        try:
+            self._keys = np.load(keys_path, mmap_mode="r+")
+            self._vectors = np.load(vectors_path, mmap_mode="r+")
+            if self._keys.shape != (capacity,) or self._vectors.shape != (capacity, dim):
+                raise ValueError("cache layout changed")
+            meta = json.loads((self.path / "meta.json").read_text())
+        except (OSError, ValueError):
+            self._keys = np.lib.format.open_memmap(
+                keys_path, mode="w+", dtype=_KEY_DTYPE, shape=(capacity,)
+            )
+            self._vectors = np.lib.format.open_memmap(
+                vectors_path, mode="w+", dtype=np.float32, shape=(capacity, dim)
+            )
+            meta = {"hand": 0}
+        self._hand = int(meta.get("hand", 0)) % capacity
+        self._slots = {
+            key.decode(): slot for slot, key in enumerate(self._keys) if key
+        }
+        self._referenced = np.zeros(capacity, dtype=bool)
+
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # ------------------------------------------------------------------
+    def get_many(self, digests: Sequence[str]) -> List[np.ndarray | None]:
+        """Return cached vectors for ``digests`` (``None`` for misses)."""
+
+        vectors: List[np.ndarray | None] = []
+        with self._lock:
+            for digest in digests:
+                slot = self._slots.get(digest)
+                if slot is None:
+                    vectors.append(None)
+                    continue
+                self._referenced[slot] = True
+                vectors.append(np.array(self._vectors[slot]))
+        hits = sum(v is not None for v in vectors)
+        CACHE_HITS.inc(hits)
+        CACHE_MISSES.inc(len(vectors) - hits)
+        return vectors
+
+    # ------------------------------------------------------------------
+    def _evict_slot(self) -> int:
+        """Advance the clock hand to a slot without a second chance."""
+
+        while True:
+            slot = self._hand
+            self._hand = (self._hand + 1) % self.capacity
+            if not self._referenced[slot]:
+                return slot
+            self._referenced[slot] = False
+
+    # ------------------------------------------------------------------
+    def put_many(self, digests: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        """Store ``vectors`` under ``digests``, evicting old entries if full.
+
+        Keys are published only after their vectors are on disk: evicted keys
+        are cleared and flushed first, then the vectors are written and
+        flushed, and the new keys are written last. A crash in between loses
+        entries but never pairs a key with another chunk's vector.
+        """
+
+        with self._lock:
+            # slot -> (digest, vector); a batch larger than the cache reuses slots.
+            writes: dict[int, tuple[str, Sequence[float]]] = {}
+            queued = set()
+            for digest, vector in zip(digests, vectors):
+                if digest in self._slots or digest in queued:
+                    continue
+                slot = self._evict_slot()
+                old = self._keys[slot]
+                if old:
+                    self._slots.pop(old.decode(), None)
+                    self._keys[slot] = b""
+                if slot in writes:
+                    queued.discard(writes[slot][0])
+                writes[slot] = (digest, vector)
+                queued.add(digest)
+            if not writes:
+                return
+            self._keys.flush()
+            for slot, (_, vector) in writes.items():
+                self._vectors[slot] = vector
+            self._vectors.flush()
+            for slot, (digest, _) in writes.items():
+                self._keys[slot] = digest.encode()
+                self._slots[digest] = slot
+            self._keys.flush()
+            (self.path / "meta.json").write_text(json.dumps({"hand": self._hand}))
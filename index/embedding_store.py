@@ -2,23 +2,55 @@
 
 This module uses sentence-transformers to compute embeddings and persists them
 in a Qdrant collection. Text chunks are deduplicated via SHA-256 of their
-content before upsert. Metadata is stored using DocArray's ``BaseDoc`` models.
+content before upsert, using a local :class:`~index.hash_index.ChunkHashIndex`
+so that only probable duplicates are checked against Qdrant. Embeddings can
+be reused across collections and rebuilds through an optional on-disk
+:class:`~index.embedding_cache.EmbeddingCache`. Metadata is stored using
+DocArray's ``BaseDoc`` models; searches can be restricted by metadata filters
+(see :mod:`index.filters`), backed by payload indexes that are created on
+demand. With ``sparse_vectors`` every point also carries BM25 term weights as
+a Qdrant sparse vector (see :mod:`index.sparse`), so lexical and hybrid search
+run inside Qdrant.
 """
 
 from __future__ import annotations
 
+import asyncio
+import copy
 import hashlib
 import os
-from typing import Any, Dict, Iterable, List
+import time
+from types import ModuleType
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, NamedTuple, Sequence
 
+import numpy as np
 from docarray import BaseDoc
+from prometheus_client import Counter, Gauge
 from pydantic import Field
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models as rest
 from sentence_transformers import SentenceTransformer
 
+from index import filters as payload_filters
+from index.embedding_cache import DEFAULT_CAPACITY, EmbeddingCache
+from index.hash_index import ChunkHashIndex
+from index.onnx_backend import QuantizedOnnxEncoder
+from index.vector_config import VectorConfig, migrate
+
 DEFAULT_COLLECTION = "documents"
 DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_BACKEND = "torch"
+DEFAULT_GRPC_PORT = 6334
+DEFAULT_HASH_INDEX_DIR = "data/hash_index"
+
+EMBEDDED_CHUNKS = Counter(
+    "embedding_chunks_total", "Number of text chunks encoded into embeddings."
+)
+EMBEDDING_THROUGHPUT = Gauge(
+    "embedding_chunks_per_second",
+    "Encoding throughput of the most recent add_texts call.",
+)
 
 
 class TextDoc(BaseDoc):
@@ -28,6 +60,82 @@ class TextDoc(BaseDoc):
     tags: Dict[str, Any] = Field(default_factory=dict)
 
 
+class SearchHit(NamedTuple):
+    """A scored search result: point ID, similarity and selected payload."""
+
+    id: str
+    score: float
+    payload: Dict[str, Any]
+
+
+def point_id(text: str, file_id: str | None = None) -> str:
+    """Return the Qdrant point ID of the chunk ``text`` of document ``file_id``.
+
+    IDs are the first 32 hex digits of the SHA-256 of the document ID and the
+    text, so chunks are deduplicated per document: a text shared by two
+    documents is stored once for each, and replacing or deleting one of them
+    never touches the other's chunks. Chunks without a document hash the
+    text alone.
+    """
+
+    key = text if file_id is None else f"{file_id}\0{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def is_legacy_point(uid: str, payload: Mapping[str, Any]) -> bool:
+    """Return whether the point ``uid`` predates document-scoped IDs.
+
+    Such points are keyed by the text hash alone, i.e. ``uid`` is the prefix
+    of their ``hash`` payload, although their tags name a document.
+    """
+
+    tags = payload.get("tags") or {}
+    return tags.get("file_id") is not None and uid == payload.get("hash", "")[:32]
+
+
+def connection_params(
+    host: str | None = None, port: int | None = None
+) -> Dict[str, Any]:
+    """Return Qdrant client keyword arguments from the environment.
+
+    ``host`` and ``port`` default to ``QDRANT_HOST`` and ``QDRANT_PORT``. With
+    ``QDRANT_PREFER_GRPC=true`` clients talk gRPC on ``QDRANT_GRPC_PORT``
+    (default 6334), which avoids JSON encoding of vectors and payloads. The
+    result suits both ``QdrantClient`` and ``AsyncQdrantClient``.
+    """
+
+    return {
+        "host": host or os.environ.get("QDRANT_HOST", "localhost"),
+        "port": port or int(os.environ.get("QDRANT_PORT", "6333")),
+        "grpc_port": int(os.environ.get("QDRANT_GRPC_PORT", DEFAULT_GRPC_PORT)),
+        "prefer_grpc": os.environ.get("QDRANT_PREFER_GRPC", "false").lower()
+        == "true",
+    }
+
+
+def load_model(model_name: str, backend: str = DEFAULT_BACKEND) -> Any:
+    """Load ``model_name`` with the embedding ``backend``.
+
+    ``torch`` loads the full-precision ``SentenceTransformer``; ``onnx-int8``
+    loads a dynamically quantized ONNX export run by ONNX Runtime (see
+    :mod:`index.onnx_backend`).
+    """
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "onnx-int8":
+        return QuantizedOnnxEncoder(model_name)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def _sparse() -> ModuleType:
+    """Return :mod:`index.sparse`, which imports this module via the lexical index."""
+
+    from index import sparse
+
+    return sparse
+
+
 class EmbeddingStore:
     """Store and query embeddings in Qdrant with DocArray metadata."""
 
@@ -39,6 +147,16 @@ class EmbeddingStore:
         host: str | None = None,
         port: int | None = None,
         location: str | None = None,
+        batch_size: int | None = None,
+        hash_index_dir: str | None = None,
+        cache_dir: str | None = None,
+        cache_size: int | None = None,
+        backend: str | None = None,
+        vector_config: VectorConfig | None = None,
+        client: QdrantClient | None = None,
+        async_client: AsyncQdrantClient | None = None,
+        sparse_vectors: bool | None = None,
+        filter_tags: Mapping[str, rest.PayloadSchemaType] | None = None,
     ) -> None:
         """Initialize the embedding store.
 
@@ -54,33 +172,314 @@ class EmbeddingStore:
         location:
             Optional location string for QdrantClient, e.g. ``":memory:"`` for
             an ephemeral in-memory instance useful in tests.
+        batch_size:
+            Number of chunks encoded per forward pass. Defaults to the
+            ``EMBEDDING_BATCH_SIZE`` env var or 32.
+        hash_index_dir:
+            Directory where the chunk-hash Bloom filter is persisted, one
+            ``<collection>.bloom`` file per collection. Defaults to the
+            ``HASH_INDEX_DIR`` env var or ``data/hash_index``; an empty value,
+            like an in-memory Qdrant, keeps the filter in memory and rebuilds
+            it from the collection on startup.
+        cache_dir:
+            Directory of the persistent embedding cache. Defaults to the
+            ``EMBEDDING_CACHE_DIR`` env var; caching is disabled when unset.
+        cache_size:
+            Maximum number of cached embeddings. Defaults to the
+            ``EMBEDDING_CACHE_SIZE`` env var or 100000.
+        backend:
+            Embedding backend, ``torch`` or ``onnx-int8``. Defaults to the
+            ``EMBEDDING_BACKEND`` env var or ``torch``.
+        vector_config:
+            Quantization, on-disk storage and HNSW settings applied when the
+            collection is created. Defaults to :meth:`VectorConfig.from_env`.
+        client:
+            Existing Qdrant client to use instead of creating one; ``host``,
+            ``port`` and ``location`` are then ignored.
+        async_client:
+            Optional async client for the same Qdrant instance, used by
+            :meth:`asearch` and :meth:`asearch_batch`.
+        sparse_vectors:
+            Store BM25 sparse vectors next to the embeddings for
+            :meth:`sparse_search_batch` and :meth:`hybrid_search_batch`.
+            Defaults to ``LEXICAL_BACKEND=qdrant``; see
+            :meth:`enable_sparse_vectors`.
+        filter_tags:
+            Payload indexes of the tags searches may filter on, created with
+            the collection. Defaults to the ``FILTER_TAGS`` env var (see
+            :func:`index.filters.tag_indexes`).
         """
 
-        self.model_name = model_name or os.environ.get(
-            "TRANSFORMERS_MODEL", DEFAULT_MODEL
-        )
-        if location is not None:
+        if client is not None:
+            self.client = client
+        elif location is not None:
             self.client = QdrantClient(location=location)
         else:
-            host = host or os.environ.get("QDRANT_HOST", "localhost")
-            port = port or int(os.environ.get("QDRANT_PORT", "6333"))
-            self.client = QdrantClient(host=host, port=port)
+            self.client = QdrantClient(**connection_params(host, port))
+        self.async_client = async_client
         self.collection_name = collection_name
-        self.model = SentenceTransformer(self.model_name)
+        self._load_encoder(model_name, batch_size, cache_dir, cache_size, backend)
+        self.vector_config = vector_config or VectorConfig.from_env()
+        if sparse_vectors is None:
+            backend = os.environ.get("LEXICAL_BACKEND", "memory")
+            sparse_vectors = backend.lower() == "qdrant"
+        self.sparse_vectors = sparse_vectors
+        self.filter_tags = dict(
+            filter_tags
+            if filter_tags is not None
+            else payload_filters.tag_indexes(os.environ.get("FILTER_TAGS"))
+        )
         self._ensure_collection()
+        if hash_index_dir is None:
+            hash_index_dir = os.environ.get("HASH_INDEX_DIR", DEFAULT_HASH_INDEX_DIR)
+            if getattr(self.client, "init_options", {}).get("location") == ":memory:":
+                # The filter must not outlive the points of an in-memory Qdrant.
+                hash_index_dir = ""
+        self.hash_index_dir = hash_index_dir or None
+        self._open_hash_index()
+
+    # ------------------------------------------------------------------
+    def _load_encoder(
+        self,
+        model_name: str | None,
+        batch_size: int | None,
+        cache_dir: str | None,
+        cache_size: int | None,
+        backend: str | None,
+    ) -> None:
+        """Load the embedding model and open the embedding cache.
+
+        Arguments default to their environment variables as documented in
+        :meth:`__init__`.
+        """
+
+        self.model_name = model_name or os.environ.get(
+            "TRANSFORMERS_MODEL", DEFAULT_MODEL
+        )
+        self.batch_size = batch_size or int(
+            os.environ.get("EMBEDDING_BATCH_SIZE", DEFAULT_BATCH_SIZE)
+        )
+        self.backend = backend or os.environ.get("EMBEDDING_BACKEND", DEFAULT_BACKEND)
+        self.model = load_model(self.model_name, self.backend)
+        cache_dir = cache_dir or os.environ.get("EMBEDDING_CACHE_DIR")
+        self.cache = (
+            EmbeddingCache(
+                cache_dir,
+                # Quantized vectors differ slightly, so never share entries.
+                self.model_name
+                if self.backend == DEFAULT_BACKEND
+                else f"{self.model_name}@{self.backend}",
+                self.model.get_sentence_embedding_dimension(),
+                cache_size
+                or int(os.environ.get("EMBEDDING_CACHE_SIZE", DEFAULT_CAPACITY)),
+            )
+            if cache_dir
+            else None
+        )
+
+    # ------------------------------------------------------------------
+    def for_collection(self, collection_name: str) -> "EmbeddingStore":
+        """Return a store for ``collection_name`` sharing this store's resources.
+
+        The new store reuses the loaded model, the Qdrant client, the
+        embedding cache and the vector settings; only the collection and its
+        hash index are its own. The collection is created if needed.
+        """
+
+        store = copy.copy(self)
+        store.collection_name = collection_name
+        store._ensure_collection()
+        store._open_hash_index()
+        return store
+
+    # ------------------------------------------------------------------
+    def _open_hash_index(self) -> None:
+        """Load the collection's hash index, rebuilding it when not persisted."""
+
+        self.hash_index = ChunkHashIndex(
+            path=(
+                os.path.join(self.hash_index_dir, f"{self.collection_name}.bloom")
+                if self.hash_index_dir
+                else None
+            )
+        )
+        if not self.hash_index.load():
+            self._rebuild_hash_index()
 
     # ------------------------------------------------------------------
     def _ensure_collection(self) -> None:
-        """Create the collection if it does not exist."""
+        """Create the collection with :attr:`vector_config` if it does not exist.
+
+        The ``tags.file_id`` and ``tags.page`` payload indexes and those of
+        :attr:`filter_tags` are created as well; creating an existing index
+        is a no-op in Qdrant.
+        """
 
         existing = {c.name for c in self.client.get_collections().collections}
         if self.collection_name not in existing:
             dim = self.model.get_sentence_embedding_dimension()
             self.client.create_collection(
                 self.collection_name,
-                rest.VectorParams(size=dim, distance=rest.Distance.COSINE),
+                self.vector_config.vector_params(dim),
+                hnsw_config=self.vector_config.hnsw_config(),
+                quantization_config=self.vector_config.quantization_config(),
+                sparse_vectors_config=(
+                    {_sparse().SPARSE_VECTOR: _sparse().vector_params()}
+                    if self.sparse_vectors
+                    else None
+                ),
+            )
+        elif self.sparse_vectors:
+            self._check_sparse_vectors()
+        for field, schema in {
+            **payload_filters.DEFAULT_INDEXES,
+            **self.filter_tags,
+        }.items():
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=schema,
+            )
+
+    # ------------------------------------------------------------------
+    def _check_sparse_vectors(self) -> None:
+        """Raise ``ValueError`` unless the collection has the sparse vector.
+
+        Qdrant cannot add vectors to an existing collection; restore a
+        snapshot of it into a new collection instead (see
+        :mod:`index.snapshot`), which computes the sparse vectors.
+        """
+
+        info = self.client.get_collection(self.collection_name)
+        if _sparse().SPARSE_VECTOR not in (info.config.params.sparse_vectors or {}):
+            raise ValueError(
+                f"Collection {self.collection_name} has no "
+                f"{_sparse().SPARSE_VECTOR!r} sparse vectors; restore a snapshot "
+                "of it into a new collection to add them"
             )
 
+    # ------------------------------------------------------------------
+    def enable_sparse_vectors(self) -> None:
+        """Store and search BM25 sparse vectors in this store's collection.
+
+        Raises ``ValueError`` when the collection exists without them.
+        """
+
+        if not self.sparse_vectors:
+            self._check_sparse_vectors()
+            self.sparse_vectors = True
+
+    # ------------------------------------------------------------------
+    def _point_vector(self, vector: List[float], text: str) -> Any:
+        """Return the vector(s) of a point embedding ``vector`` for ``text``."""
+
+        if not self.sparse_vectors:
+            return vector
+        return {"": vector, _sparse().SPARSE_VECTOR: _sparse().document_vector(text)}
+
+    # ------------------------------------------------------------------
+    def _query_filter(self, filters: Mapping[str, Any] | None) -> rest.Filter | None:
+        """Return the Qdrant filter for ``filters``.
+
+        Raises ``ValueError`` for tags without a payload index (see
+        :attr:`filter_tags`); searches never change the collection schema.
+        """
+
+        if filters is None:
+            return None
+        unindexed = payload_filters.unindexed_tags(filters, self.filter_tags)
+        if unindexed:
+            raise ValueError(f"Cannot filter on unindexed tags: {', '.join(unindexed)}")
+        return payload_filters.to_qdrant(filters)
+
+    # ------------------------------------------------------------------
+    def migrate_vector_config(self) -> None:
+        """Apply :attr:`vector_config` to the existing collection.
+
+        Use this after changing quantization, on-disk or HNSW settings for a
+        collection created with different ones.
+        """
+
+        migrate(self.client, self.collection_name, self.vector_config)
+
+    # ------------------------------------------------------------------
+    def _rebuild_hash_index(self) -> None:
+        """Populate the hash index from the collection's ``hash`` payloads.
+
+        The same scan re-keys points stored under legacy IDs (see
+        :meth:`_rekey_legacy_points`), so a collection ingested before IDs
+        included the ``file_id`` is migrated the first time its hash index is
+        built.
+        """
+
+        self.hash_index.clear()
+        legacy: List[str] = []
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                with_payload=["hash", "tags"],
+                with_vectors=False,
+                limit=1024,
+                offset=offset,
+            )
+            for p in points:
+                if p.payload and "hash" in p.payload:
+                    self.hash_index.add(p.payload["hash"])
+                    uid = str(p.id).replace("-", "")
+                    if is_legacy_point(uid, p.payload):
+                        legacy.append(uid)
+            if offset is None:
+                break
+        self._rekey_legacy_points(legacy)
+        self.hash_index.save()
+
+    # ------------------------------------------------------------------
+    def _rekey_legacy_points(self, ids: Sequence[str]) -> None:
+        """Move the text-keyed points ``ids`` to their document-scoped IDs.
+
+        Vectors and payloads are copied as stored; a point whose new ID was
+        already written by a re-ingest is only deleted.
+        """
+
+        for start in range(0, len(ids), 1024):
+            batch = list(ids[start : start + 1024])
+            points = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=batch,
+                with_payload=True,
+                with_vectors=True,
+            )
+            moved = {
+                point_id(p.payload["text"], p.payload["tags"]["file_id"]): p
+                for p in points
+            }
+            existing = self._existing_ids(list(moved))
+            moved = {uid: p for uid, p in moved.items() if uid not in existing}
+            self.upsert_points(
+                list(moved),
+                [
+                    p.vector[""] if isinstance(p.vector, dict) else p.vector
+                    for p in moved.values()
+                ],
+                [p.payload for p in moved.values()],
+            )
+            self.delete(batch)
+
+    # ------------------------------------------------------------------
+    def _existing_ids(self, ids: Sequence[str]) -> set[str]:
+        """Return the subset of ``ids`` already stored, in one Qdrant call."""
+
+        if not ids:
+            return set()
+        found = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=list(ids),
+            with_payload=False,
+            with_vectors=False,
+        )
+        return {str(p.id).replace("-", "") for p in found}
+
     # ------------------------------------------------------------------
     @staticmethod
     def _sha256(text: str) -> str:
@@ -88,13 +487,67 @@ class EmbeddingStore:
 
         return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
+    # ------------------------------------------------------------------
+    def _encode(
+        self, texts: Sequence[str], hashes: Sequence[str] | None = None
+    ) -> List[List[float]]:
+        """Encode ``texts`` in length-bucketed batches.
+
+        Texts are sorted by length so that each batch holds chunks of similar
+        size, which keeps padding inside a forward pass to a minimum. When an
+        embedding cache is configured and the SHA-256 ``hashes`` of the texts
+        are given, cached vectors are reused and only misses are encoded. The
+        returned vectors follow the order of ``texts``.
+        """
+
+        vectors: List[List[float]] = [[] for _ in texts]
+        missing = list(range(len(texts)))
+        if self.cache is not None and hashes is not None:
+            cached = self.cache.get_many(hashes)
+            for i, vector in enumerate(cached):
+                if vector is not None:
+                    vectors[i] = vector.tolist()
+            missing = [i for i, vector in enumerate(cached) if vector is None]
+
+        order = sorted(missing, key=lambda i: len(texts[i]))
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start : start + self.batch_size]
+            encoded = self.model.encode(
+                [texts[i] for i in batch], batch_size=self.batch_size
+            )
+            for i, vector in zip(batch, encoded):
+                vectors[i] = vector.tolist()
+        if self.cache is not None and hashes is not None and missing:
+            self.cache.put_many(
+                [hashes[i] for i in missing], [vectors[i] for i in missing]
+            )
+        return vectors
+
+    # ------------------------------------------------------------------
+    def _embed(
+        self, texts: Sequence[str], hashes: Sequence[str]
+    ) -> List[List[float]]:
+        """Encode new chunks via :meth:`_encode` and record throughput metrics."""
+
+        started = time.perf_counter()
+        embeddings = self._encode(texts, hashes)
+        elapsed = time.perf_counter() - started
+        EMBEDDED_CHUNKS.inc(len(texts))
+        if elapsed > 0:
+            EMBEDDING_THROUGHPUT.set(len(texts) / elapsed)
+        return embeddings
+
     # ------------------------------------------------------------------
     def add_texts(
         self, texts: Iterable[str], metadatas: Iterable[Dict[str, Any]] | None = None
     ) -> List[str]:
         """Add ``texts`` and their ``metadatas`` to the store.
 
-        Duplicate texts are skipped based on the SHA-256 hash of the text.
+        Duplicate chunks are skipped based on their :func:`point_id`, i.e.
+        the same text is stored once per ``file_id`` tag. Text hashes missing
+        from the local hash index are new by construction; only index hits
+        are confirmed against Qdrant, with a single batched call.
+        New texts are embedded together in batches of ``batch_size``.
 
         Returns a list of IDs that were newly inserted.
         """
@@ -102,35 +555,477 @@ class EmbeddingStore:
         texts = list(texts)
         if metadatas is None:
             metadatas = [{} for _ in texts]  # type: ignore[misc]
-        ids: List[str] = []
-        points: List[rest.PointStruct] = []
+        candidates: Dict[str, tuple[str, str, Dict[str, Any]]] = {}
         for text, metadata in zip(texts, metadatas):
             full_hash = self._sha256(text)
-            uid = full_hash[:32]
-            if self.client.retrieve(collection_name=self.collection_name, ids=[uid]):
+            uid = point_id(text, metadata.get("file_id"))
+            candidates.setdefault(uid, (full_hash, text, metadata))
+        existing = self._existing_ids(
+            [uid for uid, (h, _, _) in candidates.items() if h in self.hash_index]
+        )
+
+        ids: List[str] = []
+        hashes: List[str] = []
+        pending: List[str] = []
+        payloads: List[Dict[str, Any]] = []
+        for uid, (full_hash, text, metadata) in candidates.items():
+            if uid in existing:
                 continue
             doc = TextDoc(text=text, tags=metadata)
-            embedding = self.model.encode(text).tolist()
             payload = doc.model_dump(exclude={"id"})
             payload["hash"] = full_hash
-            points.append(
-                rest.PointStruct(id=uid, vector=embedding, payload=payload)
-            )
             ids.append(uid)
-        if points:
-            self.client.upsert(collection_name=self.collection_name, points=points)
+            hashes.append(full_hash)
+            pending.append(text)
+            payloads.append(payload)
+        if not pending:
+            return ids
+
+        embeddings = self._embed(pending, hashes)
+        points = [
+            rest.PointStruct(
+                id=uid,
+                vector=self._point_vector(vector, payload["text"]),
+                payload=payload,
+            )
+            for uid, vector, payload in zip(ids, embeddings, payloads)
+        ]
+        self.client.upsert(collection_name=self.collection_name, points=points)
+        self.hash_index.update(hashes)
+        self.hash_index.save()
         return ids
 
     # ------------------------------------------------------------------
-    def query(self, query: str, top_k: int = 5) -> List[TextDoc]:
-        """Search the store with ``query`` and return matching ``TextDoc``s."""
+    @staticmethod
+    def _file_filter(file_id: str) -> rest.Filter:
+        """Return a Qdrant filter matching points whose ``tags.file_id`` is ``file_id``."""
+
+        return rest.Filter(
+            must=[
+                rest.FieldCondition(
+                    key="tags.file_id", match=rest.MatchValue(value=file_id)
+                )
+            ]
+        )
+
+    # ------------------------------------------------------------------
+    def file_point_ids(self, file_id: str) -> set[str]:
+        """Return the IDs of all points tagged with ``file_id``."""
+
+        ids: set[str] = set()
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._file_filter(file_id),
+                with_payload=False,
+                with_vectors=False,
+                limit=1024,
+                offset=offset,
+            )
+            ids.update(str(p.id).replace("-", "") for p in points)
+            if offset is None:
+                return ids
+
+    # ------------------------------------------------------------------
+    def replace_file(
+        self,
+        file_id: str,
+        texts: Iterable[str],
+        metadatas: Iterable[Dict[str, Any]] | None = None,
+    ) -> tuple[List[str], List[str], List[str]]:
+        """Make ``texts`` the current version of document ``file_id``.
+
+        The chunk IDs of the new version are diffed against the points already
+        tagged with ``file_id``: unchanged chunks keep their vectors and only
+        get their tags (page, span) refreshed, new chunks are embedded via
+        :meth:`add_texts`, and chunks that disappeared are deleted. Every
+        chunk is tagged with ``file_id``; chunks of other documents are never
+        touched, even when their text is the same (see :func:`point_id`).
+
+        Returns ``(added, kept, removed)`` point ID lists.
+        """
+
+        texts = list(texts)
+        if metadatas is None:
+            metadatas = [{} for _ in texts]  # type: ignore[misc]
+        new: Dict[str, tuple[str, Dict[str, Any]]] = {}
+        for text, metadata in zip(texts, metadatas):
+            metadata = {**metadata, "file_id": file_id}
+            new.setdefault(point_id(text, file_id), (text, metadata))
+        old = self.file_point_ids(file_id)
+
+        kept = [uid for uid in new if uid in old]
+        removed = [uid for uid in old if uid not in new]
+        fresh = [uid for uid in new if uid not in old]
+        added = self.add_texts(
+            [new[uid][0] for uid in fresh], [new[uid][1] for uid in fresh]
+        )
+        if kept:
+            self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=[
+                    rest.SetPayloadOperation(
+                        set_payload=rest.SetPayload(
+                            payload={"tags": new[uid][1]}, points=[uid]
+                        )
+                    )
+                    for uid in kept
+                ],
+            )
+        self.delete(removed)
+        return added, kept, removed
+
+    # ------------------------------------------------------------------
+    def delete(self, ids: Iterable[str]) -> None:
+        """Delete the points with the given ``ids``; unknown IDs are ignored.
+
+        The hash index cannot forget hashes, so re-adding a deleted chunk
+        costs one extra Qdrant lookup.
+        """
+
+        ids = list(ids)
+        if ids:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=rest.PointIdsList(points=ids),
+            )
+
+    # ------------------------------------------------------------------
+    def delete_file(self, file_id: str) -> None:
+        """Delete every point tagged with ``file_id`` in one filtered call."""
+
+        self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=rest.FilterSelector(filter=self._file_filter(file_id)),
+        )
+
+    # ------------------------------------------------------------------
+    def scroll_points(
+        self, batch_size: int = 1024
+    ) -> Iterator[tuple[List[str], np.ndarray, List[Dict[str, Any]]]]:
+        """Yield ``(ids, vectors, payloads)`` pages covering the whole collection."""
+
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                with_payload=True,
+                with_vectors=True,
+                limit=batch_size,
+                offset=offset,
+            )
+            if points:
+                yield (
+                    [str(p.id).replace("-", "") for p in points],
+                    np.asarray(
+                        [
+                            p.vector[""] if isinstance(p.vector, dict) else p.vector
+                            for p in points
+                        ],
+                        dtype=np.float32,
+                    ),
+                    [p.payload or {} for p in points],
+                )
+            if offset is None:
+                return
+
+    # ------------------------------------------------------------------
+    def upsert_points(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]] | np.ndarray,
+        payloads: Sequence[Dict[str, Any]],
+    ) -> None:
+        """Write points with precomputed ``vectors`` in one bulk upsert.
+
+        Nothing is embedded; existing IDs are overwritten. Sparse vectors are
+        computed from the payload ``text``. Payload ``hash`` fields are added
+        to the hash index so later ingests deduplicate against the written
+        chunks.
+        """
+
+        if not len(ids):
+            return
+        dense = np.asarray(vectors, dtype=np.float32).tolist()
+        batch_vectors: Any = dense
+        if self.sparse_vectors:
+            batch_vectors = {
+                "": dense,
+                _sparse().SPARSE_VECTOR: [
+                    _sparse().document_vector(p.get("text", "")) for p in payloads
+                ],
+            }
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=rest.Batch(
+                ids=list(ids), vectors=batch_vectors, payloads=list(payloads)
+            ),
+        )
+        hashes = [p["hash"] for p in payloads if "hash" in p]
+        if hashes:
+            self.hash_index.update(hashes)
+            self.hash_index.save()
+
+    # ------------------------------------------------------------------
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        with_payload: Sequence[str] | bool = ("text", "tags"),
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[SearchHit]:
+        """Search the store with ``query`` and return scored hits.
+
+        Only the payload fields named in ``with_payload`` are fetched from
+        Qdrant (``True`` fetches all, ``False`` none). ``search_params`` may
+        set ``hnsw_ef``, ``exact``, ``oversampling`` and ``rescore`` for this
+        request (see :meth:`VectorConfig.search_params`). ``filters``
+        restricts the search to matching chunks inside Qdrant (see
+        :mod:`index.filters`). Hits are returned in ranked order as plain
+        :class:`SearchHit` tuples with dash-free point IDs and cosine
+        similarity scores.
+        """
 
         vector = self.model.encode(query).tolist()
         results = self.client.search(
-            collection_name=self.collection_name, query_vector=vector, limit=top_k
+            collection_name=self.collection_name,
+            query_vector=vector,
+            query_filter=self._query_filter(filters),
+            limit=top_k,
+            search_params=self.vector_config.search_params(**(search_params or {})),
+            with_payload=(
+                with_payload if isinstance(with_payload, bool) else list(with_payload)
+            ),
+        )
+        return self._hits(results)
+
+    # ------------------------------------------------------------------
+    def search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int = 5,
+        with_payload: Sequence[str] | bool = ("text", "tags"),
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[List[SearchHit]]:
+        """Search the store with every query in ``queries`` at once.
+
+        All queries are encoded in a single ``encode`` call and sent to Qdrant
+        in one batch search request. Returns one ranked hit list per query, in
+        the order of ``queries``; see :meth:`search` for ``with_payload``,
+        ``search_params`` and ``filters``.
+        """
+
+        if not queries:
+            return []
+        vectors = self.model.encode(list(queries), batch_size=self.batch_size)
+        if not isinstance(with_payload, bool):
+            with_payload = list(with_payload)
+        params = self.vector_config.search_params(**(search_params or {}))
+        query_filter = self._query_filter(filters)
+        results = self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=[
+                rest.SearchRequest(
+                    vector=vector.tolist(),
+                    filter=query_filter,
+                    limit=top_k,
+                    params=params,
+                    with_payload=with_payload,
+                )
+                for vector in vectors
+            ],
+        )
+        return [self._hits(hits) for hits in results]
+
+    # ------------------------------------------------------------------
+    async def asearch(
+        self,
+        query: str,
+        top_k: int = 5,
+        with_payload: Sequence[str] | bool = ("text", "tags"),
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[SearchHit]:
+        """Async variant of :meth:`search`.
+
+        The query is encoded on a worker thread and the Qdrant round trip is
+        awaited on :attr:`async_client`, so no thread is held while waiting
+        for Qdrant. Without an async client :meth:`search` runs on a worker
+        thread instead.
+        """
+
+        if self.async_client is None:
+            return await asyncio.to_thread(
+                self.search, query, top_k, with_payload, search_params, filters
+            )
+        vector = await asyncio.to_thread(self.model.encode, query)
+        query_filter = (
+            await asyncio.to_thread(self._query_filter, filters) if filters else None
+        )
+        results = await self.async_client.search(
+            collection_name=self.collection_name,
+            query_vector=vector.tolist(),
+            query_filter=query_filter,
+            limit=top_k,
+            search_params=self.vector_config.search_params(**(search_params or {})),
+            with_payload=(
+                with_payload if isinstance(with_payload, bool) else list(with_payload)
+            ),
+        )
+        return self._hits(results)
+
+    # ------------------------------------------------------------------
+    async def asearch_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int = 5,
+        with_payload: Sequence[str] | bool = ("text", "tags"),
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[List[SearchHit]]:
+        """Async variant of :meth:`search_batch`; see :meth:`asearch`."""
+
+        if self.async_client is None or not queries:
+            return await asyncio.to_thread(
+                self.search_batch, queries, top_k, with_payload, search_params, filters
+            )
+        vectors = await asyncio.to_thread(
+            self.model.encode, list(queries), batch_size=self.batch_size
+        )
+        if not isinstance(with_payload, bool):
+            with_payload = list(with_payload)
+        params = self.vector_config.search_params(**(search_params or {}))
+        query_filter = (
+            await asyncio.to_thread(self._query_filter, filters) if filters else None
+        )
+        results = await self.async_client.search_batch(
+            collection_name=self.collection_name,
+            requests=[
+                rest.SearchRequest(
+                    vector=vector.tolist(),
+                    filter=query_filter,
+                    limit=top_k,
+                    params=params,
+                    with_payload=with_payload,
+                )
+                for vector in vectors
+            ],
         )
-        docs: List[TextDoc] = []
-        for res in results:
-            payload = res.payload or {}
-            docs.append(TextDoc(**payload))
-        return docs
+        return [self._hits(hits) for hits in results]
+
+    # ------------------------------------------------------------------
+    def sparse_search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int = 5,
+        with_payload: Sequence[str] | bool = ("text", "tags"),
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[List[SearchHit]]:
+        """BM25-rank the collection for every query in one Qdrant request.
+
+        Scores come from the sparse vectors (see :mod:`index.sparse`);
+        points without a query term are not returned. See :meth:`search` for
+        ``with_payload`` and ``filters``.
+        """
+
+        if not queries:
+            return []
+        if not isinstance(with_payload, bool):
+            with_payload = list(with_payload)
+        query_filter = self._query_filter(filters)
+        results = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                rest.QueryRequest(
+                    query=_sparse().query_vector(query),
+                    using=_sparse().SPARSE_VECTOR,
+                    filter=query_filter,
+                    limit=top_k,
+                    with_payload=with_payload,
+                )
+                for query in queries
+            ],
+        )
+        return [self._hits(result.points) for result in results]
+
+    # ------------------------------------------------------------------
+    def hybrid_search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int = 5,
+        with_payload: Sequence[str] | bool = ("text", "tags"),
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+        branches: bool = False,
+    ) -> List[List[List[SearchHit]]]:
+        """Run dense and sparse search for every query as one Qdrant request.
+
+        Each query prefetches its ``top_k`` best dense and sparse candidates
+        and Qdrant fuses them with Reciprocal Rank Fusion. Returns one list
+        per query holding the fused hits and, with ``branches``, the dense
+        and the sparse hits as well, fetched in the same request. See
+        :meth:`search` for the other arguments.
+        """
+
+        if not queries:
+            return []
+        vectors = self.model.encode(list(queries), batch_size=self.batch_size)
+        if not isinstance(with_payload, bool):
+            with_payload = list(with_payload)
+        params = self.vector_config.search_params(**(search_params or {}))
+        query_filter = self._query_filter(filters)
+        requests: List[rest.QueryRequest] = []
+        for query, vector in zip(queries, vectors):
+            dense = rest.Prefetch(
+                query=vector.tolist(), filter=query_filter, params=params, limit=top_k
+            )
+            sparse = rest.Prefetch(
+                query=_sparse().query_vector(query),
+                using=_sparse().SPARSE_VECTOR,
+                filter=query_filter,
+                limit=top_k,
+            )
+            requests.append(
+                rest.QueryRequest(
+                    prefetch=[dense, sparse],
+                    query=rest.FusionQuery(fusion=rest.Fusion.RRF),
+                    limit=top_k,
+                    with_payload=with_payload,
+                )
+            )
+            if branches:
+                requests.extend(
+                    rest.QueryRequest(
+                        **branch.model_dump(exclude_none=True),
+                        with_payload=with_payload,
+                    )
+                    for branch in (dense, sparse)
+                )
+        results = self.client.query_batch_points(
+            collection_name=self.collection_name, requests=requests
+        )
+        hits = [self._hits(result.points) for result in results]
+        per_query = 3 if branches else 1
+        return [hits[i : i + per_query] for i in range(0, len(hits), per_query)]
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _hits(results: Iterable[Any]) -> List[SearchHit]:
+        """Convert Qdrant ``ScoredPoint`` results to :class:`SearchHit` tuples."""
+
+        return [
+            SearchHit(str(res.id).replace("-", ""), res.score, res.payload or {})
+            for res in results
+        ]
+
+    # ------------------------------------------------------------------
+    def query(self, query: str, top_k: int = 5) -> List[TextDoc]:
+        """Search the store with ``query`` and return matching ``TextDoc``s."""
+
+        return [
+            TextDoc(text=hit.payload.get("text", ""), tags=hit.payload.get("tags", {}))
+            for hit in self.search(query, top_k=top_k)
+        ]
@@ -0,0 +1,160 @@
+"""Metadata filters shared by the vector stores and the lexical index.
+
+A filter is a plain mapping with any of these keys:
+
+``file_id``
+    A document ID or a list of them; chunks of any listed document match.
+``tags``
+    ``{key: value}`` pairs that must all equal the chunk's tags.
+``page_from`` / ``page_to``
+    Inclusive page range; chunks without a ``page`` tag never match it.
+
+:func:`to_qdrant` turns a filter into a Qdrant ``Filter`` on the ``tags.*``
+payload fields. Qdrant answers filtered searches with its filterable HNSW
+instead of over-fetching, backed by payload indexes that are created with the
+collection: :data:`DEFAULT_INDEXES` plus the tags allowed by ``FILTER_TAGS``
+(see :func:`tag_indexes`). Searches never create indexes; filters on other
+tags are rejected (see :func:`unindexed_tags`). :func:`matches` evaluates a
+filter against a chunk's tags in Python, and :func:`split` breaks a filter
+into single conditions that can be cached as per-document bitmaps.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping
+
+from qdrant_client.http import models as rest
+
+# Payload indexes created for every collection.
+DEFAULT_INDEXES: Dict[str, rest.PayloadSchemaType] = {
+    "tags.file_id": rest.PayloadSchemaType.KEYWORD,
+    "tags.page": rest.PayloadSchemaType.INTEGER,
+}
+TAG_SCHEMAS = {
+    "keyword": rest.PayloadSchemaType.KEYWORD,
+    "integer": rest.PayloadSchemaType.INTEGER,
+    "bool": rest.PayloadSchemaType.BOOL,
+}
+
+
+def normalize(filters: Mapping[str, Any] | None) -> Dict[str, Any] | None:
+    """Drop unset keys and turn a single ``file_id`` into a list.
+
+    Returns ``None`` when nothing is left to filter on.
+    """
+
+    if not filters:
+        return None
+    result: Dict[str, Any] = {}
+    file_id = filters.get("file_id")
+    if file_id is not None:
+        result["file_id"] = [file_id] if isinstance(file_id, str) else list(file_id)
+    if filters.get("tags"):
+        result["tags"] = dict(filters["tags"])
+    for key in ("page_from", "page_to"):
+        if filters.get(key) is not None:
+            result[key] = filters[key]
+    return result or None
+
+
+# ----------------------------------------------------------------------
+def split(filters: Mapping[str, Any] | None) -> List[Dict[str, Any]]:
+    """Return the single conditions of ``filters``; all of them must match."""
+
+    filters = normalize(filters)
+    if filters is None:
+        return []
+    parts: List[Dict[str, Any]] = []
+    if "file_id" in filters:
+        parts.append({"file_id": filters["file_id"]})
+    for key, value in filters.get("tags", {}).items():
+        parts.append({"tags": {key: value}})
+    page = {k: filters[k] for k in ("page_from", "page_to") if k in filters}
+    if page:
+        parts.append(page)
+    return parts
+
+
+# ----------------------------------------------------------------------
+def matches(tags: Mapping[str, Any], filters: Mapping[str, Any] | None) -> bool:
+    """Return whether a chunk with ``tags`` satisfies ``filters``."""
+
+    filters = normalize(filters)
+    if filters is None:
+        return True
+    if "file_id" in filters and tags.get("file_id") not in filters["file_id"]:
+        return False
+    for key, value in filters.get("tags", {}).items():
+        if key not in tags or tags[key] != value:
+            return False
+    if "page_from" in filters or "page_to" in filters:
+        page = tags.get("page")
+        if not isinstance(page, int):
+            return False
+        if page < filters.get("page_from", page) or page > filters.get("page_to", page):
+            return False
+    return True
+
+
+# ----------------------------------------------------------------------
+def to_qdrant(filters: Mapping[str, Any] | None) -> rest.Filter | None:
+    """Return the Qdrant ``Filter`` equivalent of ``filters``, or ``None``."""
+
+    filters = normalize(filters)
+    if filters is None:
+        return None
+    must: List[rest.Condition] = []
+    if "file_id" in filters:
+        must.append(
+            rest.FieldCondition(
+                key="tags.file_id", match=rest.MatchAny(any=filters["file_id"])
+            )
+        )
+    for key, value in filters.get("tags", {}).items():
+        must.append(
+            rest.FieldCondition(key=f"tags.{key}", match=rest.MatchValue(value=value))
+        )
+    if "page_from" in filters or "page_to" in filters:
+        must.append(
+            rest.FieldCondition(
+                key="tags.page",
+                range=rest.Range(
+                    gte=filters.get("page_from"), lte=filters.get("page_to")
+                ),
+            )
+        )
+    return rest.Filter(must=must)
+
+
+# ----------------------------------------------------------------------
+def tag_indexes(spec: str | None) -> Dict[str, rest.PayloadSchemaType]:
+    """Parse a ``FILTER_TAGS`` value into payload indexes on ``tags.*``.
+
+    ``spec`` lists the filterable tags as ``key[:type]`` separated by commas,
+    e.g. ``"lang,year:integer,draft:bool"``; ``type`` is ``keyword`` (the
+    default), ``integer`` or ``bool``. Raises ``ValueError`` for other types.
+    """
+
+    fields: Dict[str, rest.PayloadSchemaType] = {}
+    for item in (spec or "").split(","):
+        key, _, kind = item.strip().partition(":")
+        if not key:
+            continue
+        schema = TAG_SCHEMAS.get(kind.strip().lower() or "keyword")
+        if schema is None:
+            raise ValueError(f"Unknown filter tag type: {kind}")
+        fields[f"tags.{key.strip()}"] = schema
+    return fields
+
+
+# ----------------------------------------------------------------------
+def unindexed_tags(
+    filters: Mapping[str, Any] | None, indexed: Iterable[str]
+) -> List[str]:
+    """Return the tag keys of ``filters`` whose ``tags.*`` field isn't ``indexed``."""
+
+    filters = normalize(filters)
+    if filters is None:
+        return []
+    fields = set(indexed)
+    return sorted(key for key in filters.get("tags", {}) if f"tags.{key}" not in fields)
@@ -0,0 +1,158 @@
+"""Local Bloom-filter index of chunk hashes known to a collection.
+
+:class:`ChunkHashIndex` lets :class:`~index.embedding_store.EmbeddingStore`
+decide in-process whether a chunk is new. A negative answer from the Bloom
+filter is definitive, so only filter hits need to be confirmed against Qdrant.
+The bit array can be persisted to disk and reloaded at startup; when no file
+exists the index is rebuilt from the collection's ``hash`` payloads. Updates
+and saves are serialised by a lock, so concurrent ingest workers can share
+one index.
+
+Files start with a magic number. Files written before it was added are
+treated as missing, so each of those collections is rescanned once. That
+rebuild also re-keys its legacy point IDs.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import struct
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable
+
+DEFAULT_CAPACITY = 1_000_000
+DEFAULT_ERROR_RATE = 0.01
+
+_MAGIC = b"CHI2"
+_HEADER = struct.Struct("<4sQI")
+
+
+class ChunkHashIndex:
+    """Bloom filter over SHA-256 hex digests of text chunks."""
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CAPACITY,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        *,
+        path: str | Path | None = None,
+    ) -> None:
+        """Create an empty index sized for ``capacity`` hashes.
+
+        Parameters
+        ----------
+        capacity:
+            Expected number of distinct hashes.
+        error_rate:
+            Target false-positive probability at ``capacity``.
+        path:
+            Optional file used by :meth:`save` and :meth:`load`.
+        """
+
+        self.num_bits = max(
+            8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.path = Path(path) if path is not None else None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def _positions(self, digest: str) -> Iterable[int]:
+        """Yield bit positions for ``digest`` using double hashing.
+
+        The digest is already uniformly distributed, so two 64-bit slices of
+        it serve as the independent base hashes.
+        """
+
+        h1 = int(digest[:16], 16)
+        h2 = int(digest[16:32], 16) | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    # ------------------------------------------------------------------
+    def _set(self, digest: str) -> None:
+        """Set the bits of ``digest``. Caller holds the lock."""
+
+        for pos in self._positions(digest):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    # ------------------------------------------------------------------
+    def add(self, digest: str) -> None:
+        """Record ``digest`` as present in the collection."""
+
+        with self._lock:
+            self._set(digest)
+
+    # ------------------------------------------------------------------
+    def update(self, digests: Iterable[str]) -> None:
+        """Record every digest in ``digests``."""
+
+        with self._lock:
+            for digest in digests:
+                self._set(digest)
+
+    # ------------------------------------------------------------------
+    def __contains__(self, digest: str) -> bool:
+        """Return ``False`` when ``digest`` was definitely never added."""
+
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest)
+        )
+
+    # ------------------------------------------------------------------
+    def clear(self) -> None:
+        """Forget all recorded digests."""
+
+        with self._lock:
+            self.bits = bytearray(len(self.bits))
+
+    # ------------------------------------------------------------------
+    def save(self) -> None:
+        """Write the filter to ``path`` atomically. No-op without a path.
+
+        Each save writes its own temporary file next to ``path`` and moves it
+        into place.
+        """
+
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            fh = tempfile.NamedTemporaryFile(
+                dir=self.path.parent,
+                prefix=self.path.name + ".",
+                suffix=".tmp",
+                delete=False,
+            )
+            try:
+                with fh:
+                    fh.write(_HEADER.pack(_MAGIC, self.num_bits, self.num_hashes))
+                    fh.write(self.bits)
+                os.replace(fh.name, self.path)
+            except BaseException:
+                Path(fh.name).unlink(missing_ok=True)
+                raise
+
+    # ------------------------------------------------------------------
+    def load(self) -> bool:
+        """Load the filter from ``path``.
+
+        Returns ``True`` when a saved filter was found and loaded, ``False``
+        when there is none or it was written in an older format.
+        """
+
+        if self.path is None or not self.path.exists():
+            return False
+        data = self.path.read_bytes()
+        if not data.startswith(_MAGIC):
+            return False
+        _, num_bits, num_hashes = _HEADER.unpack_from(data)
+        with self._lock:
+            self.num_bits = num_bits
+            self.num_hashes = num_hashes
+            self.bits = bytearray(data[_HEADER.size :])
+        return True
@@ -0,0 +1,831 @@
+"""Inverted BM25 index that is updated in place.
+
+:class:`LexicalIndex` is the lexical side of
+:class:`~retriever.base.BaseRetriever`. It keeps a postings list (document
+rows and term frequencies) per term, the length of every document and the
+collection statistics BM25 needs: the number of live documents, their total
+length and the document frequency of every term. Appending a document only
+touches its own terms, and tombstoning one subtracts its terms from the
+statistics again, so both cost time proportional to the change instead of
+re-tokenising the corpus. Tombstoned rows stay in the postings, skipped at
+query time, until :meth:`LexicalIndex.compact` copies the live documents into
+a fresh index.
+
+Scores are those of ``rank_bm25.BM25Okapi`` over the live documents:
+``k1=1.5``, ``b=0.75``, and terms whose idf would be negative get ``epsilon``
+times the average idf of the vocabulary.
+
+:meth:`LexicalIndex.search` answers top-k queries from the postings of the
+query terms alone: contributions are accumulated sparsely over the rows that
+contain a query term (densely once they cover a large share of the corpus)
+and the best ``k`` are picked with a partial selection, so query cost follows
+the document frequency of the query terms rather than the corpus size. Terms
+are visited in decreasing order of their score upper bound (MaxScore): once
+the k-th best score exceeds what the remaining terms could add, candidates
+that cannot reach it are dropped and the remaining terms are only looked up
+for the rest.
+
+An index opened with :meth:`LexicalIndex.open` is persistent: it lives in a
+directory holding a memory-mapped segment (see :mod:`index.lexical_segment`)
+and a JSON-lines log of the documents appended and rows deleted since the
+segment was written. Opening maps the segment and replays only the log;
+postings and documents of the segment are decoded when first read, so a large
+corpus is neither loaded nor re-tokenised at startup. Once the log holds more
+than ``CHECKPOINT_RATIO`` of the rows, :meth:`LexicalIndex.save` writes a new
+segment and starts an empty log.
+
+The rows of every ``file_id`` tag are tracked as documents are appended and
+stored in the segment's file table, so :meth:`LexicalIndex.file_rows` - and
+deleting a document through it - costs time proportional to that document's
+chunks. Compaction is split in two (:meth:`LexicalIndex.start_compaction` and
+:meth:`LexicalIndex.finish_compaction`) so that the rebuild can run while the
+index keeps taking updates.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import threading
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from index.embedding_store import TextDoc
+from index.lexical_segment import (
+    Segment,
+    SegmentDocs,
+    encode_doc,
+    encode_postings,
+    write_segment,
+)
+
+DEFAULT_K1 = 1.5
+DEFAULT_B = 0.75
+DEFAULT_EPSILON = 0.25
+INITIAL_CAPACITY = 64
+
+# Share of the rows above which query scores are accumulated densely.
+DENSE_RATIO = 0.25
+# Relative slack on the k-th score when pruning candidates (see ``search``).
+PRUNE_TOLERANCE = 1e-9
+
+# Maps candidate rows to a mask of the rows a search may return.
+RowFilter = Callable[[np.ndarray], np.ndarray]
+
+SEGMENT_NAME = "segment.lex"
+# Compacted segment written before it replaces ``SEGMENT_NAME``.
+STAGED_SEGMENT_NAME = "segment.lex.compact"
+# Logged documents and deletions, relative to the rows, that trigger a checkpoint.
+CHECKPOINT_RATIO = 0.25
+MIN_CHECKPOINT_RECORDS = 1000
+
+
+def tokenize(text: str) -> List[str]:
+    """Split ``text`` into index terms; queries are tokenised the same way."""
+
+    return text.split()
+
+
+def _kth_largest(values: np.ndarray, k: int) -> float:
+    """Return the ``k``-th largest of ``values`` by partial selection."""
+
+    return float(np.partition(values, len(values) - k)[len(values) - k])
+
+
+class LexicalIndex:
+    """BM25 postings with appendable documents, tombstones and live statistics.
+
+    Documents are addressed by their row, i.e. their position in :attr:`docs`.
+    Updates must be serialised by the caller; searches may run concurrently
+    with one writer and only see the rows that were complete when they read
+    :attr:`size`. Indexes created directly live in memory only; see
+    :meth:`open` for persistent ones.
+    """
+
+    def __init__(
+        self,
+        docs: Iterable[TextDoc] = (),
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+        epsilon: float = DEFAULT_EPSILON,
+    ) -> None:
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.docs: List[TextDoc] | SegmentDocs = []
+        # Directory of a persistent index and generation of its segment.
+        self.path: Path | None = None
+        self.generation = 0
+        self.size = 0
+        self.live_count = 0
+        self.total_length = 0
+        self.version = 0
+        self._doc_len = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self._live = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._terms: Dict[str, int] = {}
+        self._df = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        # Largest frequency ever posted per term; bounds a term's contribution.
+        self._max_tf = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        # Postings per term id; ``None`` while still encoded in the segment.
+        self._rows: List[array | None] = []
+        self._freqs: List[array | None] = []
+        self._segment: Segment | None = None
+        # Rows per ``file_id`` tag appended since the segment was written.
+        self._files: Dict[str, array] = {}
+        # File table built from the documents of a format 1 segment.
+        self._segment_files: Dict[str, np.ndarray] | None = None
+        self._load_lock = threading.Lock()
+        self._logged = 0
+        # (version, average idf) - the vocabulary-wide part of the idf floor.
+        self._average_idf: Tuple[int, float] = (-1, 0.0)
+        self.add(docs)
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def open(
+        cls,
+        path: str | os.PathLike[str],
+        k1: float = DEFAULT_K1,
+        b: float = DEFAULT_B,
+        epsilon: float = DEFAULT_EPSILON,
+    ) -> "LexicalIndex":
+        """Open the persistent index in directory ``path``, creating it if needed.
+
+        The segment is mapped, not read, and only the documents logged since
+        it was written are tokenised. Later :meth:`add` and :meth:`delete`
+        calls are logged to ``path``.
+        """
+
+        index = cls(k1=k1, b=b, epsilon=epsilon)
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        if (path / SEGMENT_NAME).exists():
+            index._attach(Segment(path / SEGMENT_NAME))
+        log = index._log_path(path)
+        for stale in path.glob("log.*.jsonl"):
+            # Left behind when a checkpoint stopped before removing its log.
+            if stale != log:
+                stale.unlink(missing_ok=True)
+        # Left behind when a compaction stopped before swapping its segment in.
+        (path / STAGED_SEGMENT_NAME).unlink(missing_ok=True)
+        if log.exists():
+            index._replay(log)
+        index.path = path
+        return index
+
+    # ------------------------------------------------------------------
+    def _log_path(self, path: Path) -> Path:
+        """Return the log of the current segment generation below ``path``."""
+
+        return path / f"log.{self.generation}.jsonl"
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _copied(values: np.ndarray, dtype: Any) -> np.ndarray:
+        """Return a growable in-memory copy of the mapped ``values``."""
+
+        copy = np.zeros(max(len(values), INITIAL_CAPACITY), dtype=dtype)
+        copy[: len(values)] = values
+        return copy
+
+    # ------------------------------------------------------------------
+    def _attach(self, segment: Segment) -> None:
+        """Take the state of the empty index from ``segment``."""
+
+        header = segment.header
+        self._segment = segment
+        self.generation = segment.generation
+        self.docs = SegmentDocs(segment)
+        self.size = segment.size
+        self.live_count = header["live_count"]
+        self.total_length = header["total_length"]
+        self._doc_len = self._copied(segment.array("doc_len"), np.int64)
+        self._live = self._copied(segment.array("live"), bool)
+        self._df = self._copied(segment.array("df"), np.int64)
+        self._max_tf = self._copied(segment.array("max_tf"), np.int64)
+        self._rows = [None] * segment.term_count
+        self._freqs = [None] * segment.term_count
+        self.version += 1
+
+    # ------------------------------------------------------------------
+    def _replay(self, log: Path) -> None:
+        """Apply the records of ``log``; a torn last line is skipped."""
+
+        with log.open(encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "add" in record:
+                    self.add(
+                        TextDoc(text=d["text"], tags=d.get("tags") or {})
+                        for d in record["add"]
+                    )
+                    self._logged += len(record["add"])
+                else:
+                    self._logged += self.delete(record["delete"])
+
+    # ------------------------------------------------------------------
+    def _log(self, record: Dict[str, Any], count: int) -> None:
+        """Append ``record`` covering ``count`` rows to the log.
+
+        Writes a new segment once the log grew too long.
+        """
+
+        assert self.path is not None
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._log_path(self.path).open("a", encoding="utf-8") as fh:
+            fh.write(line)
+        self._logged += count
+        if self._logged > max(MIN_CHECKPOINT_RECORDS, CHECKPOINT_RATIO * self.size):
+            self.save()
+
+    # ------------------------------------------------------------------
+    def save(self) -> None:
+        """Write the index to a new segment in :attr:`path` and start a new log.
+
+        Postings that were not read since the index was opened are copied
+        from the current segment without decoding them. Raises ``ValueError``
+        for in-memory indexes.
+        """
+
+        if self.path is None:
+            raise ValueError("The lexical index has no directory to save to")
+        self._write(self.path / SEGMENT_NAME, self.generation + 1)
+        previous = self._log_path(self.path)
+        self.generation += 1
+        self._logged = 0
+        previous.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    def _write(self, target: Path, generation: int) -> None:
+        """Write the index as segment ``generation`` to ``target``."""
+
+        segment = self._segment
+        base = segment.term_count if segment is not None else 0
+        names: Dict[int, bytes] = {}
+        if segment is not None:
+            names = {term_id: segment.term(term_id) for term_id in range(base)}
+        for term, term_id in list(self._terms.items()):
+            if term_id >= base:
+                names[term_id] = term.encode("utf-8")
+        order = sorted((name, i) for i, name in names.items())
+        encoded: Dict[int, Tuple[bytes, bytes]] = {}
+        decoded: List[int] = []
+        for _, term_id in order:
+            if segment is not None and self._rows[term_id] is None:
+                encoded[term_id] = segment.encoded_postings(term_id)
+            else:
+                decoded.append(term_id)
+        postings = [
+            tuple(np.frombuffer(a, dtype=np.int64) for a in self._lists(term_id))
+            for term_id in decoded
+        ]
+        encoded.update(zip(decoded, encode_postings(postings)))
+        terms = [
+            (name, int(self._df[i]), int(self._max_tf[i])) + encoded[i]
+            for name, i in order
+        ]
+        size = self.size
+        docs = self.docs
+        if isinstance(docs, SegmentDocs):
+            lines = (docs.encoded(row) for row in range(size))
+        else:
+            lines = (encode_doc(doc) for doc in docs[:size])
+        header = {
+            "generation": generation,
+            "size": size,
+            "live_count": self.live_count,
+            "total_length": self.total_length,
+        }
+        files = [
+            (name.encode("utf-8"), rows)
+            for name, rows in self._file_table(size).items()
+        ]
+        write_segment(
+            target,
+            header,
+            self._doc_len[:size],
+            self._live[:size],
+            lines,
+            terms,
+            sorted(files, key=lambda f: f[0]),
+        )
+
+    # ------------------------------------------------------------------
+    def _term_id(self, term: str) -> int | None:
+        """Return the id of ``term``, looking it up in the segment if needed."""
+
+        term_id = self._terms.get(term)
+        if term_id is None and self._segment is not None:
+            term_id = self._segment.term_id(term)
+            if term_id is not None:
+                self._terms[term] = term_id
+        return term_id
+
+    # ------------------------------------------------------------------
+    def _lists(self, term_id: int) -> Tuple[array, array]:
+        """Return the postings of ``term_id``, decoding them on first use."""
+
+        rows = self._rows[term_id]
+        if rows is None:
+            with self._load_lock:
+                rows = self._rows[term_id]
+                if rows is None:
+                    assert self._segment is not None
+                    decoded_rows, freqs = self._segment.postings(term_id)
+                    # Frequencies first: readers bound both lists by the rows.
+                    self._freqs[term_id] = array("q", freqs.tobytes())
+                    rows = self._rows[term_id] = array("q", decoded_rows.tobytes())
+        return rows, self._freqs[term_id]  # type: ignore[return-value]
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _grown(values: np.ndarray, needed: int) -> np.ndarray:
+        """Return ``values`` with room for ``needed`` entries, doubling."""
+
+        if needed <= len(values):
+            return values
+        capacity = len(values)
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros(capacity, dtype=values.dtype)
+        grown[: len(values)] = values
+        return grown
+
+    # ------------------------------------------------------------------
+    def add(self, docs: Iterable[TextDoc]) -> List[int]:
+        """Append ``docs`` and return their rows."""
+
+        docs = list(docs)
+        if not docs:
+            return []
+        start = self.size
+        self._doc_len = self._grown(self._doc_len, start + len(docs))
+        self._live = self._grown(self._live, start + len(docs))
+        for row, doc in enumerate(docs, start):
+            counts = Counter(tokenize(doc.text))
+            for term, freq in counts.items():
+                term_id = self._term_id(term)
+                if term_id is None:
+                    term_id = len(self._rows)
+                    self._df = self._grown(self._df, term_id + 1)
+                    self._max_tf = self._grown(self._max_tf, term_id + 1)
+                    self._rows.append(array("q"))
+                    self._freqs.append(array("q"))
+                    self._terms[term] = term_id
+                rows, freqs = self._lists(term_id)
+                # Frequencies first: readers bound both lists by the rows.
+                freqs.append(freq)
+                rows.append(row)
+                self._df[term_id] += 1
+                if freq > self._max_tf[term_id]:
+                    self._max_tf[term_id] = freq
+            length = sum(counts.values())
+            self._doc_len[row] = length
+            self._live[row] = True
+            self.total_length += length
+            file_id = doc.tags.get("file_id")
+            if file_id is not None:
+                self._files.setdefault(str(file_id), array("q")).append(row)
+        self.docs.extend(docs)
+        self.live_count += len(docs)
+        self.size += len(docs)
+        self.version += 1
+        if self.path is not None:
+            self._log(
+                {"add": [{"text": doc.text, "tags": doc.tags} for doc in docs]},
+                len(docs),
+            )
+        return list(range(start, self.size))
+
+    # ------------------------------------------------------------------
+    def delete(self, rows: Iterable[int]) -> int:
+        """Tombstone ``rows`` and remove them from the statistics.
+
+        Rows that are unknown or already deleted are ignored. Returns the
+        number of tombstoned rows.
+        """
+
+        deleted: List[int] = []
+        for row in rows:
+            row = int(row)
+            if row >= self.size or not self._live[row]:
+                continue
+            self._live[row] = False
+            for term in set(tokenize(self.docs[row].text)):
+                self._df[self._term_id(term)] -= 1
+            self.total_length -= int(self._doc_len[row])
+            deleted.append(row)
+        if deleted:
+            self.live_count -= len(deleted)
+            self.version += 1
+            if self.path is not None:
+                self._log({"delete": deleted}, len(deleted))
+        return len(deleted)
+
+    # ------------------------------------------------------------------
+    def _segment_file_rows(self) -> Dict[str, np.ndarray]:
+        """Return the file table of a format 1 segment, scanning it once."""
+
+        with self._load_lock:
+            if self._segment_files is None:
+                assert self._segment is not None
+                found: Dict[str, List[int]] = {}
+                for row in range(self._segment.size):
+                    file_id = self._segment.doc(row).tags.get("file_id")
+                    if file_id is not None:
+                        found.setdefault(str(file_id), []).append(row)
+                self._segment_files = {
+                    name: np.asarray(rows, dtype=np.int64)
+                    for name, rows in found.items()
+                }
+            return self._segment_files
+
+    # ------------------------------------------------------------------
+    def file_rows(self, file_id: str) -> np.ndarray:
+        """Return the live rows of the documents tagged ``file_id``, ascending.
+
+        Reads the segment's file table and the rows appended since, so the
+        cost follows the number of chunks of ``file_id``, not the corpus.
+        """
+
+        appended = self._files.get(file_id, array("q"))
+        parts = [np.frombuffer(appended[:], dtype=np.int64)]
+        segment = self._segment
+        if segment is not None:
+            if segment.has_files:
+                parts.insert(0, segment.file_rows(file_id))
+            else:
+                empty = np.empty(0, dtype=np.int64)
+                parts.insert(0, self._segment_file_rows().get(file_id, empty))
+        rows = np.concatenate(parts)
+        return rows[self._live[rows]]
+
+    # ------------------------------------------------------------------
+    def _file_table(self, size: int) -> Dict[str, np.ndarray]:
+        """Return the live rows below ``size`` of every ``file_id``."""
+
+        table: Dict[str, np.ndarray] = {}
+        segment = self._segment
+        if segment is not None:
+            stored = (
+                segment.files()
+                if segment.has_files
+                else self._segment_file_rows().items()
+            )
+            table.update(stored)
+        for name, appended in self._files.items():
+            rows = np.frombuffer(appended[:], dtype=np.int64)
+            if name in table:
+                rows = np.concatenate([table[name], rows])
+            table[name] = rows
+        live = {}
+        for name, rows in table.items():
+            rows = rows[rows < size]
+            rows = rows[self._live[rows]]
+            if len(rows):
+                live[name] = rows
+        return live
+
+    # ------------------------------------------------------------------
+    @property
+    def dead_count(self) -> int:
+        """Number of tombstoned rows still held in the postings."""
+
+        return self.size - self.live_count
+
+    # ------------------------------------------------------------------
+    @property
+    def avgdl(self) -> float:
+        """Average length of the live documents."""
+
+        return self.total_length / self.live_count if self.live_count else 0.0
+
+    # ------------------------------------------------------------------
+    @property
+    def vocabulary_size(self) -> int:
+        """Number of terms occurring in at least one live document."""
+
+        return int(np.count_nonzero(self._df[: len(self._rows)]))
+
+    # ------------------------------------------------------------------
+    def live_mask(self, size: int | None = None) -> np.ndarray:
+        """Return a copy of the live flags of the first ``size`` rows."""
+
+        size = self.size if size is None else size
+        return self._live[:size].copy()
+
+    # ------------------------------------------------------------------
+    def live_docs(self) -> List[TextDoc]:
+        """Return the live documents in row order."""
+
+        size = self.size
+        return [doc for doc, live in zip(self.docs[:size], self._live[:size]) if live]
+
+    # ------------------------------------------------------------------
+    def compact(self) -> "LexicalIndex":
+        """Return a new index holding only the live documents.
+
+        A persistent index is replaced on disk by the compacted one. Runs
+        both compaction phases at once; callers that must keep updating the
+        index meanwhile use :meth:`start_compaction` and
+        :meth:`finish_compaction`.
+        """
+
+        size = self.size
+        live = self.live_mask(size)
+        compacted = self.start_compaction(size, live)
+        self.finish_compaction(compacted, size, live)
+        return compacted
+
+    # ------------------------------------------------------------------
+    def start_compaction(self, size: int, live: np.ndarray) -> "LexicalIndex":
+        """Build a compacted index of the rows below ``size`` flagged in ``live``.
+
+        Only reads rows below ``size``, so it may run while another thread
+        appends to or deletes from this index. A persistent index's compacted
+        segment is staged next to the current one; :meth:`finish_compaction`
+        applies the changes made since and swaps it in.
+        """
+
+        docs = self.docs[:size]
+        compacted = LexicalIndex(
+            (doc for doc, keep in zip(docs, live) if keep),
+            self.k1,
+            self.b,
+            self.epsilon,
+        )
+        if self.path is not None:
+            compacted._write(self.path / STAGED_SEGMENT_NAME, self.generation + 1)
+            compacted.generation = self.generation + 1
+        return compacted
+
+    # ------------------------------------------------------------------
+    def finish_compaction(
+        self, compacted: "LexicalIndex", size: int, live: np.ndarray
+    ) -> None:
+        """Bring ``compacted`` up to date with this index and persist it.
+
+        ``size`` and ``live`` are those passed to :meth:`start_compaction`.
+        Rows deleted and live rows appended since are applied to
+        ``compacted``; the caller serialises this with other updates. The cost
+        follows the number of changes, except when a checkpoint of this index
+        ran in between and the compacted index is saved in full.
+        """
+
+        kept = np.flatnonzero(live)
+        deleted = kept[~self._live[kept]]
+        appended = [
+            self.docs[row] for row in range(size, self.size) if self._live[row]
+        ]
+        compacted.delete(np.searchsorted(kept, deleted))
+        compacted.add(appended)
+        if self.path is None:
+            return
+        staged = self.path / STAGED_SEGMENT_NAME
+        compacted.path = self.path
+        if compacted.generation != self.generation + 1:
+            # A checkpoint took the staged generation; write a fresh segment.
+            staged.unlink(missing_ok=True)
+            compacted.generation = self.generation
+            compacted.save()
+            return
+        # Log first: a crash before the swap leaves the old segment and log.
+        lines = []
+        if len(deleted):
+            record = {"delete": np.searchsorted(kept, deleted).tolist()}
+            lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+        if appended:
+            record = {"add": [{"text": d.text, "tags": d.tags} for d in appended]}
+            lines.append(json.dumps(record, separators=(",", ":")) + "\n")
+        with compacted._log_path(self.path).open("w", encoding="utf-8") as fh:
+            fh.writelines(lines)
+        compacted._logged = len(deleted) + len(appended)
+        os.replace(staged, self.path / SEGMENT_NAME)
+        self._log_path(self.path).unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    def idf(self, term: str) -> float:
+        """Return the BM25Okapi idf of ``term``; 0 for unknown terms."""
+
+        term_id = self._term_id(term)
+        df = int(self._df[term_id]) if term_id is not None else 0
+        if not df:
+            return 0.0
+        value = math.log(self.live_count - df + 0.5) - math.log(df + 0.5)
+        if value >= 0:
+            return value
+        version, average = self._average_idf
+        if version != self.version:
+            dfs = self._df[: len(self._rows)]
+            dfs = dfs[dfs > 0]
+            idfs = np.log(self.live_count - dfs + 0.5) - np.log(dfs + 0.5)
+            version, average = self.version, float(idfs.sum() / len(idfs))
+            self._average_idf = (version, average)
+        return self.epsilon * average
+
+    # ------------------------------------------------------------------
+    def postings(
+        self, term: str, size: int | None = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the live ``(rows, frequencies)`` of ``term`` below ``size``."""
+
+        size = self.size if size is None else size
+        term_id = self._term_id(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        row_list, freq_list = self._lists(term_id)
+        # Slicing copies under the GIL, so a concurrent append cannot interfere.
+        rows = np.frombuffer(row_list[:], dtype=np.int64)
+        freqs = np.frombuffer(freq_list[: len(rows)], dtype=np.int64)
+        keep = rows < size
+        keep[keep] = self._live[rows[keep]]
+        return rows[keep], freqs[keep]
+
+    # ------------------------------------------------------------------
+    def _gains(self, rows: np.ndarray, freqs: np.ndarray, avgdl: float) -> np.ndarray:
+        """Return the BM25 term-frequency factor of ``freqs`` in ``rows``."""
+
+        norm = self.k1 * (1 - self.b + self.b * self._doc_len[rows] / avgdl)
+        return freqs * (self.k1 + 1) / (freqs + norm)
+
+    # ------------------------------------------------------------------
+    def _max_gain(self, term: str) -> float:
+        """Return an upper bound of :meth:`_gains` over the postings of ``term``."""
+
+        term_id = self._term_id(term)
+        if term_id is None:
+            return 0.0
+        top = float(self._max_tf[term_id])
+        # The factor grows with the frequency and is largest for empty documents.
+        return top * (self.k1 + 1) / (top + self.k1 * (1 - self.b))
+
+    # ------------------------------------------------------------------
+    def search(
+        self,
+        terms: Sequence[str],
+        top_k: int,
+        size: int | None = None,
+        accept: RowFilter | None = None,
+        cache: Dict[str, Tuple[np.ndarray, np.ndarray]] | None = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the best ``top_k`` rows for ``terms`` and their scores.
+
+        Only rows containing a query term are scored; results are best first
+        with ties broken by row, and when fewer than ``top_k`` rows score above
+        0 the first unmatched rows are ranked with score 0, as in a full
+        ranking of :meth:`get_scores` (whose scores these equal up to
+        floating-point summation order). ``accept`` restricts the rows that may
+        be returned (e.g. to a metadata filter); ``cache`` holds the accepted
+        postings per term and may be shared by queries with the same ``size``
+        and ``accept``. MaxScore pruning is skipped when a query term has a
+        negative (floored) idf, because partial scores would then not bound
+        the final ones.
+        """
+
+        size = self.size if size is None else size
+        rows = np.empty(0, dtype=np.int64)
+        scores = np.empty(0)
+        if top_k <= 0 or not self.live_count:
+            return rows, scores
+        cache = {} if cache is None else cache
+        avgdl = self.avgdl
+        weights = Counter(terms)
+        idfs = {term: self.idf(term) for term in weights}
+        bounds = {
+            term: weights[term] * idfs[term] * self._max_gain(term) for term in weights
+        }
+        prune = all(idf >= 0 for idf in idfs.values())
+        order = sorted(weights, key=bounds.__getitem__, reverse=True)
+        essential = True
+        # Dense accumulator and its touched rows, once candidates are many.
+        dense: np.ndarray | None = None
+        touched = np.zeros(0, dtype=bool)
+        for i, term in enumerate(order):
+            # Summed afresh rather than decremented, so no rounding residue
+            # drives the bound below 0 once only zero-bound terms are left.
+            remaining = sum(bounds[t] for t in order[i:])
+            # The k-th best score can only beat ``remaining`` if the best does.
+            current = scores if dense is None else dense
+            if prune and len(current) and current.max() > remaining:
+                if dense is not None:
+                    rows = np.flatnonzero(touched)
+                    scores = dense[rows]
+                if len(scores) >= top_k:
+                    kth = _kth_largest(scores, top_k)
+                    # Partial and full sums of the same gains may differ by
+                    # rounding; rows tied with the k-th must survive it.
+                    kth -= PRUNE_TOLERANCE * abs(kth)
+                    # Rows outside the candidates can no longer reach the top k,
+                    # nor can candidates that stay below it with every term left.
+                    essential = essential and remaining >= kth
+                    if not essential:
+                        dense = None
+                        keep = scores + remaining >= kth
+                        rows, scores = rows[keep], scores[keep]
+            postings = cache.get(term)
+            if postings is None:
+                postings = self.postings(term, size)
+                if accept is not None and len(postings[0]):
+                    keep = accept(postings[0])
+                    postings = (postings[0][keep], postings[1][keep])
+                cache[term] = postings
+            term_rows, freqs = postings
+            if not len(term_rows):
+                continue
+            weight = weights[term] * idfs[term]
+            if not essential:
+                # Postings are sorted by row, so candidates are found by bisection.
+                pos = np.minimum(np.searchsorted(term_rows, rows), len(term_rows) - 1)
+                hit = term_rows[pos] == rows
+                if hit.any():
+                    pos = pos[hit]
+                    scores[hit] += weight * self._gains(
+                        term_rows[pos], freqs[pos], avgdl
+                    )
+                continue
+            gains = weight * self._gains(term_rows, freqs, avgdl)
+            if dense is None and len(rows) + len(term_rows) > DENSE_RATIO * size:
+                dense = np.zeros(size)
+                touched = np.zeros(size, dtype=bool)
+                dense[rows] = scores
+                touched[rows] = True
+            if dense is not None:
+                dense[term_rows] += gains
+                touched[term_rows] = True
+                continue
+            rows, inverse = np.unique(
+                np.concatenate([rows, term_rows]), return_inverse=True
+            )
+            scores = np.bincount(
+                inverse, weights=np.concatenate([scores, gains]), minlength=len(rows)
+            )
+        if dense is not None:
+            rows = np.flatnonzero(touched)
+            scores = dense[rows]
+
+        positive = int(np.count_nonzero(scores > 0))
+        if positive < top_k:
+            # Pruning never ran, so ``rows`` holds every match; unmatched rows
+            # score 0 and rank like in a full ranking, before negative scores.
+            padding = self._unmatched(rows, top_k - positive, size, accept)
+            rows = np.concatenate([rows, padding])
+            scores = np.concatenate([scores, np.zeros(len(padding))])
+        if len(scores) > top_k:
+            keep = scores >= _kth_largest(scores, top_k)
+            rows, scores = rows[keep], scores[keep]
+        order = np.lexsort((rows, -scores))[:top_k]
+        return rows[order], scores[order]
+
+    # ------------------------------------------------------------------
+    def _unmatched(
+        self, matched: np.ndarray, count: int, size: int, accept: RowFilter | None
+    ) -> np.ndarray:
+        """Return the first ``count`` live, accepted rows not in ``matched``.
+
+        ``matched`` is sorted. Rows are scanned in blocks, so the cost follows
+        ``count`` unless most rows are tombstoned or filtered out.
+        """
+
+        found: List[np.ndarray] = []
+        block = max(4 * count, INITIAL_CAPACITY)
+        for start in range(0, size, block):
+            rows = np.arange(start, min(start + block, size))
+            rows = rows[self._live[rows]]
+            if len(matched):
+                pos = np.minimum(np.searchsorted(matched, rows), len(matched) - 1)
+                rows = rows[matched[pos] != rows]
+            if accept is not None and len(rows):
+                rows = rows[accept(rows)]
+            found.append(rows[:count])
+            count -= len(found[-1])
+            if not count:
+                break
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    def get_scores(self, terms: Sequence[str], size: int | None = None) -> np.ndarray:
+        """Return the BM25 score of every row below ``size`` for ``terms``.
+
+        Matches ``BM25Okapi.get_scores`` over the live documents; repeated
+        terms count repeatedly and tombstoned rows score 0.
+        """
+
+        size = self.size if size is None else size
+        scores = np.zeros(size)
+        if not self.live_count:
+            return scores
+        avgdl = self.avgdl
+        for term in terms:
+            rows, freqs = self.postings(term, size)
+            if not len(rows):
+                continue
+            scores[rows] += self.idf(term) * self._gains(rows, freqs, avgdl)
+        return scores
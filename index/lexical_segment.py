@@ -0,0 +1,398 @@
+"""On-disk segment format of the persistent lexical index.
+
+A segment is one memory-mapped file holding a complete
+:class:`~index.lexical.LexicalIndex`::
+
+    b"RAGLEX\\0\\0" | format version (uint32) | header length (uint32) | header
+    | sections, each starting on a 64-byte boundary
+
+The JSON header records the segment ``generation``, the collection statistics
+(``size``, ``live_count``, ``total_length``), the number of ``terms`` and, for
+every section, its byte ``offset`` (relative to the first section), ``dtype``
+and ``shape``:
+
+``doc_len``, ``live``
+    Token count and live flag of every row; tombstoned rows are kept so the
+    rows of a segment and of the log written after it line up.
+``doc_offsets``, ``docs``
+    Documents as JSON lines (``text`` and ``tags``) and the byte offset of
+    every line.
+``term_offsets``, ``terms``
+    The term dictionary: UTF-8 terms in byte order, looked up by bisection.
+``df``, ``max_tf``
+    Live document frequency and largest term frequency per term.
+``row_offsets``, ``rows``, ``freq_offsets``, ``freqs``
+    Postings per term: ascending rows as delta-encoded varints (LEB128) and
+    their term frequencies as varints.
+``file_offsets``, ``files``, ``file_row_offsets``, ``file_rows``
+    The live rows of every ``file_id`` tag: UTF-8 file IDs in byte order,
+    looked up by bisection, and their ascending rows. ``file_row_offsets``
+    counts rows, not bytes. Segments of format 1 have no such sections.
+
+Opening a segment only maps the file; postings and documents are decoded
+when first read.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+from index.embedding_store import TextDoc
+
+FORMAT_VERSION = 2
+MAGIC = b"RAGLEX\0\0"
+PREFIX = struct.Struct("<8sII")
+ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    """Round ``offset`` up to the next section boundary."""
+
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _encode(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Return the LEB128 bytes of ``values`` and the byte count of each."""
+
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    rest = values >> np.uint64(7)
+    while rest.any():
+        lengths += rest > 0
+        rest >>= np.uint64(7)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max(initial=0))):
+        has = lengths > k
+        low = (values[has] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[has] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has] + k] = low | more
+    return out, lengths
+
+
+def encode_varints(values: np.ndarray) -> np.ndarray:
+    """Return the LEB128 encoding of the non-negative integers ``values``."""
+
+    return _encode(values)[0]
+
+
+def decode_varints(data: np.ndarray) -> np.ndarray:
+    """Decode the LEB128 bytes ``data`` into ``int64`` values."""
+
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.int64)
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate([[0], ends[:-1] + 1])
+    position = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.int64) << (7 * position)
+    return np.add.reduceat(parts, starts)
+
+
+def _split(values: np.ndarray, counts: np.ndarray) -> List[bytes]:
+    """Encode ``values`` and split the bytes into runs of ``counts`` values."""
+
+    data, lengths = _encode(values)
+    ends = np.cumsum(lengths)[np.cumsum(counts) - 1]
+    return [chunk.tobytes() for chunk in np.split(data, ends[:-1])]
+
+
+def encode_postings(
+    postings: Sequence[Tuple[np.ndarray, np.ndarray]],
+) -> List[Tuple[bytes, bytes]]:
+    """Encode the non-empty ``(rows, freqs)`` of several terms in one pass.
+
+    Rows are ascending and stored as deltas; the first row of every term is
+    stored as is.
+    """
+
+    if not postings:
+        return []
+    counts = np.fromiter((len(rows) for rows, _ in postings), dtype=np.int64)
+    rows = np.concatenate([rows for rows, _ in postings]).astype(np.int64)
+    deltas = np.diff(rows, prepend=0)
+    firsts = np.cumsum(counts) - counts
+    deltas[firsts] = rows[firsts]
+    freqs = np.concatenate([freqs for _, freqs in postings])
+    return list(zip(_split(deltas, counts), _split(freqs, counts)))
+
+
+def encode_doc(doc: TextDoc) -> bytes:
+    """Return ``doc`` as one JSON line."""
+
+    record = {"text": doc.text, "tags": doc.tags}
+    return json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def write_segment(
+    path: Path,
+    header: Mapping[str, Any],
+    doc_len: np.ndarray,
+    live: np.ndarray,
+    docs: Iterable[bytes],
+    terms: Sequence[Tuple[bytes, int, int, bytes, bytes]],
+    files: Sequence[Tuple[bytes, np.ndarray]] = (),
+) -> None:
+    """Write a segment to ``path``, replacing it atomically.
+
+    ``header`` holds the generation and collection statistics. ``docs`` are
+    encoded documents in row order (see :func:`encode_doc`) and ``terms``
+    holds ``(term, df, max_tf, rows, freqs)`` in byte order of the terms,
+    with postings already encoded (see :func:`encode_postings`). ``files``
+    holds ``(file_id, rows)`` in byte order of the file IDs.
+    """
+
+    doc_blob = bytearray()
+    doc_offsets = [0]
+    for line in docs:
+        doc_blob += line
+        doc_offsets.append(len(doc_blob))
+    parts: Dict[str, bytes] = {
+        "doc_len": np.asarray(doc_len, dtype=np.uint32).tobytes(),
+        "live": np.asarray(live, dtype=bool).tobytes(),
+        "doc_offsets": np.asarray(doc_offsets, dtype=np.uint64).tobytes(),
+        "docs": bytes(doc_blob),
+        "term_offsets": _offsets(t[0] for t in terms),
+        "terms": b"".join(t[0] for t in terms),
+        "df": np.asarray([t[1] for t in terms], dtype=np.uint32).tobytes(),
+        "max_tf": np.asarray([t[2] for t in terms], dtype=np.uint32).tobytes(),
+        "row_offsets": _offsets(t[3] for t in terms),
+        "rows": b"".join(t[3] for t in terms),
+        "freq_offsets": _offsets(t[4] for t in terms),
+        "freqs": b"".join(t[4] for t in terms),
+        "file_offsets": _offsets(f[0] for f in files),
+        "files": b"".join(f[0] for f in files),
+        "file_row_offsets": np.concatenate(
+            [[0], np.cumsum([len(f[1]) for f in files], dtype=np.int64)]
+        )
+        .astype(np.uint64)
+        .tobytes(),
+        "file_rows": np.concatenate(
+            [np.empty(0, dtype=np.uint64)] + [f[1] for f in files]
+        )
+        .astype(np.uint64)
+        .tobytes(),
+    }
+    dtypes = {
+        "doc_len": "uint32",
+        "live": "bool",
+        "df": "uint32",
+        "max_tf": "uint32",
+        "file_rows": "uint64",
+    }
+    sections: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    for name, data in parts.items():
+        dtype = dtypes.get(name, "uint64" if name.endswith("offsets") else "uint8")
+        count = len(data) // np.dtype(dtype).itemsize
+        sections[name] = {"offset": offset, "dtype": dtype, "shape": [count]}
+        offset = _aligned(offset + len(data))
+    encoded = json.dumps(
+        {**header, "version": FORMAT_VERSION, "terms": len(terms), "sections": sections}
+    ).encode("utf-8")
+    base = _aligned(PREFIX.size + len(encoded))
+
+    partial = path.with_name(path.name + ".partial")
+    with partial.open("wb") as out:
+        out.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+        out.write(encoded)
+        for name, data in parts.items():
+            out.seek(base + sections[name]["offset"])
+            out.write(data)
+        # Empty trailing sections still start inside the file.
+        out.truncate(base + offset)
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(partial, path)
+
+
+def _offsets(chunks: Iterable[bytes]) -> bytes:
+    """Return the ``uint64`` start offsets of ``chunks`` plus the total length."""
+
+    lengths = np.fromiter((len(c) for c in chunks), dtype=np.uint64)
+    return np.concatenate([[0], np.cumsum(lengths)]).astype(np.uint64).tobytes()
+
+
+class Segment:
+    """A segment file mapped read-only; see the module docstring."""
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        prefix = self._map[: PREFIX.size]
+        if len(prefix) < PREFIX.size or PREFIX.unpack(prefix)[0] != MAGIC:
+            raise ValueError(f"{self.path} is not a lexical index segment")
+        _, version, length = PREFIX.unpack(prefix)
+        if version > FORMAT_VERSION:
+            raise ValueError(
+                f"Lexical segment format {version} is newer than supported "
+                f"({FORMAT_VERSION})"
+            )
+        self.header: Dict[str, Any] = json.loads(
+            self._map[PREFIX.size : PREFIX.size + length]
+        )
+        self._base = _aligned(PREFIX.size + length)
+        self.size: int = self.header["size"]
+        self.term_count: int = self.header["terms"]
+        self.generation: int = self.header["generation"]
+        self._term_offsets = self.array("term_offsets")
+        self._doc_offsets = self.array("doc_offsets")
+        self._row_offsets = self.array("row_offsets")
+        self._freq_offsets = self.array("freq_offsets")
+        self.has_files = "files" in self.header["sections"]
+        if self.has_files:
+            self._file_offsets = self.array("file_offsets")
+            self._file_row_offsets = self.array("file_row_offsets")
+            self._file_rows = self.array("file_rows")
+
+    # ------------------------------------------------------------------
+    def array(self, name: str) -> np.ndarray:
+        """Return section ``name`` as a read-only array over the mapping."""
+
+        section = self.header["sections"][name]
+        return np.frombuffer(
+            self._map,
+            dtype=section["dtype"],
+            count=section["shape"][0],
+            offset=self._base + section["offset"],
+        )
+
+    # ------------------------------------------------------------------
+    def _bytes(self, name: str, offsets: np.ndarray, index: int) -> bytes:
+        """Return entry ``index`` of the variable-length section ``name``."""
+
+        start = self._base + self.header["sections"][name]["offset"]
+        return self._map[start + int(offsets[index]) : start + int(offsets[index + 1])]
+
+    # ------------------------------------------------------------------
+    def term(self, term_id: int) -> bytes:
+        """Return the UTF-8 term with id ``term_id``."""
+
+        return self._bytes("terms", self._term_offsets, term_id)
+
+    # ------------------------------------------------------------------
+    def term_id(self, term: str) -> int | None:
+        """Return the id of ``term`` by bisecting the dictionary, or ``None``."""
+
+        return self._find("terms", self._term_offsets, term)
+
+    # ------------------------------------------------------------------
+    def _find(self, name: str, offsets: np.ndarray, key: str) -> int | None:
+        """Return the index of ``key`` in the sorted section ``name``, or ``None``."""
+
+        encoded = key.encode("utf-8")
+        count = len(offsets) - 1
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._bytes(name, offsets, mid) < encoded:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < count and self._bytes(name, offsets, lo) == encoded:
+            return lo
+        return None
+
+    # ------------------------------------------------------------------
+    def file_rows(self, file_id: str) -> np.ndarray:
+        """Return the rows of ``file_id`` that were live when the segment was written.
+
+        Segments without a file table (format 1) raise ``ValueError``.
+        """
+
+        if not self.has_files:
+            raise ValueError(f"{self.path} has no file table")
+        index = self._find("files", self._file_offsets, file_id)
+        if index is None:
+            return np.empty(0, dtype=np.int64)
+        start, end = self._file_row_offsets[index : index + 2]
+        return self._file_rows[int(start) : int(end)].astype(np.int64)
+
+    # ------------------------------------------------------------------
+    def files(self) -> Iterator[Tuple[str, np.ndarray]]:
+        """Yield ``(file_id, rows)`` for every entry of the file table."""
+
+        if not self.has_files:
+            raise ValueError(f"{self.path} has no file table")
+        for index in range(len(self._file_offsets) - 1):
+            name = self._bytes("files", self._file_offsets, index).decode("utf-8")
+            start, end = self._file_row_offsets[index : index + 2]
+            yield name, self._file_rows[int(start) : int(end)].astype(np.int64)
+
+    # ------------------------------------------------------------------
+    def encoded_postings(self, term_id: int) -> Tuple[bytes, bytes]:
+        """Return the still encoded rows and frequencies of ``term_id``."""
+
+        return (
+            self._bytes("rows", self._row_offsets, term_id),
+            self._bytes("freqs", self._freq_offsets, term_id),
+        )
+
+    # ------------------------------------------------------------------
+    def postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the decoded ``(rows, frequencies)`` of ``term_id``."""
+
+        rows, freqs = self.encoded_postings(term_id)
+        return (
+            np.cumsum(decode_varints(np.frombuffer(rows, dtype=np.uint8))),
+            decode_varints(np.frombuffer(freqs, dtype=np.uint8)),
+        )
+
+    # ------------------------------------------------------------------
+    def encoded_doc(self, row: int) -> bytes:
+        """Return the JSON line of the document in ``row``."""
+
+        return self._bytes("docs", self._doc_offsets, row)
+
+    # ------------------------------------------------------------------
+    def doc(self, row: int) -> TextDoc:
+        """Decode the document in ``row``."""
+
+        record = json.loads(self.encoded_doc(row))
+        return TextDoc(text=record["text"], tags=record.get("tags") or {})
+
+
+class SegmentDocs:
+    """The documents of a segment followed by those appended since.
+
+    Behaves like the ``list`` of documents of an in-memory index; documents
+    of the segment are decoded on access.
+    """
+
+    def __init__(self, segment: Segment) -> None:
+        self.segment = segment
+        self._appended: List[TextDoc] = []
+
+    def __len__(self) -> int:
+        return self.segment.size + len(self._appended)
+
+    def __getitem__(self, key: int | slice) -> Any:
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if key < self.segment.size:
+            return self.segment.doc(key)
+        return self._appended[key - self.segment.size]
+
+    def __iter__(self) -> Iterator[TextDoc]:
+        for row in range(len(self)):
+            yield self[row]
+
+    def extend(self, docs: Iterable[TextDoc]) -> None:
+        self._appended.extend(docs)
+
+    def encoded(self, row: int) -> bytes:
+        """Return the JSON line of ``row`` without decoding stored documents."""
+
+        if row < self.segment.size:
+            return self.segment.encoded_doc(row)
+        return encode_doc(self[row])
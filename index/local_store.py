@@ -0,0 +1,847 @@
+"""Embedded, memory-mapped vector index used instead of Qdrant.
+
+:class:`LocalEmbeddingStore` keeps every collection in its own directory below
+``LOCAL_INDEX_DIR``: L2-normalised embeddings in a ``float16`` or ``int8``
+``.npy`` memory map, the point ID of each slot in a second memory map, and
+the payloads in an append-only JSON-lines log next to them. Opening a
+collection maps the files rather than reading them, so the service starts
+without an external process and without loading the vectors. Payloads are
+replayed on first use.
+
+Top-k queries are blocked NumPy matrix products over the live slots. With
+``nlist`` set, vectors are additionally assigned to ``nlist`` coarse k-means
+partitions (IVF) once there are enough of them, and queries only scan the
+``nprobe`` partitions whose centroids are closest to the query; pass
+``search_params={"exact": True}`` to scan everything. Metadata ``filters``
+(see :mod:`index.filters`) first select the matching slots through a
+per-document ID map and then score only those.
+
+Select it with ``VECTOR_BACKEND=local``. It implements the add, search,
+replace and delete interface of :class:`~index.embedding_store.EmbeddingStore`
+and shares its model loading, length-bucketed encoding and embedding cache.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Sequence
+
+import numpy as np
+
+from index import filters as payload_filters
+from index.embedding_store import (
+    DEFAULT_COLLECTION,
+    EmbeddingStore,
+    SearchHit,
+    TextDoc,
+    is_legacy_point,
+    point_id,
+)
+from index.vector_config import VectorConfig
+
+DEFAULT_DIRECTORY = "./data/vectors"
+DTYPES = ("float16", "int8")
+DEFAULT_NPROBE = 8
+INITIAL_CAPACITY = 1024
+# IVF partitions are trained once there are this many vectors per partition.
+MIN_POINTS_PER_LIST = 39
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE_PER_LIST = 256
+SCAN_BLOCK = 65_536
+INT8_SCALE = 127.0
+DEFAULT_COMPACT_RATIO = 2.0
+DEFAULT_MIN_COMPACT_RECORDS = 1000
+
+_ID_DTYPE = "S32"
+_COLLECTION_NAME = re.compile(r"[A-Za-z0-9_-][A-Za-z0-9._-]*")
+
+
+class LocalEmbeddingStore(EmbeddingStore):
+    """Store and query embeddings in local memory-mapped files."""
+
+    def __init__(
+        self,
+        model_name: str | None = None,
+        collection_name: str = DEFAULT_COLLECTION,
+        *,
+        directory: str | Path | None = None,
+        dtype: str | None = None,
+        nlist: int | None = None,
+        nprobe: int | None = None,
+        batch_size: int | None = None,
+        cache_dir: str | None = None,
+        cache_size: int | None = None,
+        backend: str | None = None,
+        filter_tags: Mapping[str, Any] | None = None,
+    ) -> None:
+        """Initialize the store and open ``collection_name``.
+
+        Parameters
+        ----------
+        model_name, batch_size, cache_dir, cache_size, backend:
+            Embedding settings, as for :class:`EmbeddingStore`.
+        filter_tags:
+            Tags searches may filter on, as for :class:`EmbeddingStore`.
+        collection_name:
+            Collection to open; created if missing. Names may only contain
+            letters, digits, ``.``, ``_`` and ``-``.
+        directory:
+            Root directory holding one sub-directory per collection. Defaults
+            to the ``LOCAL_INDEX_DIR`` env var or ``./data/vectors``.
+        dtype:
+            Storage type of new collections, ``float16`` or ``int8``. Defaults
+            to ``LOCAL_INDEX_DTYPE`` or ``float16``; existing collections keep
+            the type they were created with.
+        nlist:
+            Number of IVF partitions; ``0`` always scans every vector.
+            Defaults to ``LOCAL_INDEX_NLIST`` or ``0``.
+        nprobe:
+            Partitions scanned per query. Defaults to ``LOCAL_INDEX_NPROBE``
+            or 8.
+        """
+
+        self.client = None
+        self.async_client = None
+        self.vector_config = VectorConfig()
+        self.sparse_vectors = False
+        self.filter_tags = dict(
+            filter_tags
+            if filter_tags is not None
+            else payload_filters.tag_indexes(os.environ.get("FILTER_TAGS"))
+        )
+        self.collection_name = collection_name
+        self._load_encoder(model_name, batch_size, cache_dir, cache_size, backend)
+        self.directory = Path(
+            directory or os.environ.get("LOCAL_INDEX_DIR", DEFAULT_DIRECTORY)
+        )
+        self.default_dtype = (
+            dtype or os.environ.get("LOCAL_INDEX_DTYPE", "float16")
+        ).lower()
+        if self.default_dtype not in DTYPES:
+            raise ValueError(f"Unknown local index dtype: {self.default_dtype}")
+        self.nlist = (
+            nlist if nlist is not None else int(os.environ.get("LOCAL_INDEX_NLIST", 0))
+        )
+        self.nprobe = nprobe or int(
+            os.environ.get("LOCAL_INDEX_NPROBE", DEFAULT_NPROBE)
+        )
+        self._open()
+
+    # ------------------------------------------------------------------
+    def for_collection(self, collection_name: str) -> "LocalEmbeddingStore":
+        """Return a store for ``collection_name`` sharing the model and cache."""
+
+        store = copy.copy(self)
+        store.collection_name = collection_name
+        store._open()
+        return store
+
+    # ------------------------------------------------------------------
+    def _open(self) -> None:
+        """Map the files of :attr:`collection_name`, creating them if needed."""
+
+        if not _COLLECTION_NAME.fullmatch(self.collection_name):
+            raise ValueError(f"Invalid collection name: {self.collection_name}")
+        self.path = self.directory / self.collection_name
+        self._lock = threading.RLock()
+        self._load()
+
+    # ------------------------------------------------------------------
+    def _load(self) -> None:
+        """(Re)load the memory maps and derived state from :attr:`path`."""
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._dropped = False
+        dim = self.model.get_sentence_embedding_dimension()
+        try:
+            self._vectors = np.load(self.path / "vectors.npy", mmap_mode="r+")
+            self._ids = np.load(self.path / "ids.npy", mmap_mode="r+")
+            self._lists = np.load(self.path / "lists.npy", mmap_mode="r+")
+        except OSError:
+            self._vectors = self._allocate("vectors", (INITIAL_CAPACITY, dim))
+            self._ids = self._allocate("ids", (INITIAL_CAPACITY,))
+            self._lists = self._allocate("lists", (INITIAL_CAPACITY,))
+        if self._vectors.shape[1] != dim:
+            raise ValueError(
+                f"Collection {self.collection_name} holds "
+                f"{self._vectors.shape[1]}-d vectors but the model produces "
+                f"{dim}-d embeddings"
+            )
+        self.dtype = self._vectors.dtype.name
+        try:
+            self._centroids: np.ndarray | None = np.load(self.path / "centroids.npy")
+        except OSError:
+            self._centroids = None
+
+        self._live = self._ids != b""
+        live = np.flatnonzero(self._live)
+        self._size = int(live[-1]) + 1 if len(live) else 0
+        self._slots = {
+            uid.decode(): int(slot) for uid, slot in zip(self._ids[live], live)
+        }
+        self._free = np.flatnonzero(~self._live[: self._size]).tolist()
+        self._payloads: Dict[str, Dict[str, Any]] | None = None
+        self._files: Dict[str, set[str]] = {}
+        self._records = 0
+
+    # ------------------------------------------------------------------
+    def _allocate(self, name: str, shape: tuple[int, ...]) -> np.ndarray:
+        """Create the empty memory map ``name`` of the given ``shape``."""
+
+        dtypes = {"vectors": self.default_dtype, "ids": _ID_DTYPE, "lists": np.int32}
+        array = np.lib.format.open_memmap(
+            self.path / f"{name}.npy", mode="w+", dtype=dtypes[name], shape=shape
+        )
+        if name == "lists":
+            array[:] = -1
+        return array
+
+    # ------------------------------------------------------------------
+    def _grow(self, capacity: int) -> None:
+        """Resize the memory maps to hold ``capacity`` slots. Caller holds the lock."""
+
+        for name in ("vectors", "ids", "lists"):
+            old = getattr(self, f"_{name}")
+            tmp = self.path / f"{name}.tmp.npy"
+            grown = np.lib.format.open_memmap(
+                tmp, mode="w+", dtype=old.dtype, shape=(capacity,) + old.shape[1:]
+            )
+            grown[: len(old)] = old
+            if name == "lists":
+                grown[len(old) :] = -1
+            grown.flush()
+            del grown
+            os.replace(tmp, self.path / f"{name}.npy")
+            grown = np.load(self.path / f"{name}.npy", mmap_mode="r+")
+            setattr(self, f"_{name}", grown)
+        live = np.zeros(capacity, dtype=bool)
+        live[: len(self._live)] = self._live
+        self._live = live
+
+    # ------------------------------------------------------------------
+    def _reserve(self, count: int) -> np.ndarray:
+        """Return ``count`` free slots, growing the maps if needed.
+
+        Caller holds the lock.
+        """
+
+        reused = self._free[:count]
+        del self._free[:count]
+        fresh = count - len(reused)
+        if self._size + fresh > len(self._ids):
+            capacity = len(self._ids)
+            while capacity < self._size + fresh:
+                capacity *= 2
+            self._grow(capacity)
+        slots = reused + list(range(self._size, self._size + fresh))
+        self._size += fresh
+        return np.asarray(slots, dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    def _quantize(self, vectors: Any) -> np.ndarray:
+        """Normalise ``vectors`` and convert them to the storage dtype."""
+
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        if self.dtype == "int8":
+            return np.round(vectors * INT8_SCALE).astype(np.int8)
+        return vectors.astype(np.float16)
+
+    # ------------------------------------------------------------------
+    def _scores(self, rows: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Return cosine similarities between stored ``rows`` and ``queries``."""
+
+        scores = queries @ rows.astype(np.float32).T
+        if rows.dtype == np.int8:
+            scores /= INT8_SCALE
+        return scores
+
+    # ------------------------------------------------------------------
+    def _payload_map(self) -> Dict[str, Dict[str, Any]]:
+        """Return the payloads by point ID, replaying the log on first use."""
+
+        with self._lock:
+            if self._payloads is not None:
+                return self._payloads
+            payloads: Dict[str, Dict[str, Any]] = {}
+            log = self.path / "payloads.jsonl"
+            if log.exists():
+                with log.open(encoding="utf-8") as fh:
+                    for line in fh:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            continue
+                        self._records += 1
+                        if record.get("payload") is not None:
+                            payloads[record["id"]] = record["payload"]
+                        elif "tags" in record and record["id"] in payloads:
+                            payloads[record["id"]]["tags"] = record["tags"]
+                        else:
+                            payloads.pop(record["id"], None)
+            # Slots written after their payload record was torn keep no payload.
+            self._payloads = {uid: payloads.get(uid, {}) for uid in self._slots}
+            self._rekey_legacy_points(
+                [u for u, p in self._payloads.items() if is_legacy_point(u, p)]
+            )
+            for uid, payload in self._payloads.items():
+                self._index_file(uid, payload)
+            return self._payloads
+
+    # ------------------------------------------------------------------
+    def _rekey_legacy_points(self, ids: Sequence[str]) -> None:
+        """Rename the text-keyed slots ``ids`` to their document-scoped IDs.
+
+        Caller holds the lock. Vectors stay in their slots; a point whose new
+        ID is already stored is deleted. The new payload records are logged
+        before the slots are renamed and the old ones dropped after, so a
+        crash in between leaves every slot with its payload.
+        """
+
+        if not ids:
+            return
+        payloads = self._payloads
+        assert payloads is not None
+        renamed: Dict[str, str] = {}
+        for uid in ids:
+            payload = payloads[uid]
+            new = point_id(payload["text"], payload["tags"]["file_id"])
+            if new not in self._slots and new not in renamed.values():
+                renamed[uid] = new
+        self._log({"id": renamed[uid], "payload": payloads[uid]} for uid in renamed)
+        dropped = []
+        for uid in ids:
+            slot = self._slots.pop(uid)
+            payload = payloads.pop(uid)
+            if uid in renamed:
+                self._slots[renamed[uid]] = slot
+                payloads[renamed[uid]] = payload
+                self._ids[slot] = renamed[uid].encode()
+            else:
+                dropped.append(slot)
+        slots = np.asarray(dropped, dtype=np.int64)
+        self._ids[slots] = b""
+        self._vectors[slots] = 0
+        self._lists[slots] = -1
+        self._live[slots] = False
+        self._free.extend(dropped)
+        self._flush()
+        self._log({"id": uid, "payload": None} for uid in ids)
+
+    # ------------------------------------------------------------------
+    def _index_file(
+        self, uid: str, payload: Mapping[str, Any], add: bool = True
+    ) -> None:
+        """Add ``uid`` to (or remove it from) its document's ID set."""
+
+        file_id = payload.get("tags", {}).get("file_id")
+        if file_id is None:
+            return
+        if add:
+            self._files.setdefault(file_id, set()).add(uid)
+        else:
+            ids = self._files.get(file_id, set())
+            ids.discard(uid)
+            if not ids:
+                self._files.pop(file_id, None)
+
+    # ------------------------------------------------------------------
+    def _log(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Append payload ``records`` and compact the log when it grew too long.
+
+        Caller holds the lock and has already applied ``records`` in memory.
+        """
+
+        lines = [json.dumps(record) + "\n" for record in records]
+        with (self.path / "payloads.jsonl").open("a", encoding="utf-8") as fh:
+            fh.writelines(lines)
+        self._records += len(lines)
+        live = len(self._payloads or {})
+        if self._records > max(
+            DEFAULT_MIN_COMPACT_RECORDS, DEFAULT_COMPACT_RATIO * live
+        ):
+            tmp = self.path / "payloads.jsonl.tmp"
+            with tmp.open("w", encoding="utf-8") as fh:
+                for uid, payload in (self._payloads or {}).items():
+                    fh.write(json.dumps({"id": uid, "payload": payload}) + "\n")
+            tmp.replace(self.path / "payloads.jsonl")
+            self._records = live
+
+    # ------------------------------------------------------------------
+    def _flush(self) -> None:
+        """Flush the memory maps to disk."""
+
+        self._vectors.flush()
+        self._ids.flush()
+        self._lists.flush()
+
+    # ------------------------------------------------------------------
+    def _rebuild_hash_index(self) -> None:
+        """No-op: duplicates are detected from the in-memory slot map."""
+
+    # ------------------------------------------------------------------
+    def migrate_vector_config(self) -> None:
+        """No-op: Qdrant vector settings do not apply to the local index."""
+
+    # ------------------------------------------------------------------
+    def enable_sparse_vectors(self) -> None:
+        """Raise ``ValueError``: the local index has no sparse vectors."""
+
+        raise ValueError("LEXICAL_BACKEND=qdrant requires VECTOR_BACKEND=qdrant")
+
+    # ------------------------------------------------------------------
+    def add_texts(
+        self, texts: Iterable[str], metadatas: Iterable[Dict[str, Any]] | None = None
+    ) -> List[str]:
+        """Add ``texts`` and their ``metadatas`` to the store.
+
+        Chunks whose :func:`~index.embedding_store.point_id` is already
+        stored are skipped; the rest are embedded in batches, written to free
+        slots and assigned to their closest IVF partition. Returns the newly
+        inserted IDs.
+        """
+
+        texts = list(texts)
+        if metadatas is None:
+            metadatas = [{} for _ in texts]  # type: ignore[misc]
+        self._payload_map()
+        candidates: Dict[str, tuple[str, str, Dict[str, Any]]] = {}
+        for text, metadata in zip(texts, metadatas):
+            full_hash = self._sha256(text)
+            uid = point_id(text, metadata.get("file_id"))
+            if uid not in self._slots:
+                candidates.setdefault(uid, (full_hash, text, metadata))
+        if not candidates:
+            return []
+
+        ids = list(candidates)
+        embeddings = self._embed(
+            [candidates[uid][1] for uid in ids], [candidates[uid][0] for uid in ids]
+        )
+        with self._lock:
+            keep = [i for i, uid in enumerate(ids) if uid not in self._slots]
+            ids = [ids[i] for i in keep]
+            if not ids:
+                return []
+            records = []
+            for uid in ids:
+                full_hash, text, metadata = candidates[uid]
+                payload = TextDoc(text=text, tags=metadata).model_dump(exclude={"id"})
+                payload["hash"] = full_hash
+                records.append(payload)
+            self._write(ids, [embeddings[i] for i in keep], records)
+        return ids
+
+    # ------------------------------------------------------------------
+    def _write(
+        self, ids: List[str], vectors: Any, payloads: List[Dict[str, Any]]
+    ) -> None:
+        """Store new points in free slots and train IVF once there are enough.
+
+        Caller holds the lock and has checked that no ID is stored yet. A
+        dropped collection is recreated on disk first.
+        """
+
+        if self._dropped:
+            self._load()
+            self._payload_map()
+        vectors = self._quantize(vectors)
+        records = []
+        for uid, payload in zip(ids, payloads):
+            self._payloads[uid] = payload  # type: ignore[index]
+            self._index_file(uid, payload)
+            records.append({"id": uid, "payload": payload})
+        self._log(records)
+
+        slots = self._reserve(len(ids))
+        self._vectors[slots] = vectors
+        self._ids[slots] = [uid.encode() for uid in ids]
+        if self._centroids is not None:
+            self._lists[slots] = self._assign(vectors)
+        self._live[slots] = True
+        self._slots.update(zip(ids, slots.tolist()))
+        self._flush()
+        if (
+            self.nlist
+            and self._centroids is None
+            and len(self._slots) >= self.nlist * MIN_POINTS_PER_LIST
+        ):
+            self.build_ivf()
+
+    # ------------------------------------------------------------------
+    def file_point_ids(self, file_id: str) -> set[str]:
+        """Return the IDs of all points tagged with ``file_id``."""
+
+        self._payload_map()
+        with self._lock:
+            return set(self._files.get(file_id, ()))
+
+    # ------------------------------------------------------------------
+    def replace_file(
+        self,
+        file_id: str,
+        texts: Iterable[str],
+        metadatas: Iterable[Dict[str, Any]] | None = None,
+    ) -> tuple[List[str], List[str], List[str]]:
+        """Make ``texts`` the current version of document ``file_id``.
+
+        Behaves like :meth:`EmbeddingStore.replace_file`: unchanged chunks
+        keep their vectors and get their tags refreshed, new chunks are
+        embedded and vanished ones are deleted. Returns ``(added, kept,
+        removed)`` point ID lists.
+        """
+
+        texts = list(texts)
+        if metadatas is None:
+            metadatas = [{} for _ in texts]  # type: ignore[misc]
+        new: Dict[str, tuple[str, Dict[str, Any]]] = {}
+        for text, metadata in zip(texts, metadatas):
+            metadata = {**metadata, "file_id": file_id}
+            new.setdefault(point_id(text, file_id), (text, metadata))
+        old = self.file_point_ids(file_id)
+
+        kept = [uid for uid in new if uid in old]
+        removed = [uid for uid in old if uid not in new]
+        fresh = [uid for uid in new if uid not in old]
+        added = self.add_texts(
+            [new[uid][0] for uid in fresh], [new[uid][1] for uid in fresh]
+        )
+        if kept:
+            payloads = self._payload_map()
+            with self._lock:
+                for uid in kept:
+                    self._index_file(uid, payloads[uid], add=False)
+                    payloads[uid]["tags"] = new[uid][1]
+                    self._index_file(uid, payloads[uid])
+                self._log({"id": uid, "tags": new[uid][1]} for uid in kept)
+        self.delete(removed)
+        return added, kept, removed
+
+    # ------------------------------------------------------------------
+    def delete(self, ids: Iterable[str]) -> None:
+        """Delete the points with the given ``ids``; unknown IDs are ignored.
+
+        Freed slots are zeroed and reused by later inserts.
+        """
+
+        payloads = self._payload_map()
+        with self._lock:
+            removed = [uid for uid in ids if uid in self._slots]
+            if not removed:
+                return
+            slots = np.asarray([self._slots.pop(uid) for uid in removed])
+            for uid in removed:
+                self._index_file(uid, payloads.pop(uid, {}), add=False)
+            self._log({"id": uid, "payload": None} for uid in removed)
+            self._ids[slots] = b""
+            self._vectors[slots] = 0
+            self._lists[slots] = -1
+            self._live[slots] = False
+            self._free.extend(slots.tolist())
+            self._flush()
+
+    # ------------------------------------------------------------------
+    def delete_file(self, file_id: str) -> None:
+        """Delete every point tagged with ``file_id``."""
+
+        self.delete(self.file_point_ids(file_id))
+
+    # ------------------------------------------------------------------
+    def scroll_points(
+        self, batch_size: int = 1024
+    ) -> Iterator[tuple[List[str], np.ndarray, List[Dict[str, Any]]]]:
+        """Yield ``(ids, vectors, payloads)`` pages covering the whole collection.
+
+        Vectors are returned as ``float32``; ``int8`` rows are rescaled to
+        unit length.
+        """
+
+        payloads = self._payload_map()
+        for start in range(0, self._size, batch_size):
+            with self._lock:
+                stop = min(start + batch_size, self._size)
+                slots = np.flatnonzero(self._live[start:stop]) + start
+                if not len(slots):
+                    continue
+                ids = [self._ids[slot].decode() for slot in slots]
+                vectors = self._vectors[slots].astype(np.float32)
+                page = [copy.deepcopy(payloads.get(uid, {})) for uid in ids]
+            yield ids, _normalize(vectors), page
+
+    # ------------------------------------------------------------------
+    def upsert_points(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]] | np.ndarray,
+        payloads: Sequence[Dict[str, Any]],
+    ) -> None:
+        """Write points with precomputed ``vectors``; existing IDs are replaced."""
+
+        if not len(ids):
+            return
+        self._payload_map()
+        with self._lock:
+            self.delete([uid for uid in ids if uid in self._slots])
+            self._write(list(ids), vectors, [dict(p) for p in payloads])
+
+    # ------------------------------------------------------------------
+    def count(self) -> int:
+        """Return the number of stored points."""
+
+        return len(self._slots)
+
+    # ------------------------------------------------------------------
+    def list_collections(self) -> List[str]:
+        """Return the names of all collections below :attr:`directory`."""
+
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            p.name for p in self.directory.iterdir() if (p / "ids.npy").exists()
+        )
+
+    # ------------------------------------------------------------------
+    def delete_collection(self) -> None:
+        """Delete every point and file of the collection.
+
+        The store stays usable but empty, without recreating the directory,
+        so the collection disappears from :meth:`list_collections`; the next
+        write creates it again.
+        """
+
+        with self._lock:
+            shutil.rmtree(self.path, ignore_errors=True)
+            dim = self.model.get_sentence_embedding_dimension()
+            self._vectors = np.zeros((0, dim), dtype=self.dtype)
+            self._ids = np.zeros(0, dtype=_ID_DTYPE)
+            self._lists = np.zeros(0, dtype=np.int32)
+            self._centroids = None
+            self._live = np.zeros(0, dtype=bool)
+            self._size = 0
+            self._slots = {}
+            self._free = []
+            self._payloads = {}
+            self._files = {}
+            self._records = 0
+            self._dropped = True
+
+    # ------------------------------------------------------------------
+    def build_ivf(self) -> None:
+        """(Re)train the IVF partitions and reassign every stored vector.
+
+        Runs automatically once a collection first holds ``nlist *
+        MIN_POINTS_PER_LIST`` vectors; call it again after the corpus has
+        grown or drifted substantially.
+        """
+
+        with self._lock:
+            live = np.flatnonzero(self._live[: self._size])
+            if not self.nlist or len(live) < self.nlist:
+                return
+            rng = np.random.default_rng(0)
+            sample = rng.choice(
+                live,
+                min(len(live), self.nlist * KMEANS_SAMPLE_PER_LIST),
+                replace=False,
+            )
+            data = _normalize(self._vectors[np.sort(sample)].astype(np.float32))
+            centroids = data[rng.choice(len(data), self.nlist, replace=False)]
+            for _ in range(KMEANS_ITERATIONS):
+                assignment = np.argmax(data @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, data)
+                filled = np.bincount(assignment, minlength=self.nlist) > 0
+                centroids[filled] = _normalize(sums[filled])
+            self._centroids = centroids
+            np.save(self.path / "centroids.tmp.npy", centroids)
+            os.replace(self.path / "centroids.tmp.npy", self.path / "centroids.npy")
+            for start in range(0, self._size, SCAN_BLOCK):
+                stop = min(start + SCAN_BLOCK, self._size)
+                self._lists[start:stop] = self._assign(self._vectors[start:stop])
+            self._lists[: self._size][~self._live[: self._size]] = -1
+            self._lists.flush()
+
+    # ------------------------------------------------------------------
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Return the closest IVF partition of every stored-format vector."""
+
+        return np.argmax(self._scores(vectors, self._centroids), axis=0)
+
+    # ------------------------------------------------------------------
+    def _search_vectors(
+        self,
+        queries: np.ndarray,
+        top_k: int,
+        with_payload: Sequence[str] | bool,
+        exact: bool,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[List[SearchHit]]:
+        """Return the ``top_k`` hits of every query embedding in ``queries``.
+
+        Raises ``ValueError`` for filters on tags outside :attr:`filter_tags`,
+        like the Qdrant store.
+        """
+
+        unindexed = payload_filters.unindexed_tags(filters, self.filter_tags)
+        if unindexed:
+            raise ValueError(f"Cannot filter on unindexed tags: {', '.join(unindexed)}")
+        queries = _normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        payloads = self._payload_map()
+        with self._lock:
+            vectors, lists, size = self._vectors, self._lists, self._size
+            live, centroids = self._live[:size], self._centroids
+
+        if payload_filters.normalize(filters) is not None:
+            candidates = self._filter_slots(filters)
+            scores = self._scores(vectors[candidates], queries)
+            ranked = [_top_k(row, candidates, top_k) for row in scores]
+        elif centroids is None or exact:
+            ranked = self._scan(vectors, size, live, queries, top_k)
+        else:
+            lists = lists[:size]
+            probes = np.argsort(-(queries @ centroids.T), axis=1)[:, : self.nprobe]
+            unassigned = live & (lists < 0)
+            ranked = []
+            for query, probe in zip(queries, probes):
+                candidates = np.flatnonzero(
+                    (live & np.isin(lists, probe)) | unassigned
+                )
+                scores = self._scores(vectors[candidates], query[None, :])[0]
+                ranked.append(_top_k(scores, candidates, top_k))
+
+        results = []
+        with self._lock:
+            for scores, slots in ranked:
+                hits = []
+                for score, slot in zip(scores.tolist(), slots.tolist()):
+                    uid = self._ids[slot].decode()
+                    # Skip slots deleted while the query was being scored.
+                    if uid in payloads:
+                        payload = _select(payloads[uid], with_payload)
+                        hits.append(SearchHit(uid, score, payload))
+                results.append(hits)
+        return results
+
+    # ------------------------------------------------------------------
+    def _filter_slots(self, filters: Mapping[str, Any]) -> np.ndarray:
+        """Return the sorted slots of the chunks matching ``filters``."""
+
+        payloads = self._payload_map()
+        file_ids = payload_filters.normalize(filters).get("file_id")
+        with self._lock:
+            if file_ids is None:
+                ids: Iterable[str] = list(self._slots)
+            else:
+                ids = set().union(*(self._files.get(f, ()) for f in file_ids))
+            slots = [
+                self._slots[uid]
+                for uid in ids
+                if payload_filters.matches(payloads[uid].get("tags", {}), filters)
+            ]
+        return np.asarray(sorted(slots), dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    def _scan(
+        self,
+        vectors: np.ndarray,
+        size: int,
+        live: np.ndarray,
+        queries: np.ndarray,
+        top_k: int,
+    ) -> List[tuple[np.ndarray, np.ndarray]]:
+        """Score every live slot in blocks, keeping a running top-k per query."""
+
+        best = [
+            (np.empty(0, np.float32), np.empty(0, np.int64)) for _ in queries
+        ]
+        for start in range(0, size, SCAN_BLOCK):
+            stop = min(start + SCAN_BLOCK, size)
+            scores = self._scores(vectors[start:stop], queries)
+            scores[:, ~live[start:stop]] = -np.inf
+            slots = np.arange(start, stop)
+            for i, row in enumerate(scores):
+                merged = np.concatenate([best[i][0], row])
+                merged_slots = np.concatenate([best[i][1], slots])
+                best[i] = _top_k(merged, merged_slots, top_k)
+        return [
+            (scores[np.isfinite(scores)], slots[np.isfinite(scores)])
+            for scores, slots in best
+        ]
+
+    # ------------------------------------------------------------------
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        with_payload: Sequence[str] | bool = ("text", "tags"),
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[SearchHit]:
+        """Search the store with ``query`` and return scored hits.
+
+        Of ``search_params`` only ``exact`` applies: it bypasses the IVF
+        partitions. Filtered searches score every matching chunk exactly.
+        See :meth:`EmbeddingStore.search` for the other arguments.
+        """
+
+        return self.search_batch(
+            [query], top_k, with_payload, search_params, filters
+        )[0]
+
+    # ------------------------------------------------------------------
+    def search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int = 5,
+        with_payload: Sequence[str] | bool = ("text", "tags"),
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[List[SearchHit]]:
+        """Search the store with every query in ``queries`` at once.
+
+        All queries are encoded in one ``encode`` call and scored with one
+        matrix product per block of stored vectors.
+        """
+
+        if not queries:
+            return []
+        vectors = self.model.encode(list(queries), batch_size=self.batch_size)
+        exact = bool((search_params or {}).get("exact"))
+        return self._search_vectors(vectors, top_k, with_payload, exact, filters)
+
+
+# ----------------------------------------------------------------------
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return ``vectors`` scaled to unit L2 norm along the last axis."""
+
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+# ----------------------------------------------------------------------
+def _top_k(
+    scores: np.ndarray, slots: np.ndarray, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Return the ``k`` highest ``scores`` and their ``slots``, best first."""
+
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        scores, slots = scores[part], slots[part]
+    order = np.argsort(-scores, kind="stable")
+    return scores[order], slots[order]
+
+
+# ----------------------------------------------------------------------
+def _select(
+    payload: Mapping[str, Any], with_payload: Sequence[str] | bool
+) -> Dict[str, Any]:
+    """Return the fields of ``payload`` requested by ``with_payload``."""
+
+    if isinstance(with_payload, bool):
+        return dict(payload) if with_payload else {}
+    return {key: payload[key] for key in with_payload if key in payload}
@@ -0,0 +1,192 @@
+"""Quantized ONNX Runtime embedding backend.
+
+:class:`QuantizedOnnxEncoder` exports a sentence-transformers model to ONNX,
+applies dynamic int8 quantization with Optimum and runs it through ONNX
+Runtime's CPU execution provider. It mirrors the small part of the
+``SentenceTransformer`` API used by :class:`~index.embedding_store.EmbeddingStore`
+(``encode`` and ``get_sentence_embedding_dimension``), so the two are
+interchangeable. Sentence embeddings are mean-pooled over the attention mask
+and L2-normalised, matching the pooling of the MiniLM/MPNet family.
+
+``optimum[onnxruntime]`` is an optional dependency and only imported when the
+backend is selected. :func:`parity_report` compares the quantized vectors
+with the reference model; run ``python -m index.onnx_backend`` to print it.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+DEFAULT_EXPORT_DIR = Path(".cache") / "onnx"
+DEFAULT_MAX_SEQ_LENGTH = 256
+
+
+def mean_pool(hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Average token embeddings in ``hidden`` over the attention ``mask``."""
+
+    weights = mask[..., None].astype(hidden.dtype)
+    summed = (hidden * weights).sum(axis=1)
+    return summed / np.clip(weights.sum(axis=1), 1e-9, None)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row of ``vectors`` to unit L2 norm."""
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class QuantizedOnnxEncoder:
+    """Encode sentences with an int8-quantized ONNX export of a model."""
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        export_dir: str | Path | None = None,
+        max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH,
+        num_threads: int | None = None,
+    ) -> None:
+        """Load the quantized export of ``model_name``, creating it if needed.
+
+        Parameters
+        ----------
+        model_name:
+            Hugging Face model name or local path of the reference model.
+        export_dir:
+            Directory holding exported models. Defaults to ``ONNX_EXPORT_DIR``
+            or ``.cache/onnx``; each model gets its own sub-directory.
+        max_seq_length:
+            Token limit per sentence, as in ``SentenceTransformer``.
+        num_threads:
+            Intra-op threads for ONNX Runtime. Defaults to all cores.
+        """
+
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        root = Path(export_dir or os.environ.get("ONNX_EXPORT_DIR", DEFAULT_EXPORT_DIR))
+        self.path = root / re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)
+        quantized = self.path / "model_quantized.onnx"
+        if not quantized.exists():
+            self._export(model_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.path)
+        self.max_seq_length = max_seq_length
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            str(quantized), options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        self._dim = int(self.encode("dimension probe").shape[0])
+
+    # ------------------------------------------------------------------
+    def _export(self, model_name: str) -> None:
+        """Export ``model_name`` to ONNX and quantize its weights to int8."""
+
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(self.path)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(self.path)
+        quantizer = ORTQuantizer.from_pretrained(self.path)
+        config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=self.path, quantization_config=config)
+
+    # ------------------------------------------------------------------
+    def get_sentence_embedding_dimension(self) -> int:
+        """Return the embedding dimension."""
+
+        return self._dim
+
+    # ------------------------------------------------------------------
+    def encode(
+        self, sentences: str | Sequence[str], batch_size: int = 32
+    ) -> np.ndarray:
+        """Return normalised embeddings for ``sentences``.
+
+        A single string yields a 1-D vector, a sequence a 2-D array.
+        """
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        outputs: List[np.ndarray] = []
+        for start in range(0, len(texts), batch_size):
+            batch = self.tokenizer(
+                texts[start : start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            feeds = {k: v for k, v in batch.items() if k in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+            outputs.append(normalize(mean_pool(hidden, batch["attention_mask"])))
+        vectors = (
+            np.concatenate(outputs) if outputs else np.zeros((0, 0), dtype=np.float32)
+        )
+        return vectors[0] if single else vectors
+
+
+def parity_report(
+    reference: Any, candidate: Any, texts: Sequence[str], batch_size: int = 32
+) -> Dict[str, float]:
+    """Compare ``candidate`` embeddings against ``reference`` on ``texts``.
+
+    Returns the minimum and mean cosine similarity between paired vectors and
+    the encoding time of each model in milliseconds.
+    """
+
+    started = time.perf_counter()
+    ref = np.asarray(reference.encode(list(texts), batch_size=batch_size))
+    ref_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    cand = np.asarray(candidate.encode(list(texts), batch_size=batch_size))
+    cand_ms = (time.perf_counter() - started) * 1000
+    if ref.shape != cand.shape:
+        raise ValueError(f"Dimension mismatch: {ref.shape} vs {cand.shape}")
+    cosine = (normalize(ref) * normalize(cand)).sum(axis=1)
+    return {
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "reference_ms": ref_ms,
+        "candidate_ms": cand_ms,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--model",
+        default=os.environ.get(
+            "TRANSFORMERS_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
+        ),
+    )
+    parser.add_argument("--samples", type=int, default=256)
+    args = parser.parse_args()
+
+    sample = [
+        f"Quarterly report {i}: revenue grew while operating costs declined."
+        if i % 2
+        else f"Section {i} describes the ingestion pipeline and its retry policy."
+        for i in range(args.samples)
+    ]
+    report = parity_report(
+        SentenceTransformer(args.model), QuantizedOnnxEncoder(args.model), sample
+    )
+    for key, value in report.items():
+        print(f"{key}: {value:.4f}")
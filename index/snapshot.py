@@ -0,0 +1,354 @@
+"""Binary snapshots of a whole collection: vectors, payloads, lexical index, graph.
+
+A snapshot is a single, memory-mappable file::
+
+    b"RAGSNAP\\0" | format version (uint32) | header length (uint32) | header
+    | sections, each starting on a 64-byte boundary
+
+The JSON header records the source collection, embedding model and dimension,
+the point count, the BM25 corpus statistics and, for every section, its byte
+``offset`` (relative to the first section) and ``dtype``/``shape`` or
+``length``:
+
+``ids``
+    Point IDs as ``S32``.
+``vectors``
+    One embedding per point, ``float32`` or ``float16``.
+``payloads``
+    JSON lines, one payload per point in the order of ``ids``.
+``lexical``
+    IDs of the lexical (BM25) corpus in corpus order. Without it, e.g. for a
+    retriever with the ``qdrant`` lexical backend, every point is a lexical
+    document.
+``graph``
+    Optional NetworkX entity graph as node-link JSON.
+
+:func:`export_collection` streams the store page by page
+(:meth:`~index.embedding_store.EmbeddingStore.scroll_points`), so memory stays
+bounded by ``batch_size``. :func:`import_collection` maps the file and writes
+it back with bulk upserts of the stored vectors; nothing is re-embedded. BM25
+statistics are derived from the corpus texts, so the lexical index is rebuilt
+from the restored payloads in the recorded order. A store with sparse vectors
+computes them from the payload texts on upsert, which is also how an existing
+collection gains them: restore its snapshot into a new collection.
+
+Run ``python -m index.snapshot export COLLECTION PATH`` or
+``python -m index.snapshot import PATH [--collection NAME]``.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+import time
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
+
+import numpy as np
+
+from index.embedding_store import EmbeddingStore, TextDoc
+
+if TYPE_CHECKING:  # pragma: no cover - imported for annotations only
+    from retriever.base import BaseRetriever
+
+try:
+    import networkx as nx
+except Exception:  # pragma: no cover - networkx is optional at runtime
+    nx = None  # type: ignore
+
+FORMAT_VERSION = 1
+MAGIC = b"RAGSNAP\0"
+PREFIX = struct.Struct("<8sII")
+ALIGN = 64
+DEFAULT_BATCH_SIZE = 1024
+VECTOR_DTYPES = ("float32", "float16")
+
+
+def _aligned(offset: int) -> int:
+    """Round ``offset`` up to the next section boundary."""
+
+    return -(-offset // ALIGN) * ALIGN
+
+
+def export_collection(
+    store: EmbeddingStore,
+    path: str | os.PathLike[str],
+    *,
+    retriever: "BaseRetriever | None" = None,
+    dtype: str = "float32",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """Write the collection of ``store`` to the snapshot file ``path``.
+
+    ``retriever`` contributes its lexical corpus and, when it is a NetworkX
+    graph, its entity graph. ``dtype="float16"`` halves the size of the
+    vectors. The file is written next to ``path`` and moved into place when
+    complete. Returns the snapshot header.
+    """
+
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    dim = store.model.get_sentence_embedding_dimension()
+    count = 0
+    with tempfile.TemporaryDirectory(dir=path.parent) as tmp:
+        parts = {name: Path(tmp) / name for name in ("ids", "vectors", "payloads")}
+        with (
+            parts["ids"].open("wb") as ids_fh,
+            parts["vectors"].open("wb") as vectors_fh,
+            parts["payloads"].open("wb") as payloads_fh,
+        ):
+            for ids, vectors, payloads in store.scroll_points(batch_size):
+                dim = vectors.shape[1]
+                ids_fh.write(np.asarray(ids, dtype="S32").tobytes())
+                vectors_fh.write(np.ascontiguousarray(vectors, dtype=dtype).tobytes())
+                payloads_fh.writelines(
+                    json.dumps(p, separators=(",", ":")).encode("utf-8") + b"\n"
+                    for p in payloads
+                )
+                count += len(ids)
+
+        sections: Dict[str, Dict[str, Any]] = {
+            "ids": {"dtype": "S32", "shape": [count]},
+            "vectors": {"dtype": dtype, "shape": [count, dim]},
+            "payloads": {},
+        }
+        lexical: Dict[str, Any] | None = None
+        if retriever is not None:
+            if retriever.lexical_backend == "memory":
+                lexical_ids = retriever.lexical_ids()
+                lexical = {
+                    "documents": len(lexical_ids),
+                    "avgdl": retriever.lexical.avgdl,
+                    "terms": retriever.lexical.vocabulary_size,
+                }
+                parts["lexical"] = Path(tmp) / "lexical"
+                parts["lexical"].write_bytes(
+                    np.asarray(lexical_ids, dtype="S32").tobytes()
+                )
+                sections["lexical"] = {"dtype": "S32", "shape": [len(lexical_ids)]}
+            if nx and isinstance(retriever.graph, nx.Graph):
+                parts["graph"] = Path(tmp) / "graph"
+                data = nx.node_link_data(retriever.graph, edges="edges")
+                parts["graph"].write_text(json.dumps(data), encoding="utf-8")
+                sections["graph"] = {}
+
+        offset = 0
+        for name, section in sections.items():
+            size = parts[name].stat().st_size
+            section["offset"] = offset
+            if "dtype" not in section:
+                section["length"] = size
+            offset = _aligned(offset + size)
+        header = {
+            "version": FORMAT_VERSION,
+            "collection": store.collection_name,
+            "model": store.model_name,
+            "dim": dim,
+            "count": count,
+            "created": time.time(),
+            "lexical": lexical,
+            "sections": sections,
+        }
+        encoded = json.dumps(header).encode("utf-8")
+        base = _aligned(PREFIX.size + len(encoded))
+
+        partial = path.with_name(path.name + ".partial")
+        with partial.open("wb") as out:
+            out.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            out.write(encoded)
+            for name, section in sections.items():
+                out.seek(base + section["offset"])
+                with parts[name].open("rb") as fh:
+                    shutil.copyfileobj(fh, out)
+        os.replace(partial, path)
+    return header
+
+
+class Snapshot:
+    """A snapshot file opened for reading; array sections are memory maps."""
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as fh:
+            prefix = fh.read(PREFIX.size)
+            if len(prefix) < PREFIX.size:
+                raise ValueError(f"{self.path} is not a collection snapshot")
+            magic, version, length = PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a collection snapshot")
+            if version > FORMAT_VERSION:
+                raise ValueError(
+                    f"Snapshot format {version} is newer than supported "
+                    f"({FORMAT_VERSION})"
+                )
+            self.header: Dict[str, Any] = json.loads(fh.read(length))
+        self._base = _aligned(PREFIX.size + length)
+
+    # ------------------------------------------------------------------
+    def array(self, name: str) -> np.ndarray | None:
+        """Return section ``name`` as a read-only memory map, if present."""
+
+        section = self.header["sections"].get(name)
+        if section is None:
+            return None
+        shape = tuple(section["shape"])
+        if not np.prod(shape):
+            return np.empty(shape, dtype=section["dtype"])
+        return np.memmap(
+            self.path,
+            dtype=section["dtype"],
+            mode="r",
+            offset=self._base + section["offset"],
+            shape=shape,
+        )
+
+    # ------------------------------------------------------------------
+    @property
+    def ids(self) -> np.ndarray:
+        """Point IDs as ``S32`` bytes."""
+
+        return self.array("ids")  # type: ignore[return-value]
+
+    # ------------------------------------------------------------------
+    @property
+    def vectors(self) -> np.ndarray:
+        """Embeddings, one row per point."""
+
+        return self.array("vectors")  # type: ignore[return-value]
+
+    # ------------------------------------------------------------------
+    def payloads(self) -> Iterator[Dict[str, Any]]:
+        """Yield the payloads in point order without loading the section."""
+
+        section = self.header["sections"]["payloads"]
+        remaining = section["length"]
+        with self.path.open("rb") as fh:
+            fh.seek(self._base + section["offset"])
+            while remaining > 0:
+                line = fh.readline(remaining)
+                remaining -= len(line)
+                yield json.loads(line)
+
+    # ------------------------------------------------------------------
+    def lexical_ids(self) -> List[str] | None:
+        """Return the lexical corpus IDs, or ``None`` when not recorded."""
+
+        ids = self.array("lexical")
+        return None if ids is None else [uid.decode() for uid in ids]
+
+    # ------------------------------------------------------------------
+    def graph(self) -> Dict[str, Any] | None:
+        """Return the node-link data of the entity graph, if present."""
+
+        section = self.header["sections"].get("graph")
+        if section is None:
+            return None
+        with self.path.open("rb") as fh:
+            fh.seek(self._base + section["offset"])
+            return json.loads(fh.read(section["length"]))
+
+
+def import_collection(
+    store: EmbeddingStore,
+    path: str | os.PathLike[str],
+    *,
+    retriever: "BaseRetriever | None" = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """Load the snapshot ``path`` into the collection of ``store``.
+
+    Points are upserted ``batch_size`` at a time with their stored vectors.
+    With a ``retriever`` the lexical corpus is restored in its recorded order
+    and the entity graph is merged into a NetworkX ``retriever.graph``.
+    Raises ``ValueError`` when the snapshot's vector dimension does not match
+    the store's model. Returns the snapshot header.
+    """
+
+    snapshot = Snapshot(path)
+    header = snapshot.header
+    dim = store.model.get_sentence_embedding_dimension()
+    if header["count"] and header["dim"] != dim:
+        raise ValueError(
+            f"Snapshot vectors have {header['dim']} dimensions, "
+            f"the store's model produces {dim}"
+        )
+    lexical_ids = snapshot.lexical_ids()
+    wanted = None if lexical_ids is None else set(lexical_ids)
+    docs: Dict[str, TextDoc] = {}
+    ids, vectors = snapshot.ids, snapshot.vectors
+    payloads = snapshot.payloads()
+    for start in range(0, header["count"], batch_size):
+        stop = min(start + batch_size, header["count"])
+        batch_ids = [uid.decode() for uid in ids[start:stop]]
+        batch_payloads = list(islice(payloads, stop - start))
+        store.upsert_points(
+            batch_ids, np.asarray(vectors[start:stop], dtype=np.float32), batch_payloads
+        )
+        if retriever is not None:
+            for uid, payload in zip(batch_ids, batch_payloads):
+                if wanted is None or uid in wanted:
+                    docs[uid] = TextDoc(
+                        text=payload.get("text", ""), tags=payload.get("tags", {})
+                    )
+
+    if retriever is not None:
+        order = lexical_ids if lexical_ids is not None else list(docs)
+        retriever.index_lexical(docs[uid] for uid in order if uid in docs)
+        data = snapshot.graph()
+        if data is not None and nx:
+            graph = nx.node_link_graph(data, edges="edges")
+            if retriever.graph is None:
+                retriever.graph = graph
+            elif isinstance(retriever.graph, nx.Graph):
+                retriever.graph = nx.compose(retriever.graph, graph)
+    return header
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_cmd = commands.add_parser("export", help="write a collection to a file")
+    export_cmd.add_argument("collection")
+    export_cmd.add_argument("path")
+    export_cmd.add_argument("--dtype", choices=VECTOR_DTYPES, default="float32")
+    import_cmd = commands.add_parser("import", help="load a snapshot file")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument(
+        "--collection", help="target collection (default: the snapshot's)"
+    )
+    args = parser.parse_args()
+
+    collection = args.collection or Snapshot(args.path).header["collection"]
+    # Open the collection like the service does, so the persisted lexical index
+    # is recorded on export and rebuilt on import.
+    from app.registry import CollectionRegistry
+
+    if os.environ.get("VECTOR_BACKEND", "qdrant").lower() == "local":
+        from index.local_store import LocalEmbeddingStore
+
+        store: EmbeddingStore = LocalEmbeddingStore()
+        client = None
+    else:
+        store = EmbeddingStore(location=os.environ.get("QDRANT_LOCATION"))
+        client = store.client
+    registry = CollectionRegistry(
+        client,
+        store,
+        lexical_dir=os.environ.get("LEXICAL_INDEX_DIR", "data/lexical") or None,
+    )
+    retriever = registry.retriever(collection)
+    if args.command == "export":
+        header = export_collection(
+            retriever.store, args.path, retriever=retriever, dtype=args.dtype
+        )
+    else:
+        header = import_collection(retriever.store, args.path, retriever=retriever)
+    print(f"{args.command}: {header['count']} points, collection {collection}")
@@ -0,0 +1,76 @@
+"""BM25 term weights as Qdrant sparse vectors.
+
+With ``LEXICAL_BACKEND=qdrant`` every point of a collection carries, next to
+its dense embedding, a sparse vector named :data:`SPARSE_VECTOR`. The
+document side holds the BM25 term-frequency factor of every term,
+``tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / AVGDL))``, keyed by a 32-bit
+hash of the term (terms come from :func:`index.lexical.tokenize`); the query
+side holds the count of every query term. The collection's sparse vector
+uses Qdrant's ``idf`` modifier, so Qdrant multiplies in the inverse document
+frequency of each term over the collection at query time and a point's score
+is its BM25 score. The corpus statistics live in Qdrant, so API replicas keep
+no lexical state and hybrid search runs as one Qdrant query that fuses the
+dense and sparse candidates server-side.
+
+Unlike the in-memory :class:`~index.lexical.LexicalIndex`, the average
+document length is the fixed :data:`AVGDL` rather than the corpus mean, and
+Qdrant's idf, ``ln(1 + (N - n + 0.5) / (n + 0.5))``, is never negative, so
+scores are not identical to ``BM25Okapi``'s.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from collections import Counter
+from typing import Dict
+
+from qdrant_client.http import models as rest
+
+from index.lexical import DEFAULT_B, DEFAULT_K1, tokenize
+
+SPARSE_VECTOR = "lexical"
+# Roughly the token count of a chunk with the default CHUNK_SIZE of 800 chars.
+AVGDL = 128.0
+
+
+def term_index(term: str) -> int:
+    """Return the sparse vector dimension of ``term``, a 32-bit hash."""
+
+    digest = hashlib.blake2b(term.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _vector(weights: Counter[str] | Dict[str, float]) -> rest.SparseVector:
+    """Return ``weights`` as a sparse vector; colliding terms are summed."""
+
+    values: Dict[int, float] = {}
+    for term, weight in weights.items():
+        index = term_index(term)
+        values[index] = values.get(index, 0.0) + float(weight)
+    indices = sorted(values)
+    return rest.SparseVector(indices=indices, values=[values[i] for i in indices])
+
+
+def document_vector(text: str) -> rest.SparseVector:
+    """Return the BM25 term-frequency factors of ``text``."""
+
+    counts = Counter(tokenize(text))
+    norm = DEFAULT_K1 * (1 - DEFAULT_B + DEFAULT_B * sum(counts.values()) / AVGDL)
+    return _vector(
+        {
+            term: tf * (DEFAULT_K1 + 1) / (tf + norm)
+            for term, tf in counts.items()
+        }
+    )
+
+
+def query_vector(text: str) -> rest.SparseVector:
+    """Return the query term counts of ``text``; repeated terms count again."""
+
+    return _vector(Counter(tokenize(text)))
+
+
+def vector_params() -> rest.SparseVectorParams:
+    """Return the collection settings of :data:`SPARSE_VECTOR`."""
+
+    return rest.SparseVectorParams(modifier=rest.Modifier.IDF)
@@ -0,0 +1,251 @@
+"""Qdrant vector storage, quantization and HNSW configuration.
+
+:class:`VectorConfig` describes how an embedding collection keeps its vectors:
+optional ``scalar`` (int8) or ``binary`` quantization with the quantized
+copy pinned in RAM, original float32 vectors kept on disk, and HNSW ``m`` /
+``ef_construct``. It builds the matching Qdrant models for collection
+creation, :func:`migrate` applies it to an existing collection, and searches
+against a quantized collection rescore candidates with the original vectors.
+Per-request search precision comes from the :data:`SEARCH_TIERS` presets or
+explicit ``hnsw_ef`` / ``exact`` / ``oversampling`` / ``rescore`` values,
+merged by :func:`resolve_search_params`.
+
+:func:`estimate_ram` approximates the resident memory of a collection under a
+configuration; run ``python -m index.vector_config --collection <name>`` to
+print the footprint of a collection's current layout next to the one
+configured in the environment (add ``--migrate`` to apply it), or pass
+``--points`` to compare against the default layout.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping
+
+from qdrant_client.http import models as rest
+
+QUANTIZATION_KINDS = ("none", "scalar", "binary")
+DEFAULT_HNSW_M = 16
+# Per-request search presets trading recall for latency.
+SEARCH_TIERS: Dict[str, Dict[str, Any]] = {
+    "fast": {"hnsw_ef": 32, "rescore": False},
+    "balanced": {"hnsw_ef": 128, "oversampling": 2.0},
+    "exact": {"exact": True},
+}
+FLOAT32_BYTES = 4
+LINK_BYTES = 4
+
+
+@dataclass(frozen=True)
+class VectorConfig:
+    """Storage layout of a Qdrant embedding collection.
+
+    ``None`` HNSW values keep Qdrant's defaults.
+    """
+
+    quantization: str = "none"
+    on_disk: bool = False
+    hnsw_m: int | None = None
+    hnsw_ef_construct: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.quantization not in QUANTIZATION_KINDS:
+            raise ValueError(f"Unknown quantization: {self.quantization}")
+
+    @classmethod
+    def from_env(cls) -> "VectorConfig":
+        """Build a config from ``QDRANT_*`` and ``HNSW_*`` env vars.
+
+        Reads ``QDRANT_QUANTIZATION`` (default ``none``), ``QDRANT_ON_DISK``
+        (default ``false``), ``HNSW_M`` and ``HNSW_EF_CONSTRUCT``.
+        """
+
+        m = os.environ.get("HNSW_M")
+        ef = os.environ.get("HNSW_EF_CONSTRUCT")
+        return cls(
+            quantization=os.environ.get("QDRANT_QUANTIZATION", "none").lower(),
+            on_disk=os.environ.get("QDRANT_ON_DISK", "false").lower() == "true",
+            hnsw_m=int(m) if m else None,
+            hnsw_ef_construct=int(ef) if ef else None,
+        )
+
+    # ------------------------------------------------------------------
+    def vector_params(self, dim: int) -> rest.VectorParams:
+        """Return cosine ``VectorParams`` of size ``dim``."""
+
+        return rest.VectorParams(
+            size=dim, distance=rest.Distance.COSINE, on_disk=self.on_disk or None
+        )
+
+    def hnsw_config(self) -> rest.HnswConfigDiff | None:
+        """Return the HNSW overrides, or ``None`` to keep the defaults."""
+
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return rest.HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(
+        self,
+    ) -> rest.ScalarQuantization | rest.BinaryQuantization | None:
+        """Return the quantization config; quantized vectors stay in RAM."""
+
+        if self.quantization == "scalar":
+            return rest.ScalarQuantization(
+                scalar=rest.ScalarQuantizationConfig(
+                    type=rest.ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return rest.BinaryQuantization(
+                binary=rest.BinaryQuantizationConfig(always_ram=True)
+            )
+        return None
+
+    def search_params(
+        self,
+        *,
+        hnsw_ef: int | None = None,
+        exact: bool | None = None,
+        oversampling: float | None = None,
+        rescore: bool | None = None,
+    ) -> rest.SearchParams | None:
+        """Return Qdrant search params for one request.
+
+        ``hnsw_ef`` widens the HNSW beam, ``exact`` bypasses the index, and
+        ``oversampling`` / ``rescore`` control how many quantized candidates
+        are fetched and whether they are re-ranked with the original
+        vectors. Quantized collections rescore by default; ``None`` is
+        returned when nothing differs from Qdrant's defaults.
+        """
+
+        quantization = None
+        if self.quantization != "none":
+            quantization = rest.QuantizationSearchParams(
+                rescore=True if rescore is None else rescore,
+                oversampling=oversampling,
+            )
+        if hnsw_ef is None and exact is None and quantization is None:
+            return None
+        return rest.SearchParams(
+            hnsw_ef=hnsw_ef, exact=exact, quantization=quantization
+        )
+
+
+def resolve_search_params(
+    tier: str | None = None, overrides: Mapping[str, Any] | None = None
+) -> Dict[str, Any] | None:
+    """Merge the :data:`SEARCH_TIERS` preset ``tier`` with ``overrides``.
+
+    Explicit ``overrides`` that are not ``None`` win over the preset. Returns
+    keyword arguments for :meth:`VectorConfig.search_params`, or ``None``
+    when neither is given.
+    """
+
+    if tier is None and not overrides:
+        return None
+    if tier is not None and tier not in SEARCH_TIERS:
+        raise ValueError(f"Unknown latency tier: {tier}")
+    params = dict(SEARCH_TIERS[tier]) if tier else {}
+    params.update({k: v for k, v in (overrides or {}).items() if v is not None})
+    return params
+
+
+# ----------------------------------------------------------------------
+def migrate(client: Any, collection_name: str, config: VectorConfig) -> None:
+    """Apply ``config`` to the existing collection ``collection_name``.
+
+    Qdrant rebuilds the affected segments in the background; switching a
+    quantized collection back to ``none`` drops its quantized vectors.
+    """
+
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={"": rest.VectorParamsDiff(on_disk=config.on_disk)},
+        hnsw_config=config.hnsw_config(),
+        quantization_config=config.quantization_config() or rest.Disabled.DISABLED,
+    )
+
+
+# ----------------------------------------------------------------------
+def describe(client: Any, collection_name: str) -> tuple[VectorConfig, int, int]:
+    """Return the current config, point count and vector size of a collection."""
+
+    info = client.get_collection(collection_name=collection_name)
+    params = info.config.params.vectors
+    quantization = info.config.quantization_config
+    if isinstance(quantization, rest.ScalarQuantization):
+        kind = "scalar"
+    elif isinstance(quantization, rest.BinaryQuantization):
+        kind = "binary"
+    else:
+        kind = "none"
+    config = VectorConfig(
+        quantization=kind,
+        on_disk=bool(params.on_disk),
+        hnsw_m=info.config.hnsw_config.m,
+        hnsw_ef_construct=info.config.hnsw_config.ef_construct,
+    )
+    return config, info.points_count or 0, params.size
+
+
+# ----------------------------------------------------------------------
+def estimate_ram(points: int, dim: int, config: VectorConfig) -> Dict[str, int]:
+    """Estimate the resident bytes of ``points`` vectors of size ``dim``.
+
+    Counts the float32 originals unless they are on disk, the quantized copy
+    (one byte per dimension for ``scalar``, one bit for ``binary``) and the
+    level-0 HNSW links (``2 * m`` four-byte IDs per point). Payloads and
+    upper HNSW layers are ignored.
+    """
+
+    original = 0 if config.on_disk else points * dim * FLOAT32_BYTES
+    if config.quantization == "scalar":
+        quantized = points * dim
+    elif config.quantization == "binary":
+        quantized = points * math.ceil(dim / 8)
+    else:
+        quantized = 0
+    graph = points * 2 * (config.hnsw_m or DEFAULT_HNSW_M) * LINK_BYTES
+    return {
+        "original_bytes": original,
+        "quantized_bytes": quantized,
+        "hnsw_bytes": graph,
+        "total_bytes": original + quantized + graph,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from qdrant_client import QdrantClient
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument(
+        "--collection", help="read point count and size from this collection"
+    )
+    parser.add_argument(
+        "--migrate", action="store_true", help="apply the config to --collection"
+    )
+    args = parser.parse_args()
+
+    configured = VectorConfig.from_env()
+    current, points, dim = VectorConfig(), args.points, args.dim
+    if args.collection:
+        client = QdrantClient(
+            host=os.environ.get("QDRANT_HOST", "localhost"),
+            port=int(os.environ.get("QDRANT_PORT", "6333")),
+        )
+        current, points, dim = describe(client, args.collection)
+        if args.migrate:
+            migrate(client, args.collection, configured)
+    if points is None:
+        parser.error("--points or --collection is required")
+
+    before = estimate_ram(points, dim, current)
+    after = estimate_ram(points, dim, configured)
+    for key in before:
+        print(f"{key}: {before[key] / 2**20:.1f} MiB -> {after[key] / 2**20:.1f} MiB")
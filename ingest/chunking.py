@@ -1,29 +1,57 @@
-"""Utilities for splitting text into overlapping chunks."""
+"""Utilities for splitting text into overlapping chunks.
+
+:func:`chunk_text` splits a plain string. :func:`chunk_elements` consumes
+parsed document elements lazily and yields :class:`Chunk` objects that carry
+the page number and the character span of each chunk within the document text
+(element texts joined by blank lines), without building that text in memory.
+"""
 
 from __future__ import annotations
 
 import os
-from typing import List
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, List
 
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 DEFAULT_CHUNK_SIZE = 800
 DEFAULT_CHUNK_OVERLAP = 120
 
+# Separator placed between element texts in the logical document text.
+ELEMENT_SEPARATOR = "\n\n"
+
+
+@dataclass
+class Chunk:
+    """A chunk of document text with its source location."""
+
+    text: str
+    page: int | None
+    span: tuple[int, int]
+
+
+@lru_cache(maxsize=8)
+def _splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    """Return a splitter for the given settings, built once per combination."""
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap
+    )
+
 
 def get_text_splitter() -> RecursiveCharacterTextSplitter:
     """Return a ``RecursiveCharacterTextSplitter`` configured from the environment.
 
     The ``CHUNK_SIZE`` and ``CHUNK_OVERLAP`` variables control the maximum number
     of characters per chunk and the number of characters overlapping between
-    consecutive chunks. Defaults are 800 and 120 respectively.
+    consecutive chunks. Defaults are 800 and 120 respectively. Splitters are
+    cached per setting combination.
     """
 
     chunk_size = int(os.environ.get("CHUNK_SIZE", DEFAULT_CHUNK_SIZE))
     chunk_overlap = int(os.environ.get("CHUNK_OVERLAP", DEFAULT_CHUNK_OVERLAP))
-    return RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap
-    )
+    return _splitter(chunk_size, chunk_overlap)
 
 
 def chunk_text(text: str) -> List[str]:
@@ -31,3 +59,78 @@ def chunk_text(text: str) -> List[str]:
 
     splitter = get_text_splitter()
     return splitter.split_text(text)
+
+
+def _page_number(element: Any) -> int | None:
+    """Return the page number of a parsed ``element`` if it has one."""
+
+    metadata = getattr(element, "metadata", None)
+    if isinstance(metadata, dict):
+        return metadata.get("page_number")
+    return getattr(metadata, "page_number", None)
+
+
+def _split_block(
+    splitter: RecursiveCharacterTextSplitter, block: str, start: int, page: int | None
+) -> Iterator[Chunk]:
+    """Split ``block`` (starting at document offset ``start``) into chunks."""
+
+    if len(block) <= splitter._chunk_size:
+        stripped = block.strip()
+        if stripped:
+            offset = start + block.find(stripped)
+            yield Chunk(stripped, page, (offset, offset + len(stripped)))
+        return
+    cursor = 0
+    for piece in splitter.split_text(block):
+        found = block.find(piece, max(0, cursor - splitter._chunk_overlap))
+        if found < 0:
+            found = block.find(piece)
+        cursor = found + len(piece)
+        yield Chunk(piece, page, (start + found, start + cursor))
+
+
+def chunk_elements(elements: Iterable[Any]) -> Iterator[Chunk]:
+    """Yield chunks for parsed ``elements`` without joining the whole document.
+
+    Consecutive elements from the same page are packed together until the
+    next one would exceed ``CHUNK_SIZE``; elements longer than that are split
+    with the configured splitter, including its overlap. Chunks never span a
+    page boundary. Spans are ``(start, end)`` character offsets into the
+    element texts joined by :data:`ELEMENT_SEPARATOR`, skipping empty ones.
+    """
+
+    splitter = get_text_splitter()
+    chunk_size = splitter._chunk_size
+    parts: List[str] = []
+    block_len = 0
+    block_start = 0
+    block_page: int | None = None
+    position = 0
+
+    for element in elements:
+        text = getattr(element, "text", "") or ""
+        if not text.strip():
+            continue
+        page = _page_number(element)
+        if parts:
+            position += len(ELEMENT_SEPARATOR)
+            joined_len = block_len + len(ELEMENT_SEPARATOR) + len(text)
+            if page != block_page or joined_len > chunk_size:
+                yield from _split_block(
+                    splitter, ELEMENT_SEPARATOR.join(parts), block_start, block_page
+                )
+                parts = []
+        if not parts:
+            block_start = position
+            block_page = page
+            block_len = len(text)
+        else:
+            block_len += len(ELEMENT_SEPARATOR) + len(text)
+        parts.append(text)
+        position += len(text)
+
+    if parts:
+        yield from _split_block(
+            splitter, ELEMENT_SEPARATOR.join(parts), block_start, block_page
+        )
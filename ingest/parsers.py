@@ -1,10 +1,24 @@
 from __future__ import annotations
 
-"""Document parsing utilities using Unstructured."""
+"""Document parsing utilities using Unstructured.
 
+PDFs can optionally be parsed in parallel: the file is split into page-range
+shards with pypdf, each shard is partitioned on a process pool and the
+elements are merged back in page order. The pool size is taken from the
+``PARSE_WORKERS`` environment variable (default 1, i.e. sequential parsing)
+and the pool lives until :func:`shutdown_pool` is called.
+"""
+
+import logging
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from importlib import import_module
 from pathlib import Path
-from typing import Callable, List, Optional
+from typing import Callable, List, Optional, Sequence
 
 from unstructured.documents.elements import Element, FigureCaption, Image, Table, Text
 
@@ -23,6 +37,19 @@ _PARTITIONER_NAMES = {
     ".tif": "unstructured.partition.image.partition_image",
 }
 
+# File suffixes accepted by :func:`parse_document`.
+SUPPORTED_SUFFIXES = frozenset(_PARTITIONER_NAMES)
+
+DEFAULT_PARSE_WORKERS = 1
+
+_ALLOWED_ELEMENTS = (Text, Table, FigureCaption)
+
+logger = logging.getLogger(__name__)
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
 
 def _get_partitioner(suffix: str) -> Optional[Callable[..., list[Element]]]:
     """Dynamically import the Unstructured partition function for a suffix."""
@@ -37,19 +64,134 @@ def _get_partitioner(suffix: str) -> Optional[Callable[..., list[Element]]]:
     return getattr(module, func_name, None)
 
 
+def _filter_elements(elements: Sequence[Element]) -> List[Element]:
+    """Keep only text, table and caption elements."""
+
+    return [
+        el
+        for el in elements
+        if isinstance(el, _ALLOWED_ELEMENTS) and not isinstance(el, Image)
+    ]
+
+
+def _page_ranges(num_pages: int, shards: int) -> List[tuple[int, int]]:
+    """Split ``num_pages`` into at most ``shards`` contiguous ``[start, end)`` ranges."""
+
+    size = max(1, math.ceil(num_pages / max(1, shards)))
+    return [(start, min(start + size, num_pages)) for start in range(0, num_pages, size)]
+
+
+def _partition_shard(suffix: str, path: str, offset: int) -> List[Element]:
+    """Partition one shard file and shift its page numbers by ``offset``.
+
+    Executed inside a worker process, so the partitioner is resolved there.
+    """
+
+    partitioner = _get_partitioner(suffix)
+    if partitioner is None:
+        raise RuntimeError(f"No partitioner available for {suffix}")
+    elements = _filter_elements(partitioner(filename=path))
+    for el in elements:
+        el.metadata.page_number = offset + (el.metadata.page_number or 1)
+    return elements
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Return the shared parse pool, recreating it when ``workers`` changes.
+
+    Workers are spawned rather than forked because the service process runs
+    threads (ingestion workers, torch) that are unsafe to fork. Caller holds
+    ``_pool_lock``; a replaced pool finishes its queued shards in the
+    background and then exits.
+    """
+
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Shut down the shared parse pool, waiting for running shards.
+
+    The next sharded parse starts a new pool.
+    """
+
+    global _pool, _pool_workers
+    with _pool_lock:
+        pool, _pool, _pool_workers = _pool, None, 0
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _parse_pdf_sharded(path: Path, workers: int) -> List[Element] | None:
+    """Partition ``path`` page-range by page-range on ``workers`` processes.
+
+    Returns ``None`` when the document cannot be sharded (pypdf missing,
+    single page, unreadable file or a failing shard) so the caller can fall
+    back to sequential parsing; failures are logged with their exception.
+    """
+
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:  # pragma: no cover - pypdf is a declared dependency
+        return None
+
+    try:
+        reader = PdfReader(path)
+        num_pages = len(reader.pages)
+        if num_pages < 2:
+            return None
+        # Two shards per worker evens out pages of very different cost.
+        ranges = _page_ranges(num_pages, workers * 2)
+        with tempfile.TemporaryDirectory() as tmp:
+            shards: List[tuple[str, int]] = []
+            for i, (start, end) in enumerate(ranges):
+                writer = PdfWriter()
+                for page in reader.pages[start:end]:
+                    writer.add_page(page)
+                shard = Path(tmp) / f"shard-{i}.pdf"
+                writer.write(shard)
+                shards.append((str(shard), start))
+            with _pool_lock:
+                pool = _get_pool(workers)
+                futures = [
+                    pool.submit(_partition_shard, ".pdf", shard, start)
+                    for shard, start in shards
+                ]
+            results = [future.result() for future in futures]
+    except Exception:
+        logger.warning(
+            "Sharded parsing of %s failed, parsing it sequentially",
+            path,
+            exc_info=True,
+        )
+        return None
+    return [el for shard in results for el in shard]
+
+
 class _SimpleElement:
     def __init__(self, text: str) -> None:
         self.text = text
         self.metadata: dict = {}
 
 
-def parse_document(path: Path) -> List[Element]:
+def parse_document(path: Path, *, workers: int | None = None) -> List[Element]:
     """Parse a document into Unstructured elements.
 
     Parameters
     ----------
     path:
         Path to the document to parse.
+    workers:
+        Number of processes used to parse PDF page ranges in parallel.
+        Defaults to the ``PARSE_WORKERS`` env var; values below 2 parse the
+        whole file in the current process.
 
     Returns
     -------
@@ -63,17 +205,23 @@ def parse_document(path: Path) -> List[Element]:
     """
 
     suffix = path.suffix.lower()
-    if suffix not in _PARTITIONER_NAMES:
+    if suffix not in SUPPORTED_SUFFIXES:
         raise ValueError(f"Unsupported file type: {suffix}")
     partitioner = _get_partitioner(suffix)
     if partitioner is None:
         text = path.read_text(encoding="utf-8", errors="ignore")
         return [_SimpleElement(text)]
 
+    if workers is None:
+        workers = int(os.environ.get("PARSE_WORKERS", DEFAULT_PARSE_WORKERS))
+    if suffix == ".pdf" and workers > 1:
+        sharded = _parse_pdf_sharded(path, workers)
+        if sharded is not None:
+            return sharded
+
     try:
         elements = partitioner(filename=str(path))
     except Exception:
         text = path.read_text(encoding="utf-8", errors="ignore")
         return [_SimpleElement(text)]
-    allowed = (Text, Table, FigureCaption)
-    return [el for el in elements if isinstance(el, allowed) and not isinstance(el, Image)]
+    return _filter_elements(elements)
@@ -23,4 +23,5 @@ class JobStatus(BaseModel):
     started_at: datetime
     ended_at: datetime | None = None
     duration_ms: int | None = None
+    error: str | None = None
     artifacts: list[Artifact] = Field(default_factory=list)
@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+import os
 from typing import Any, Dict, List, Literal, Tuple
 
 from pydantic import BaseModel, Field
 
+# Upper bound on the queries of one /query/batch request.
+MAX_BATCH_QUERIES = int(os.environ.get("MAX_BATCH_QUERIES", "64"))
+
 
 class GraphParams(BaseModel):
     """Optional parameters controlling graph expansion."""
@@ -14,31 +18,94 @@ class GraphParams(BaseModel):
     depth: int = Field(1, ge=1, description="Traversal depth")
 
 
+class SearchParams(BaseModel):
+    """Optional vector search precision overrides."""
+
+    hnsw_ef: int | None = Field(None, ge=1, description="HNSW search beam width")
+    exact: bool | None = Field(None, description="Bypass the HNSW index")
+    oversampling: float | None = Field(
+        None, ge=1, description="Quantized candidates fetched per result"
+    )
+    rescore: bool | None = Field(
+        None, description="Re-rank quantized candidates with original vectors"
+    )
+
+
+class QueryFilter(BaseModel):
+    """Metadata filter applied to both semantic and lexical retrieval.
+
+    All given conditions must hold: the chunk belongs to one of ``file_id``,
+    every ``tags`` entry equals the chunk's tag, and its ``page`` lies within
+    ``page_from``..``page_to`` (inclusive).
+    """
+
+    file_id: str | List[str] | None = None
+    tags: Dict[str, str | int | bool] | None = None
+    page_from: int | None = Field(None, ge=0, description="First page, inclusive")
+    page_to: int | None = Field(None, ge=0, description="Last page, inclusive")
+
+
 class QueryRequest(BaseModel):
     """Request payload for the ``/query`` endpoint.
 
-    ``graph_params`` can override graph expansion defaults (``neighbors``=5,
-    ``depth``=1).
+    ``collection`` selects the collection to search (the default collection
+    when omitted). ``graph_params`` can override graph expansion defaults
+    (``neighbors``=5, ``depth``=1). ``latency_tier`` selects a search
+    precision preset (``fast``, ``balanced`` or ``exact``); fields set in
+    ``search_params`` override it. ``filter`` restricts retrieval to chunks
+    matching the given metadata.
     """
 
     query: str
+    collection: str | None = None
+    filter: QueryFilter | None = None
+    top_k: int = 5
+    mode: Literal["semantic", "lexical", "hybrid"] = "hybrid"
+    provider: Literal["none", "transformers", "ollama"] = "none"
+    graph: bool = False
+    graph_params: GraphParams | None = None
+    latency_tier: Literal["fast", "balanced", "exact"] | None = None
+    search_params: SearchParams | None = None
+
+
+class BatchQueryRequest(BaseModel):
+    """Request payload for ``/query/batch``.
+
+    Every query in ``queries`` is answered with the same retrieval options as
+    a single :class:`QueryRequest`. At most ``MAX_BATCH_QUERIES`` queries are
+    accepted per request.
+    """
+
+    queries: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_QUERIES)
+    collection: str | None = None
+    filter: QueryFilter | None = None
     top_k: int = 5
     mode: Literal["semantic", "lexical", "hybrid"] = "hybrid"
     provider: Literal["none", "transformers", "ollama"] = "none"
     graph: bool = False
     graph_params: GraphParams | None = None
+    latency_tier: Literal["fast", "balanced", "exact"] | None = None
+    search_params: SearchParams | None = None
 
 
 class RetrieverScores(BaseModel):
-    """Per-retriever scores for a retrieved text chunk."""
+    """Per-retriever scores for a retrieved text chunk.
+
+    ``semantic`` is the cosine similarity reported by the vector store and
+    ``lexical`` the BM25 score.
+    """
 
     semantic: float | None = None
     lexical: float | None = None
 
 
 class RankedDocument(BaseModel):
-    """Retrieved text with fused ranking, metadata and retriever scores."""
+    """Retrieved text with fused ranking, metadata and retriever scores.
 
+    ``id`` is the chunk's point ID in the vector store.
+    """
+
+    id: str | None = None
     text: str
     rank: int
     file_id: str
@@ -57,10 +124,21 @@ class Citation(BaseModel):
 
 
 class QueryResponse(BaseModel):
-    """Response model for ``/query`` containing fused ranking information."""
+    """Response model for ``/query`` containing fused ranking information.
+
+    ``degraded`` names the retrieval branches (``semantic``, ``lexical``)
+    that failed or timed out; the results then come from the others only.
+    """
 
     query: str
     answer: str = ""
     citations: List[Citation] = Field(default_factory=list)
     results: List[RankedDocument] = Field(default_factory=list)
     graph_context: Dict[str, Any] | None = None
+    degraded: List[str] = Field(default_factory=list)
+
+
+class BatchQueryResponse(BaseModel):
+    """Response model for ``/query/batch``, one entry per request query."""
+
+    responses: List[QueryResponse] = Field(default_factory=list)
@@ -6,26 +6,65 @@ store and a BM25 lexical index. Queries can be executed in three modes:
 ``semantic``
     Only embedding based search via :class:`~index.embedding_store.EmbeddingStore`.
 ``lexical``
-    Only BM25 based keyword search using :mod:`rank_bm25`.
+    Only BM25 based keyword search over :class:`~index.lexical.LexicalIndex`.
 ``hybrid``
     Results from both retrievers are combined using Reciprocal Rank Fusion
     (RRF). The RRF implementation follows the formulation from
     [Cormack et al., 2009].
 
-The retriever is intentionally lightweight; it keeps an in-memory corpus for
-BM25 and delegates persistence of embeddings to ``EmbeddingStore``.
+The retriever is intentionally lightweight; it keeps an in-memory inverted
+BM25 index that is appended to and tombstoned in place, and delegates
+persistence of embeddings to ``EmbeddingStore``. Metadata filters (see
+:mod:`index.filters`) are pushed down to the store; on the lexical side every
+filter condition is evaluated once into a per-document bitmap that is
+extended as documents are appended. Lexical queries only read the postings of
+their terms and select the top k with MaxScore pruning. Tombstoned documents
+leave the BM25 statistics immediately and are purged from the postings by a
+background compaction once they make up ``compact_ratio`` of the corpus.
+With ``lexical_path`` the lexical index is persisted in that directory (see
+:meth:`LexicalIndex.open`) and survives restarts.
+
+With ``lexical_backend="qdrant"`` there is no in-process lexical index: the
+store keeps BM25 sparse vectors next to the embeddings (see
+:mod:`index.sparse`), lexical queries are answered by Qdrant and a hybrid
+query is a single Qdrant request whose dense and sparse candidates are fused
+server-side, so retrievers hold no lexical state.
+
+Otherwise the two branches of a hybrid query run concurrently, each under
+its own timeout (``branch_timeouts``), through :func:`run_branches`, which
+the API's async endpoints use as well. When one branch fails or times out
+the query is answered from the other one alone.
 """
 
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import os
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Iterable, List, Sequence, Tuple, Dict, Any, Mapping
+from pathlib import Path
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Sequence,
+    Tuple,
+)
 from itertools import islice
 
-from rank_bm25 import BM25Okapi
+import numpy as np
 
-from index.embedding_store import EmbeddingStore, TextDoc
+from index import filters as payload_filters
+from index.embedding_store import EmbeddingStore, SearchHit, TextDoc, point_id
+from index.lexical import LexicalIndex, RowFilter, tokenize
 from graph.entities import extract_entities
 
 try:
@@ -33,13 +72,122 @@ try:
 except Exception:  # pragma: no cover - networkx is optional at runtime
     nx = None  # type: ignore
 
+# Cached lexical filter bitmaps per lexical index.
+MAX_FILTER_BITMAPS = 256
+DEFAULT_COMPACT_RATIO = 0.25
+LEXICAL_BACKENDS = ("memory", "qdrant")
+DEFAULT_BRANCH_TIMEOUT = 10.0
+
+DEFAULT_BRANCH_WORKERS = 16
+
+logger = logging.getLogger(__name__)
+# Runs the synchronous branches of hybrid queries; a timed-out branch keeps
+# its worker until it returns. Created on first use, see _get_branch_pool.
+_branch_pool: ThreadPoolExecutor | None = None
+_branch_pool_lock = threading.Lock()
+
+
+def _get_branch_pool() -> ThreadPoolExecutor:
+    """Return the branch worker pool, creating it on first use.
+
+    Its size comes from ``RETRIEVAL_BRANCH_WORKERS`` (default 16).
+    """
+
+    global _branch_pool
+    with _branch_pool_lock:
+        if _branch_pool is None:
+            _branch_pool = ThreadPoolExecutor(
+                max_workers=int(
+                    os.environ.get("RETRIEVAL_BRANCH_WORKERS", DEFAULT_BRANCH_WORKERS)
+                ),
+                thread_name_prefix="retrieval-branch",
+            )
+        return _branch_pool
+
+
+def shutdown_branch_pool() -> None:
+    """Shut down the branch worker pool; the next query starts a new one.
+
+    Queued branches are cancelled and running ones are not waited for, since
+    a branch that timed out may never return.
+    """
+
+    global _branch_pool
+    with _branch_pool_lock:
+        pool, _branch_pool = _branch_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_branches(
+    branches: Mapping[str, Callable[[], Any] | Awaitable[Any]],
+    timeouts: Mapping[str, float],
+) -> Tuple[Dict[str, Any], List[str]]:
+    """Run the retrieval ``branches`` concurrently, each under its timeout.
+
+    Awaitable branches are awaited directly; callables run on the branch
+    worker pool. ``timeouts`` maps every branch name to seconds. Returns the
+    results of the branches that succeeded and the names of those that
+    failed or timed out. When all of them failed, the first branch's error is
+    raised, a timeout as ``TimeoutError``.
+    """
+
+    loop = asyncio.get_running_loop()
+    names = list(branches)
+    outcomes = await asyncio.gather(
+        *(
+            asyncio.wait_for(
+                (
+                    loop.run_in_executor(_get_branch_pool(), branch)
+                    if callable(branch)
+                    else branch
+                ),
+                timeouts[name],
+            )
+            for name, branch in branches.items()
+        ),
+        return_exceptions=True,
+    )
+    results: Dict[str, Any] = {}
+    degraded: List[str] = []
+    for name, outcome in zip(names, outcomes):
+        if isinstance(outcome, BaseException):
+            reason = "timed out" if isinstance(outcome, TimeoutError) else outcome
+            logger.warning("Retrieval branch %s failed: %s", name, reason)
+            degraded.append(name)
+        else:
+            results[name] = outcome
+    if names and not results:
+        raise outcomes[0]
+    return results, degraded
+
+
+def default_branch_timeouts() -> Dict[str, float]:
+    """Return the per-branch timeouts in seconds from the environment."""
+
+    return {
+        name: float(os.environ.get(f"{name.upper()}_TIMEOUT_S", DEFAULT_BRANCH_TIMEOUT))
+        for name in ("semantic", "lexical")
+    }
+
+
+def _doc_id(doc: TextDoc) -> str:
+    """Return the store's point ID of ``doc`` (see :func:`point_id`)."""
+
+    return point_id(doc.text, doc.tags.get("file_id"))
+
 
 @dataclass
 class RetrievedDoc:
-    """Container representing a retrieved document."""
+    """Container representing a retrieved document.
+
+    ``id`` is the document's point ID in the embedding store, shared by the
+    semantic and lexical retrievers.
+    """
 
     doc: TextDoc
     score: float
+    id: str
 
 
 class BaseRetriever:
@@ -50,64 +198,497 @@ class BaseRetriever:
         store: EmbeddingStore,
         corpus: Sequence[TextDoc] | None = None,
         graph: Any | None = None,
+        compact_ratio: float = DEFAULT_COMPACT_RATIO,
+        lexical_path: str | os.PathLike[str] | None = None,
+        lexical_backend: str | None = None,
+        branch_timeouts: Mapping[str, float] | None = None,
     ) -> None:
+        """Wrap ``store`` and index ``corpus`` in both retrievers.
+
+        With ``lexical_path`` the lexical index is opened from (and persisted
+        to) that directory. A directory that does not exist yet is seeded
+        from the texts already in ``store``, once.
+
+        ``lexical_backend`` is ``"memory"`` for the in-process BM25 index or
+        ``"qdrant"`` for sparse vectors stored in the collection (see
+        :meth:`EmbeddingStore.enable_sparse_vectors`); ``lexical_path`` is
+        then unused. Defaults to ``"qdrant"`` when ``store`` already keeps
+        sparse vectors.
+
+        ``branch_timeouts`` maps ``"semantic"`` and ``"lexical"`` to the
+        seconds each branch of a hybrid query may take; defaults to
+        ``SEMANTIC_TIMEOUT_S`` and ``LEXICAL_TIMEOUT_S`` or 10 seconds.
+        """
+
+        if lexical_backend is None:
+            sparse = getattr(store, "sparse_vectors", False)
+            lexical_backend = "qdrant" if sparse else "memory"
+        lexical_backend = lexical_backend.lower()
+        if lexical_backend not in LEXICAL_BACKENDS:
+            raise ValueError(f"Unknown lexical backend: {lexical_backend}")
+        if lexical_backend == "qdrant":
+            store.enable_sparse_vectors()
+            lexical_path = None
+        self.lexical_backend = lexical_backend
+        self.branch_timeouts = {
+            **default_branch_timeouts(),
+            **(branch_timeouts or {}),
+        }
         self.store = store
-        self.corpus: List[TextDoc] = list(corpus or [])
-        self.bm25 = (
-            BM25Okapi([c.text.split() for c in self.corpus]) if self.corpus else None
-        )
         self.graph = graph
+        self.compact_ratio = compact_ratio
+        # (lexical index, condition bitmaps) - swapped as one on compaction.
+        self._bitmaps: Tuple[Any, Dict[str, np.ndarray]] = (None, {})
+        self._lock = threading.RLock()
+        self._compacting = False
+        if lexical_path is None:
+            memory = lexical_backend == "memory"
+            self.lexical = LexicalIndex((corpus or []) if memory else [])
+        else:
+            seed = not Path(lexical_path).exists()
+            self.lexical = LexicalIndex.open(lexical_path)
+            if seed:
+                self.index_lexical(
+                    TextDoc(text=p.get("text", ""), tags=p.get("tags", {}))
+                    for _, _, payloads in self.store.scroll_points()
+                    for p in payloads
+                )
+            if corpus:
+                self.index_lexical(corpus)
         if corpus:
             # Ensure texts and metadata are available in the embedding store.
             self.store.add_texts([c.text for c in corpus], [c.tags for c in corpus])
 
     # ------------------------------------------------------------------
-    def add_texts(self, docs: Iterable[TextDoc]) -> None:
-        """Add ``docs`` to both semantic and lexical indices."""
+    @property
+    def corpus(self) -> List[TextDoc]:
+        """Documents of the lexical index by row, tombstoned ones included."""
+
+        return self.lexical.docs
+
+    # ------------------------------------------------------------------
+    def add_texts(self, docs: Iterable[TextDoc]) -> List[str]:
+        """Add ``docs`` to both semantic and lexical indices.
+
+        Returns the IDs of the newly inserted documents.
+        """
 
         new_docs = list(docs)
         if not new_docs:
-            return
+            return []
         ids = self.store.add_texts([d.text for d in new_docs], [d.tags for d in new_docs])
+        if self.lexical_backend == "qdrant":
+            return ids
         inserted: List[TextDoc] = []
         id_set = set(ids)
         for doc in new_docs:
-            uid = self.store._sha256(doc.text)[:32]
-            if uid in id_set:
+            if _doc_id(doc) in id_set:
                 inserted.append(doc)
         if not inserted:
+            return ids
+        with self._lock:
+            self.lexical.add(inserted)
+        return ids
+
+    # ------------------------------------------------------------------
+    def lexical_ids(self) -> List[str]:
+        """Return the IDs of the live lexical documents in corpus order."""
+
+        with self._lock:
+            return [_doc_id(doc) for doc in self.lexical.live_docs()]
+
+    # ------------------------------------------------------------------
+    def index_lexical(self, docs: Iterable[TextDoc]) -> None:
+        """Add ``docs`` to the lexical index only.
+
+        For chunks the embedding store already holds, e.g. after restoring a
+        snapshot; documents already in the corpus are skipped. A no-op with
+        the ``qdrant`` backend, whose points carry their sparse vectors.
+        """
+
+        if self.lexical_backend == "qdrant":
             return
-        self.corpus.extend(inserted)
-        tokenized = [c.text.split() for c in self.corpus]
-        self.bm25 = BM25Okapi(tokenized)
+        with self._lock:
+            known = set(self.lexical_ids())
+            fresh: List[TextDoc] = []
+            for doc in docs:
+                uid = _doc_id(doc)
+                if uid not in known:
+                    known.add(uid)
+                    fresh.append(doc)
+            self.lexical.add(fresh)
 
     # ------------------------------------------------------------------
-    def _lexical_search(self, query: str, top_k: int) -> List[RetrievedDoc]:
-        if not self.bm25:
-            return []
-        scores = self.bm25.get_scores(query.split())
-        ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_k]
-        return [RetrievedDoc(self.corpus[i], score=s) for i, s in ranked]
+    def replace_document(
+        self, file_id: str, docs: Iterable[TextDoc]
+    ) -> Tuple[List[str], List[str], List[str]]:
+        """Replace the indexed chunks of ``file_id`` with ``docs``.
+
+        The embedding store diffs the new chunks against the stored version
+        (see :meth:`EmbeddingStore.replace_file`); in the lexical index the
+        old chunks are tombstoned and the current ones appended. The old rows
+        come from the index's file_id row map, so the lexical side costs the
+        chunks of ``file_id`` rather than a scan of the corpus. Returns
+        ``(added, kept, removed)`` IDs.
+        """
+
+        new_docs = [
+            TextDoc(text=d.text, tags={**d.tags, "file_id": file_id}) for d in docs
+        ]
+        added, kept, removed = self.store.replace_file(
+            file_id, [d.text for d in new_docs], [d.tags for d in new_docs]
+        )
+        if self.lexical_backend == "qdrant":
+            return added, kept, removed
+        current = set(added) | set(kept)
+        with self._lock:
+            self._tombstone(file_id)
+            self.lexical.add(d for d in new_docs if _doc_id(d) in current)
+        self._maybe_compact()
+        return added, kept, removed
 
     # ------------------------------------------------------------------
-    def _semantic_search(self, query: str, top_k: int) -> List[RetrievedDoc]:
-        docs = self.store.query(query, top_k=top_k)
-        # ``EmbeddingStore.query`` returns results in ranked order but without scores.
-        return [RetrievedDoc(doc=d, score=1.0) for d in docs]
+    def delete_document(self, file_id: str) -> List[str]:
+        """Delete every chunk of ``file_id`` from both indexes.
+
+        The store drops the chunks in one call (see
+        :meth:`EmbeddingStore.delete_file`). In the lexical index the chunks
+        are tombstoned and leave the BM25 statistics immediately; a background
+        :meth:`compact` purges them from the postings once more than
+        ``compact_ratio`` of the rows are tombstoned. Returns the IDs removed
+        from the lexical index, or from the store with the ``qdrant`` backend.
+        """
+
+        if self.lexical_backend == "qdrant":
+            removed = sorted(self.store.file_point_ids(file_id))
+            self.store.delete_file(file_id)
+            return removed
+        self.store.delete_file(file_id)
+        with self._lock:
+            removed = self._tombstone(file_id)
+        self._maybe_compact()
+        return removed
+
+    # ------------------------------------------------------------------
+    def _tombstone(self, file_id: str) -> List[str]:
+        """Tombstone the live lexical rows of ``file_id`` and return their IDs.
+
+        The rows come from the index's ``file_id`` table (see
+        :meth:`LexicalIndex.file_rows`), so the cost follows the document's
+        chunk count. Caller holds the lock.
+        """
+
+        lexical = self.lexical
+        rows = lexical.file_rows(file_id)
+        lexical.delete(rows)
+        return [_doc_id(lexical.docs[i]) for i in rows]
+
+    # ------------------------------------------------------------------
+    def _maybe_compact(self) -> None:
+        """Start a background :meth:`compact` once tombstones are too many."""
+
+        with self._lock:
+            lexical = self.lexical
+            if self._compacting or lexical.dead_count <= (
+                self.compact_ratio * lexical.size
+            ):
+                return
+            self._compacting = True
+        threading.Thread(
+            target=self.compact, name="lexical-compaction", daemon=True
+        ).start()
+
+    # ------------------------------------------------------------------
+    def compact(self) -> None:
+        """Purge tombstoned documents from the lexical postings.
+
+        The compacted index is built outside the lock from a snapshot of the
+        live rows (see :meth:`LexicalIndex.start_compaction`), so updates and
+        queries continue meanwhile. Only re-applying the changes made since
+        and swapping the index in hold the lock.
+        """
+
+        try:
+            with self._lock:
+                lexical = self.lexical
+                size = lexical.size
+                live = lexical.live_mask(size)
+            compacted = lexical.start_compaction(size, live)
+            with self._lock:
+                if self.lexical is lexical:
+                    lexical.finish_compaction(compacted, size, live)
+                    self.lexical = compacted
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    # ------------------------------------------------------------------
+    def _filter_bitmaps(
+        self,
+        lexical: LexicalIndex,
+        filters: Mapping[str, Any] | None,
+        size: int | None = None,
+    ) -> List[np.ndarray] | None:
+        """Return one bitmap per condition of ``filters`` over ``size`` rows.
+
+        Each condition (see :func:`index.filters.split`) is evaluated once per
+        ``lexical`` index into a boolean array that is extended as documents
+        are appended; filtered queries then look rows up in the cached
+        bitmaps instead of rescanning document tags. Returns ``None`` when
+        there is nothing to filter on.
+        """
+
+        parts = payload_filters.split(filters)
+        if not parts:
+            return None
+        owner, bitmaps = self._bitmaps
+        if owner is not lexical or len(bitmaps) > MAX_FILTER_BITMAPS:
+            bitmaps = {}
+            self._bitmaps = (lexical, bitmaps)
+        size = lexical.size if size is None else size
+        docs = lexical.docs
+        result: List[np.ndarray] = []
+        for part in parts:
+            key = json.dumps(part, sort_keys=True)
+            bitmap = bitmaps.get(key, np.zeros(0, dtype=bool))
+            if len(bitmap) < size:
+                fresh = np.fromiter(
+                    (
+                        payload_filters.matches(c.tags, part)
+                        for c in docs[len(bitmap) : size]
+                    ),
+                    dtype=bool,
+                    count=size - len(bitmap),
+                )
+                bitmap = np.concatenate([bitmap, fresh])
+                bitmaps[key] = bitmap
+            result.append(bitmap[:size])
+        return result
+
+    # ------------------------------------------------------------------
+    def _lexical_search(
+        self, query: str, top_k: int, filters: Mapping[str, Any] | None = None
+    ) -> List[RetrievedDoc]:
+        return self._lexical_search_batch([query], top_k, filters)[0]
+
+    # ------------------------------------------------------------------
+    def _lexical_search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[List[RetrievedDoc]]:
+        """BM25-rank the corpus for every query in ``queries``.
+
+        Each query reads only the postings of its terms and selects its top
+        ``top_k`` without sorting the corpus (see :meth:`LexicalIndex.search`);
+        the filtered postings of a term are shared by all queries containing
+        it. With ``filters`` only rows set in every filter bitmap are ranked.
+        Like a full ``BM25Okapi`` ranking, a query matching fewer than
+        ``top_k`` live documents is padded with unmatched ones scoring 0, in
+        corpus order. The ``qdrant`` backend runs all queries as one sparse
+        vector request instead and returns matching documents only.
+        """
+
+        if self.lexical_backend == "qdrant":
+            return [
+                [self._from_hit(hit) for hit in hits]
+                for hits in self.store.sparse_search_batch(
+                    list(queries), top_k=top_k, filters=filters
+                )
+            ]
+        lexical = self.lexical
+        size = lexical.size
+        if not lexical.live_count:
+            return [[] for _ in queries]
+        bitmaps = self._filter_bitmaps(lexical, filters, size)
+        accept: RowFilter | None = None
+        if bitmaps is not None:
+
+            def accept(rows: np.ndarray) -> np.ndarray:
+                return np.logical_and.reduce([bitmap[rows] for bitmap in bitmaps])
+
+        cache: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        corpus = lexical.docs
+        results: List[List[RetrievedDoc]] = []
+        for query in queries:
+            rows, scores = lexical.search(tokenize(query), top_k, size, accept, cache)
+            results.append(
+                [
+                    RetrievedDoc(
+                        corpus[i], score=float(score), id=_doc_id(corpus[i])
+                    )
+                    for i, score in zip(rows, scores)
+                ]
+            )
+        return results
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _from_hit(hit: SearchHit) -> RetrievedDoc:
+        """Wrap a store :class:`SearchHit` as a :class:`RetrievedDoc`."""
+
+        payload = hit.payload
+        doc = TextDoc(text=payload.get("text", ""), tags=payload.get("tags", {}))
+        return RetrievedDoc(doc=doc, score=hit.score, id=hit.id)
+
+    # ------------------------------------------------------------------
+    def _semantic_search(
+        self,
+        query: str,
+        top_k: int,
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[RetrievedDoc]:
+        """Embed ``query`` and search the store.
+
+        ``search_params`` (``hnsw_ef``, ``exact``, ``oversampling``,
+        ``rescore``) are passed through to Qdrant for this request only, and
+        ``filters`` restrict the search to matching chunks.
+        """
+
+        hits = self.store.search(
+            query, top_k=top_k, search_params=search_params, filters=filters
+        )
+        return [self._from_hit(hit) for hit in hits]
+
+    # ------------------------------------------------------------------
+    def _semantic_search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int,
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[List[RetrievedDoc]]:
+        """Run semantic search for all ``queries`` in one store round trip.
+
+        See :meth:`EmbeddingStore.search_batch`: one encode call and one
+        Qdrant batch search serve every query.
+        """
+
+        return [
+            [self._from_hit(hit) for hit in hits]
+            for hits in self.store.search_batch(
+                list(queries),
+                top_k=top_k,
+                search_params=search_params,
+                filters=filters,
+            )
+        ]
+
+    # ------------------------------------------------------------------
+    async def _semantic_search_async(
+        self,
+        query: str,
+        top_k: int,
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[RetrievedDoc]:
+        """Async variant of :meth:`_semantic_search`.
+
+        Awaits :meth:`EmbeddingStore.asearch`, so the Qdrant round trip does
+        not occupy a worker thread.
+        """
+
+        hits = await self.store.asearch(
+            query, top_k=top_k, search_params=search_params, filters=filters
+        )
+        return [self._from_hit(hit) for hit in hits]
+
+    # ------------------------------------------------------------------
+    async def _semantic_search_batch_async(
+        self,
+        queries: Sequence[str],
+        top_k: int,
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[List[RetrievedDoc]]:
+        """Async variant of :meth:`_semantic_search_batch`."""
+
+        results = await self.store.asearch_batch(
+            list(queries), top_k=top_k, search_params=search_params, filters=filters
+        )
+        return [[self._from_hit(hit) for hit in hits] for hits in results]
+
+    # ------------------------------------------------------------------
+    def _hybrid_search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int,
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[Tuple[List[RetrievedDoc], List[RetrievedDoc], List[RetrievedDoc]]]:
+        """Return ``(fused, semantic, lexical)`` hits for every query.
+
+        With the ``qdrant`` backend all of them come from one Qdrant request
+        (see :meth:`EmbeddingStore.hybrid_search_batch`) and ``fused`` is
+        Qdrant's RRF ranking; otherwise both retrievers are searched
+        concurrently (see :meth:`_run_branches`) and the results fused with
+        :meth:`_fuse`.
+        """
+
+        queries = list(queries)
+        if self.lexical_backend == "qdrant":
+            results = self.store.hybrid_search_batch(
+                queries,
+                top_k=top_k,
+                search_params=search_params,
+                filters=filters,
+                branches=True,
+            )
+            return [
+                (
+                    [self._from_hit(hit) for hit in fused],
+                    [self._from_hit(hit) for hit in sem],
+                    [self._from_hit(hit) for hit in lex],
+                )
+                for fused, sem, lex in results
+            ]
+        sem, lex = self._run_branches(
+            lambda: self._semantic_search_batch(queries, top_k, search_params, filters),
+            lambda: self._lexical_search_batch(queries, top_k, filters),
+        )
+        sem = sem or [[] for _ in queries]
+        lex = lex or [[] for _ in queries]
+        return [
+            (self._fuse([sem_hits, lex_hits], top_k), sem_hits, lex_hits)
+            for sem_hits, lex_hits in zip(sem, lex)
+        ]
+
+    # ------------------------------------------------------------------
+    def _run_branches(
+        self, semantic: Callable[[], Any], lexical: Callable[[], Any]
+    ) -> Tuple[Any, Any]:
+        """Run the ``semantic`` and ``lexical`` searches concurrently.
+
+        Blocking wrapper around :func:`run_branches` with
+        :attr:`branch_timeouts`, so it must not be called from a running
+        event loop. A branch that fails or times out yields ``None`` if the
+        other one succeeded; when both fail the semantic branch's error is
+        raised.
+        """
+
+        results, _ = asyncio.run(
+            run_branches(
+                {"semantic": semantic, "lexical": lexical}, self.branch_timeouts
+            )
+        )
+        return results.get("semantic"), results.get("lexical")
 
     # ------------------------------------------------------------------
     def _fuse(
         self, results: Sequence[Sequence[RetrievedDoc]], top_k: int, k: int = 60
-    ) -> List[TextDoc]:
+    ) -> List[RetrievedDoc]:
+        """Fuse ranked ``results`` by point ID; scores are the RRF sums."""
+
         scores: defaultdict[str, float] = defaultdict(float)
         docs: dict[str, TextDoc] = {}
         for result_set in results:
             for rank, item in enumerate(result_set, start=1):
-                key = item.doc.text  # use text as a simple identifier
-                docs[key] = item.doc
-                scores[key] += 1.0 / (k + rank)
+                docs.setdefault(item.id, item.doc)
+                scores[item.id] += 1.0 / (k + rank)
         ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
-        return [docs[key] for key, _ in ranked]
+        return [RetrievedDoc(docs[key], score=score, id=key) for key, score in ranked]
 
     # ------------------------------------------------------------------
     def _expand_graph(
@@ -180,27 +761,86 @@ class BaseRetriever:
         mode: str = "hybrid",
         graph: bool = False,
         graph_params: Mapping[str, int] | None = None,
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
     ) -> Tuple[List[TextDoc], Dict[str, Any] | None]:
         """Retrieve documents matching ``query`` using ``mode``.
 
         When ``graph`` is ``True`` and a graph was provided at initialisation,
         neighbouring nodes of entities found in the retrieved documents are
         returned as ``graph_context``. ``graph_params`` can limit expansion via
-        ``neighbors`` and ``depth``.
+        ``neighbors`` and ``depth``. ``search_params`` tune the precision of
+        the semantic search (see :meth:`_semantic_search`), and ``filters``
+        restrict both retrievers to matching chunks. The branches of a hybrid
+        query run concurrently; if one fails or times out, the other one's
+        results are returned.
         """
 
         mode = mode.lower()
         docs: List[TextDoc]
         if mode == "semantic":
-            docs = [rd.doc for rd in self._semantic_search(query, top_k)]
+            docs = [
+                rd.doc
+                for rd in self._semantic_search(query, top_k, search_params, filters)
+            ]
         elif mode == "lexical":
-            docs = [rd.doc for rd in self._lexical_search(query, top_k)]
+            docs = [rd.doc for rd in self._lexical_search(query, top_k, filters)]
+        elif mode == "hybrid" and self.lexical_backend == "qdrant":
+            fused, _, _ = self._hybrid_search_batch(
+                [query], top_k, search_params, filters
+            )[0]
+            docs = [rd.doc for rd in fused]
         elif mode == "hybrid":
-            sem = self._semantic_search(query, top_k)
-            lex = self._lexical_search(query, top_k)
-            docs = self._fuse([sem, lex], top_k)
+            sem, lex = self._run_branches(
+                lambda: self._semantic_search(query, top_k, search_params, filters),
+                lambda: self._lexical_search(query, top_k, filters),
+            )
+            docs = [rd.doc for rd in self._fuse([sem or [], lex or []], top_k)]
         else:
             raise ValueError(f"Unknown retrieval mode: {mode}")
 
         graph_ctx = self._expand_graph(docs, graph_params) if graph else None
         return docs, graph_ctx
+
+    # ------------------------------------------------------------------
+    def retrieve_batch(
+        self,
+        queries: Sequence[str],
+        top_k: int = 5,
+        mode: str = "hybrid",
+        graph: bool = False,
+        graph_params: Mapping[str, int] | None = None,
+        search_params: Mapping[str, Any] | None = None,
+        filters: Mapping[str, Any] | None = None,
+    ) -> List[Tuple[List[TextDoc], Dict[str, Any] | None]]:
+        """Retrieve documents for each of ``queries`` using ``mode``.
+
+        Equivalent to calling :meth:`retrieve` per query, but all semantic
+        queries share one encode call and one Qdrant batch search, and all
+        lexical queries are scored in one pass over the corpus (or, with the
+        ``qdrant`` lexical backend, one Qdrant request serves everything).
+        """
+
+        mode = mode.lower()
+        queries = list(queries)
+        ranked: List[List[RetrievedDoc]]
+        if mode == "semantic":
+            ranked = self._semantic_search_batch(queries, top_k, search_params, filters)
+        elif mode == "lexical":
+            ranked = self._lexical_search_batch(queries, top_k, filters)
+        elif mode == "hybrid":
+            ranked = [
+                fused
+                for fused, _, _ in self._hybrid_search_batch(
+                    queries, top_k, search_params, filters
+                )
+            ]
+        else:
+            raise ValueError(f"Unknown retrieval mode: {mode}")
+
+        results: List[Tuple[List[TextDoc], Dict[str, Any] | None]] = []
+        for hits in ranked:
+            docs = [rd.doc for rd in hits]
+            graph_ctx = self._expand_graph(docs, graph_params) if graph else None
+            results.append((docs, graph_ctx))
+        return results
@@ -12,7 +12,7 @@ from fastapi.testclient import TestClient
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from index.embedding_store import EmbeddingStore, TextDoc
+from index.embedding_store import EmbeddingStore, SearchHit, TextDoc, point_id
 from retriever.base import BaseRetriever
 from reasoner.runner import Runner
 
@@ -40,20 +40,32 @@ def _setup_app_with_corpus():
             self.docs = docs
         def add_texts(self, texts, metadatas=None):
             pass
-        def query(self, query: str, top_k: int = 5):
+        def search(self, query: str, top_k: int = 5, search_params=None, filters=None):
             matches = [d for d in self.docs if query in d.text]
             matches.reverse()
-            return matches[:top_k]
+            return [
+                SearchHit(
+                    point_id(d.text, d.tags.get("file_id")),
+                    1.0,
+                    {"text": d.text, "tags": d.tags},
+                )
+                for d in matches[:top_k]
+            ]
+        async def asearch(
+            self, query: str, top_k: int = 5, search_params=None, filters=None
+        ):
+            return self.search(query, top_k, search_params, filters)
     store = Store(corpus)
     retriever = BaseRetriever(store, corpus)
-    main.retriever = retriever
+    main.registry.register(retriever)
     client = TestClient(main.app)
     return client, corpus, store, retriever
 
 
-def test_ac_ing_01_ingest_returns_job_id():
+def test_ac_ing_01_ingest_returns_job_id(tmp_path, monkeypatch):
     """AC-ING-01: uploading files returns a job identifier."""
 
+    monkeypatch.setenv("UPLOAD_DIR", str(tmp_path))
     main = _reload_app()
     client = TestClient(main.app)
     for _ in range(3):
@@ -88,9 +100,15 @@ def test_ac_ret_02_semantic_dominates_for_abstract_query():
     """AC-RET-02: abstract queries are handled by semantic retrieval."""
 
     client, corpus, store, retriever = _setup_app_with_corpus()
-    def query(self, query: str, top_k: int = 5):
-        return [corpus[0]] if query == "abstract" else []
-    store.query = query.__get__(store, type(store))
+    def search(self, query: str, top_k: int = 5, search_params=None, filters=None):
+        doc = corpus[0]
+        hit = SearchHit(
+            point_id(doc.text, doc.tags.get("file_id")),
+            0.9,
+            {"text": doc.text, "tags": doc.tags},
+        )
+        return [hit] if query == "abstract" else []
+    store.search = search.__get__(store, type(store))
     docs, _ = retriever.retrieve("abstract", top_k=1, mode="hybrid")
     assert docs[0].text == "alpha beta"
     lex = retriever._lexical_search("abstract", top_k=1)
@@ -4,7 +4,7 @@ import sys
 # Ensure repository root is on the Python path for imports during tests.
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from ingest.chunking import chunk_text, get_text_splitter
+from ingest.chunking import chunk_elements, chunk_text, get_text_splitter
 
 
 def test_get_text_splitter_env(monkeypatch):
@@ -21,3 +21,40 @@ def test_chunk_text(monkeypatch):
     text = "abcdefghijk"
     chunks = chunk_text(text)
     assert chunks == ["abcdefghij", "ijk"]
+
+
+class Element:
+    def __init__(self, text: str, page: int | None = None) -> None:
+        self.text = text
+        self.metadata = {"page_number": page} if page is not None else {}
+
+
+def test_get_text_splitter_is_cached(monkeypatch):
+    monkeypatch.setenv("CHUNK_SIZE", "10")
+    monkeypatch.setenv("CHUNK_OVERLAP", "2")
+    assert get_text_splitter() is get_text_splitter()
+
+
+def test_chunk_elements_tracks_page_and_span(monkeypatch):
+    monkeypatch.setenv("CHUNK_SIZE", "10")
+    monkeypatch.setenv("CHUNK_OVERLAP", "2")
+    elements = [
+        Element("ab", page=1),
+        Element("cd", page=1),
+        Element("   "),
+        Element("abcdefghijk", page=2),
+        Element("xyz", page=2),
+    ]
+    full_text = "\n\n".join(e.text for e in elements if e.text.strip())
+
+    chunks = list(chunk_elements(iter(elements)))
+
+    assert [(c.text, c.page) for c in chunks] == [
+        ("ab\n\ncd", 1),
+        ("abcdefghij", 2),
+        ("ijk", 2),
+        ("xyz", 2),
+    ]
+    for chunk in chunks:
+        start, end = chunk.span
+        assert full_text[start:end] == chunk.text
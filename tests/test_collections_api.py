@@ -60,3 +60,26 @@ def test_delete_collection_requires_auth():
         "/collections/test", headers={"Authorization": "Bearer secret"}
     )
     assert resp.status_code == 200
+
+
+def test_snapshot_and_restore_collection(tmp_path, monkeypatch):
+    main = _reload_app()
+    monkeypatch.setattr(main, "SNAPSHOT_DIR", tmp_path)
+    client = TestClient(main.app)
+    retriever = main.registry.retriever("src")
+    retriever.add_texts(
+        [main.TextDoc(text=f"note {i}", tags={"file_id": "f"}) for i in range(3)]
+    )
+
+    resp = client.post("/collections/src/snapshot", params={"dtype": "float16"})
+    assert resp.status_code == 200
+    assert resp.json()["points"] == 3
+    name = resp.json()["snapshot"]
+    assert (tmp_path / name).is_file()
+
+    resp = client.post("/collections/dst/restore", params={"snapshot": name})
+    assert resp.status_code == 200
+    assert client.get("/collections/dst/stats").json()["points_count"] == 3
+    assert main.registry.retriever("dst").lexical_ids() == retriever.lexical_ids()
+    resp = client.post("/collections/dst/restore", params={"snapshot": "../x.snap"})
+    assert resp.status_code == 404
@@ -0,0 +1,80 @@
+from pathlib import Path
+import hashlib
+import sys
+
+import numpy as np
+
+# Ensure repository root on path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from index.embedding_cache import CACHE_HITS, CACHE_MISSES, EmbeddingCache
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def test_vectors_persist_across_instances(tmp_path):
+    cache = EmbeddingCache(tmp_path, "org/model", dim=3, capacity=4)
+    cache.put_many([_digest("a")], [[1.0, 2.0, 3.0]])
+
+    reopened = EmbeddingCache(tmp_path, "org/model", dim=3, capacity=4)
+    hit, miss = reopened.get_many([_digest("a"), _digest("b")])
+    assert np.allclose(hit, [1.0, 2.0, 3.0])
+    assert miss is None
+    # Another model never sees these vectors.
+    other = EmbeddingCache(tmp_path, "org/other", dim=3, capacity=4)
+    assert other.get_many([_digest("a")]) == [None]
+
+
+def test_capacity_bounded_with_second_chance(tmp_path):
+    cache = EmbeddingCache(tmp_path, "m", dim=1, capacity=2)
+    cache.put_many([_digest("a"), _digest("b")], [[1.0], [2.0]])
+    cache.get_many([_digest("a")])
+    cache.put_many([_digest("c")], [[3.0]])
+
+    assert len(cache) == 2
+    a, b, c = cache.get_many([_digest(t) for t in "abc"])
+    assert a is not None and b is None and c is not None
+
+
+def test_hit_and_miss_counters(tmp_path):
+    cache = EmbeddingCache(tmp_path, "m", dim=1, capacity=2)
+    cache.put_many([_digest("a")], [[1.0]])
+    hits = CACHE_HITS._value.get()
+    misses = CACHE_MISSES._value.get()
+    cache.get_many([_digest("a"), _digest("z")])
+    assert CACHE_HITS._value.get() == hits + 1
+    assert CACHE_MISSES._value.get() == misses + 1
+
+
+def test_crash_before_keys_are_published_never_serves_a_wrong_vector(tmp_path):
+    cache = EmbeddingCache(tmp_path, "m", dim=1, capacity=1)
+    cache.put_many([_digest("a")], [[1.0]])
+
+    keys_at_vector_flush = []
+
+    def crash():
+        keys_at_vector_flush.append(bytes(cache._keys[0]))
+        raise OSError("disk full")
+
+    cache._vectors.flush = crash
+    try:
+        cache.put_many([_digest("b")], [[2.0]])
+    except OSError:
+        pass
+
+    # The evicted key was cleared and the new one not yet written.
+    assert keys_at_vector_flush == [b""]
+    reopened = EmbeddingCache(tmp_path, "m", dim=1, capacity=1)
+    assert reopened.get_many([_digest("a"), _digest("b")]) == [None, None]
+
+
+def test_batch_larger_than_capacity_keeps_keys_and_vectors_paired(tmp_path):
+    cache = EmbeddingCache(tmp_path, "m", dim=1, capacity=2)
+    cache.put_many([_digest(t) for t in "abc"], [[1.0], [2.0], [3.0]])
+
+    found = cache.get_many([_digest(t) for t in "abc"])
+    assert len(cache) == 2
+    for vector, expected in zip(found, [1.0, 2.0, 3.0]):
+        assert vector is None or vector[0] == expected
@@ -1,6 +1,8 @@
 from pathlib import Path
 import sys
 
+import pytest
+
 # Ensure the repository root is on the Python path for module resolution during tests.
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
@@ -27,3 +29,370 @@ def test_add_texts_deduplicates_and_stores_metadata():
     payload = retrieved[0].payload
     assert payload["text"] == text
     assert payload["tags"]["source"] == "unit"
+
+
+class FakeModel:
+    def __init__(self, *_, **__):
+        self.batches: list[list[str]] = []
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 2
+
+    def encode(self, texts, batch_size: int = 32):
+        import numpy as np
+
+        if isinstance(texts, str):
+            return np.array([float(len(texts)), 1.0])
+        self.batches.append(list(texts))
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+def test_add_texts_encodes_in_length_sorted_batches(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:", batch_size=2)
+    texts = ["ccc", "a", "dddd", "bb", "a"]
+
+    ids = store.add_texts(texts)
+
+    assert len(ids) == 4
+    assert store.model.batches == [["a", "bb"], ["ccc", "dddd"]]
+    retrieved = store.client.retrieve(
+        collection_name=store.collection_name, ids=ids, with_vectors=True
+    )
+    for point in retrieved:
+        ratio = point.vector[0] / point.vector[1]
+        assert abs(ratio - len(point.payload["text"])) < 1e-4
+    by_text = {p.payload["text"]: p.id.replace("-", "") for p in retrieved}
+    assert [by_text[t] for t in ["ccc", "a", "dddd", "bb"]] == ids
+
+
+def test_add_texts_only_checks_qdrant_for_bloom_hits(monkeypatch, tmp_path):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:", hash_index_dir=str(tmp_path))
+    calls: list[list[str]] = []
+    retrieve = store.client.retrieve
+
+    def counting_retrieve(*args, **kwargs):
+        calls.append(list(kwargs["ids"]))
+        return retrieve(*args, **kwargs)
+
+    monkeypatch.setattr(store.client, "retrieve", counting_retrieve)
+
+    first = store.add_texts(["one", "two"])
+    assert len(first) == 2
+    assert calls == []
+
+    second = store.add_texts(["one", "three"])
+    assert second == [store._sha256("three")[:32]]
+    assert len(calls) == 1
+    assert (tmp_path / f"{store.collection_name}.bloom").exists()
+
+
+def test_hash_index_rebuilt_from_collection(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    store.add_texts(["persisted"])
+    store.hash_index.clear()
+
+    store._rebuild_hash_index()
+
+    assert store._sha256("persisted") in store.hash_index
+    assert store.add_texts(["persisted"]) == []
+
+
+def test_rebuild_rekeys_points_stored_under_text_only_ids(monkeypatch, tmp_path):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    legacy = {
+        text: {"text": text, "tags": {"file_id": "doc"}, "hash": store._sha256(text)}
+        for text in ("intro", "body")
+    }
+    store.upsert_points(
+        [p["hash"][:32] for p in legacy.values()],
+        [[1.0, 0.0], [0.0, 1.0]],
+        list(legacy.values()),
+    )
+    store.add_texts(["body"], [{"file_id": "doc"}])
+    (tmp_path / f"{store.collection_name}.bloom").write_bytes(b"\0" * 64)
+    store.hash_index_dir = str(tmp_path)
+
+    # A filter saved before the format carried a magic is rebuilt once.
+    store._open_hash_index()
+
+    assert store.file_point_ids("doc") == {
+        es.point_id("intro", "doc"),
+        es.point_id("body", "doc"),
+    }
+    point = store.client.retrieve(
+        store.collection_name, [es.point_id("intro", "doc")], with_vectors=True
+    )[0]
+    assert point.payload == legacy["intro"] and point.vector == [1.0, 0.0]
+    assert store.add_texts(["intro"], [{"file_id": "doc"}]) == []
+    assert store.hash_index.load()
+
+
+def test_hash_index_is_persisted_next_to_the_data_by_default(monkeypatch, tmp_path):
+    import index.embedding_store as es
+    from qdrant_client import QdrantClient
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    monkeypatch.delenv("HASH_INDEX_DIR", raising=False)
+    monkeypatch.chdir(tmp_path)
+    client = QdrantClient(path=str(tmp_path / "qdrant"))
+    store = es.EmbeddingStore(client=client)
+    store.add_texts(["persisted"])
+    store.for_collection("other")
+    assert (tmp_path / "data" / "hash_index" / "documents.bloom").exists()
+    assert es.EmbeddingStore(location=":memory:").hash_index_dir is None
+
+    monkeypatch.setattr(
+        es.EmbeddingStore,
+        "_rebuild_hash_index",
+        lambda self: pytest.fail("the collection was scanned"),
+    )
+    other = store.for_collection("other")
+    assert other.hash_index.path == Path("data", "hash_index", "other.bloom")
+    reopened = es.EmbeddingStore(client=client)
+    assert store._sha256("persisted") in reopened.hash_index
+    client.close()
+
+
+def test_replace_file_only_embeds_changed_chunks(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    v1 = ["intro", "body", "outro"]
+    store.replace_file("doc", v1, [{"file_id": "doc", "span": [i, i]} for i in range(3)])
+    store.model.batches.clear()
+
+    v2 = ["intro", "edited body", "outro"]
+    added, kept, removed = store.replace_file(
+        "doc", v2, [{"file_id": "doc", "span": [i, i + 1]} for i in range(3)]
+    )
+
+    uid = lambda text: es.point_id(text, "doc")
+    assert added == [uid("edited body")]
+    assert sorted(kept) == sorted([uid("intro"), uid("outro")])
+    assert removed == [uid("body")]
+    assert store.model.batches == [["edited body"]]
+    assert store.file_point_ids("doc") == {uid(t) for t in v2}
+    point = store.client.retrieve(collection_name=store.collection_name, ids=[uid("outro")])[0]
+    assert point.payload["tags"]["span"] == [2, 3]
+
+
+def test_shared_chunk_text_survives_replacing_and_deleting_other_document(
+    monkeypatch,
+):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    store.replace_file("a", ["shared", "only a"], [{"file_id": "a"}] * 2)
+
+    added, kept, removed = store.replace_file("b", ["shared"], [{"file_id": "b"}])
+
+    assert added == [es.point_id("shared", "b")] and kept == removed == []
+    store.replace_file("a", ["only a"], [{"file_id": "a"}])
+    store.delete_file("a")
+    assert store.file_point_ids("b") == {es.point_id("shared", "b")}
+    assert store.query("shared", top_k=1)[0].tags == {"file_id": "b"}
+
+
+def test_embedding_cache_reused_across_collections(monkeypatch, tmp_path):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    first = es.EmbeddingStore(location=":memory:", cache_dir=str(tmp_path))
+    first.add_texts(["cached chunk"])
+    second = es.EmbeddingStore(
+        location=":memory:", collection_name="other", cache_dir=str(tmp_path)
+    )
+
+    ids = second.add_texts(["cached chunk", "new chunk"])
+
+    assert len(ids) == 2
+    assert second.model.batches == [["new chunk"]]
+
+
+def test_backend_selection(monkeypatch, tmp_path):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "QuantizedOnnxEncoder", FakeModel)
+    store = es.EmbeddingStore(
+        location=":memory:", backend="onnx-int8", cache_dir=str(tmp_path)
+    )
+    assert isinstance(store.model, FakeModel)
+    assert store.cache.path.name.endswith("onnx-int8-2")
+    with pytest.raises(ValueError):
+        es.load_model("model", "tensorrt")
+
+
+def test_search_returns_ids_scores_and_selected_payload(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    store.add_texts(["bb", "dddddddd"], [{"file_id": "a"}, {"file_id": "b"}])
+
+    hits = store.search("bb", top_k=2, with_payload=["text"])
+
+    assert [h.id for h in hits] == [
+        es.point_id("bb", "a"),
+        es.point_id("dddddddd", "b"),
+    ]
+    assert hits[0].score == pytest.approx(1.0)
+    assert hits[0].score > hits[1].score
+    assert hits[0].payload == {"text": "bb"}
+    assert store.query("bb", top_k=1)[0].tags == {"file_id": "a"}
+
+
+def test_search_batch_encodes_once(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    store.add_texts(["bb", "dddddddd"])
+    store.model.batches.clear()
+
+    results = store.search_batch(["bb", "dddddddd"], top_k=1)
+
+    assert store.model.batches == [["bb", "dddddddd"]]
+    assert [hits[0].id for hits in results] == [
+        es.point_id("bb"),
+        es.point_id("dddddddd"),
+    ]
+    assert results == [store.search("bb", top_k=1), store.search("dddddddd", top_k=1)]
+
+
+def test_collection_created_with_vector_config(monkeypatch):
+    import index.embedding_store as es
+    from index.vector_config import VectorConfig
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    created = {}
+    create = es.QdrantClient.create_collection
+
+    def recording_create(self, *args, **kwargs):
+        created.update(kwargs)
+        return create(self, *args, **kwargs)
+
+    monkeypatch.setattr(es.QdrantClient, "create_collection", recording_create)
+    config = VectorConfig(quantization="scalar", hnsw_m=8)
+    store = es.EmbeddingStore(location=":memory:", vector_config=config)
+    store.add_texts(["bb"])
+
+    assert created["hnsw_config"].m == 8
+    assert created["quantization_config"].scalar.type == "int8"
+    assert store.search("bb", top_k=1)[0].id == es.point_id("bb")
+
+
+def test_asearch_awaits_async_client(monkeypatch):
+    import asyncio
+
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    store.add_texts(["bb", "dddddddd"])
+    assert asyncio.run(store.asearch("bb", top_k=1)) == store.search("bb", top_k=1)
+
+    calls: list[str] = []
+
+    class AsyncClient:
+        async def search(self, **kwargs):
+            calls.append("search")
+            return store.client.search(**kwargs)
+
+        async def search_batch(self, **kwargs):
+            calls.append("search_batch")
+            return store.client.search_batch(**kwargs)
+
+    store.async_client = AsyncClient()
+    hits = asyncio.run(store.asearch("bb", top_k=1))
+    batch = asyncio.run(store.asearch_batch(["bb", "dddddddd"], top_k=1))
+
+    assert calls == ["search", "search_batch"]
+    assert hits == store.search("bb", top_k=1)
+    assert batch == store.search_batch(["bb", "dddddddd"], top_k=1)
+
+
+def test_connection_params_prefer_grpc(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setenv("QDRANT_PREFER_GRPC", "true")
+    monkeypatch.setenv("QDRANT_GRPC_PORT", "7334")
+    params = es.connection_params(host="qdrant")
+    assert params == {
+        "host": "qdrant",
+        "port": 6333,
+        "grpc_port": 7334,
+        "prefer_grpc": True,
+    }
+
+
+def test_search_filters_are_pushed_down_with_payload_indexes(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    indexed: list[tuple[str, str]] = []
+    create_index = es.QdrantClient.create_payload_index
+
+    def recording_create_index(self, **kwargs):
+        indexed.append((kwargs["field_name"], kwargs["field_schema"]))
+        return create_index(self, **kwargs)
+
+    monkeypatch.setattr(es.QdrantClient, "create_payload_index", recording_create_index)
+    store = es.EmbeddingStore(
+        location=":memory:", filter_tags=es.payload_filters.tag_indexes("lang")
+    )
+    store.add_texts(
+        ["bb", "cc", "dddd"],
+        [
+            {"file_id": "a", "page": 1, "lang": "en"},
+            {"file_id": "a", "page": 3, "lang": "de"},
+            {"file_id": "b", "page": 2, "lang": "en"},
+        ],
+    )
+    assert indexed == [
+        ("tags.file_id", "keyword"),
+        ("tags.page", "integer"),
+        ("tags.lang", "keyword"),
+    ]
+
+    hits = store.search("bb", top_k=3, filters={"file_id": "a"})
+    assert {h.payload["text"] for h in hits} == {"bb", "cc"}
+    hits = store.search("bb", top_k=3, filters={"page_from": 2, "tags": {"lang": "en"}})
+    assert [h.payload["text"] for h in hits] == ["dddd"]
+    batch = store.search_batch(["bb", "cc"], top_k=3, filters={"file_id": ["b"]})
+    assert [[h.payload["text"] for h in hits] for hits in batch] == [["dddd"]] * 2
+    store.search("bb", filters={"tags": {"lang": "de"}})
+    # Searches never create indexes; other tags are rejected instead.
+    with pytest.raises(ValueError, match="source"):
+        store.search("bb", filters={"tags": {"source": "x"}})
+    assert len(indexed) == 3
+
+
+def test_delete_file_removes_points_in_one_call(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    store.add_texts(["a", "bb", "ccc"], [{"file_id": "x"}, {"file_id": "x"}, {}])
+    calls = []
+    delete = store.client.delete
+    store.client.delete = lambda **kwargs: calls.append(kwargs) or delete(**kwargs)
+
+    store.delete_file("x")
+
+    assert len(calls) == 1
+    assert store.file_point_ids("x") == set()
+    assert [h.payload["text"] for h in store.search("a", top_k=5)] == ["ccc"]
@@ -4,7 +4,7 @@ import sys
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from index.embedding_store import TextDoc
+from index.embedding_store import SearchHit, TextDoc, point_id
 from retriever.base import BaseRetriever
 
 
@@ -27,10 +27,17 @@ class FakeStore:
     def add_texts(self, texts, metadatas=None):
         pass
 
-    def query(self, query: str, top_k: int = 5):
+    def search(self, query: str, top_k: int = 5, search_params=None, filters=None):
         matches = [d for d in self.docs if query in d.text]
         matches.reverse()
-        return matches[:top_k]
+        return [
+            SearchHit(
+                point_id(d.text, d.tags.get("file_id")),
+                1.0 / rank,
+                {"text": d.text, "tags": d.tags},
+            )
+            for rank, d in enumerate(matches[:top_k], start=1)
+        ]
 
 
 def test_evaluate_returns_metrics():
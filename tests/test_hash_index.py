@@ -0,0 +1,59 @@
+from pathlib import Path
+import hashlib
+import sys
+
+# Ensure repository root on path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from index.hash_index import ChunkHashIndex
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def test_membership_has_no_false_negatives():
+    index = ChunkHashIndex(capacity=1000)
+    added = [_digest(f"chunk {i}") for i in range(500)]
+    index.update(added)
+    assert all(d in index for d in added)
+    misses = sum(_digest(f"other {i}") in index for i in range(1000))
+    assert misses < 50
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / "docs.bloom"
+    index = ChunkHashIndex(capacity=100, path=path)
+    index.add(_digest("hello"))
+    index.save()
+
+    restored = ChunkHashIndex(capacity=10, path=path)
+    assert restored.load()
+    assert restored.num_bits == index.num_bits
+    assert _digest("hello") in restored
+    assert not ChunkHashIndex(path=tmp_path / "missing.bloom").load()
+
+
+def test_concurrent_adds_and_saves_keep_every_digest(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    path = tmp_path / "docs.bloom"
+    index = ChunkHashIndex(capacity=10_000, path=path)
+
+    def ingest(worker: int) -> None:
+        for batch in range(20):
+            index.update(_digest(f"{worker}-{batch}-{i}") for i in range(10))
+            index.save()
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(ingest, range(4)))
+
+    restored = ChunkHashIndex(capacity=10, path=path)
+    assert restored.load()
+    assert all(
+        _digest(f"{w}-{b}-{i}") in restored
+        for w in range(4)
+        for b in range(20)
+        for i in range(10)
+    )
+    assert [p.name for p in tmp_path.iterdir()] == ["docs.bloom"]
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from pathlib import Path
+import hashlib
 import importlib
 import sys
 import types
+import asyncio
 import collections
+import time
 import uuid
 
 import pytest
@@ -13,8 +16,13 @@ from fastapi.testclient import TestClient
 # Ensure repository root on path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from app.job_store import JobStore
+from ingest.chunking import Chunk
+
 
 class DummyStore:
+    collection_name = "documents"
+
     def __init__(self, *_, **__):
         self.texts: list[str] = []
         self.metadatas: list[dict] = []
@@ -26,6 +34,19 @@ class DummyStore:
         self.metadatas = list(metadatas) if metadatas else []
         return [f"id{i}" for i, _ in enumerate(self.texts)]
 
+    def replace_file(self, file_id, texts, metadatas=None):
+        self.replaced = file_id
+        ids = self.add_texts(texts, metadatas)
+        return ids, [], []
+
+    def delete_file(self, file_id):
+        self.deleted = file_id
+
+
+def _point_id(text: str, file_id: str | None = None) -> str:
+    key = text if file_id is None else f"{file_id}\0{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
 
 class DummyElement:
     def __init__(self, text: str) -> None:
@@ -35,27 +56,28 @@ class DummyElement:
 @pytest.fixture()
 def app_monkeypatched(tmp_path, monkeypatch):
     monkeypatch.setenv("APP_AUTH_MODE", "none")
+    monkeypatch.setenv("LEXICAL_INDEX_DIR", "")
     Version = collections.namedtuple("Version", "major minor micro releaselevel serial")
     monkeypatch.setattr(sys, "version_info", Version(3, 11, 0, "final", 0))
     from app.settings import get_settings
     get_settings.cache_clear()
     dummy_module = types.ModuleType("index.embedding_store")
     dummy_module.EmbeddingStore = DummyStore
-    dummy_module.TextDoc = object
+    dummy_module.TextDoc = types.SimpleNamespace
+    dummy_module.SearchHit = tuple
+    dummy_module.point_id = _point_id
+    dummy_module.connection_params = dict
     sys.modules["index.embedding_store"] = dummy_module
     sys.modules.pop("app.main", None)
     main = importlib.import_module("app.main")
     monkeypatch.setattr(main, "parse_document", lambda path: [DummyElement("hello world")])
-    monkeypatch.setattr(main, "chunk_text", lambda text: ["hello", "world"])
+    monkeypatch.setattr(
+        main,
+        "chunk_elements",
+        lambda elements: iter([Chunk("hello", 1, (0, 5)), Chunk("world", 1, (6, 11))]),
+    )
     monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
-    main.HASH_MAP_PATH = tmp_path / "hashes.json"
-    main.JOBS_PATH = tmp_path / "jobs.json"
-    main.HASH_TO_JOB.clear()
-    main.JOBS.clear()
-    if main.HASH_MAP_PATH.exists():
-        main.HASH_MAP_PATH.unlink()
-    if main.JOBS_PATH.exists():
-        main.JOBS_PATH.unlink()
+    monkeypatch.setattr(main, "job_store", JobStore(tmp_path / "jobs.log"))
     return main
 
 
@@ -63,30 +85,40 @@ def app_monkeypatched(tmp_path, monkeypatch):
 def app_with_auth(tmp_path, monkeypatch):
     monkeypatch.setenv("APP_AUTH_MODE", "token")
     monkeypatch.setenv("APP_TOKEN", "secret")
+    monkeypatch.setenv("LEXICAL_INDEX_DIR", "")
     Version = collections.namedtuple("Version", "major minor micro releaselevel serial")
     monkeypatch.setattr(sys, "version_info", Version(3, 11, 0, "final", 0))
     from app.settings import get_settings
     get_settings.cache_clear()
     dummy_module = types.ModuleType("index.embedding_store")
     dummy_module.EmbeddingStore = DummyStore
-    dummy_module.TextDoc = object
+    dummy_module.TextDoc = types.SimpleNamespace
+    dummy_module.SearchHit = tuple
+    dummy_module.point_id = _point_id
+    dummy_module.connection_params = dict
     sys.modules["index.embedding_store"] = dummy_module
     sys.modules.pop("app.main", None)
     main = importlib.import_module("app.main")
     monkeypatch.setattr(main, "parse_document", lambda path: [DummyElement("hello world")])
-    monkeypatch.setattr(main, "chunk_text", lambda text: ["hello", "world"])
+    monkeypatch.setattr(
+        main,
+        "chunk_elements",
+        lambda elements: iter([Chunk("hello", 1, (0, 5)), Chunk("world", 1, (6, 11))]),
+    )
     monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
-    main.HASH_MAP_PATH = tmp_path / "hashes.json"
-    main.JOBS_PATH = tmp_path / "jobs.json"
-    main.HASH_TO_JOB.clear()
-    main.JOBS.clear()
-    if main.HASH_MAP_PATH.exists():
-        main.HASH_MAP_PATH.unlink()
-    if main.JOBS_PATH.exists():
-        main.JOBS_PATH.unlink()
+    monkeypatch.setattr(main, "job_store", JobStore(tmp_path / "jobs.log"))
     return main
 
 
+def _wait_for_job(client, job_id: str, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while True:
+        status = client.get(f"/ingest/{job_id}").json()
+        if status["status"] in {"done", "error"} or time.monotonic() > deadline:
+            return status
+        time.sleep(0.01)
+
+
 def test_ingest_pipeline(app_monkeypatched):
     client = TestClient(app_monkeypatched.app)
     files = {"file": ("test.pdf", b"dummy", "application/pdf")}
@@ -95,12 +127,12 @@ def test_ingest_pipeline(app_monkeypatched):
     job_id = resp.json()["job_id"]
     uuid.UUID(job_id)
     assert (app_monkeypatched.UPLOAD_DIR / f"{job_id}.pdf").exists()
+    status = _wait_for_job(client, job_id)
     assert app_monkeypatched.store.texts == ["hello", "world"]
     assert app_monkeypatched.store.metadatas == [
-        {"file_id": job_id},
-        {"file_id": job_id},
+        {"file_id": job_id, "page": 1, "span": [0, 5]},
+        {"file_id": job_id, "page": 1, "span": [6, 11]},
     ]
-    status = client.get(f"/ingest/{job_id}").json()
     assert status["status"] == "done"
     assert status["artifacts"] == [
         {"file_id": job_id, "pages": 1, "chunks": 2}
@@ -114,9 +146,63 @@ def test_ingest_skips_duplicate(app_monkeypatched):
     job1 = client.post("/ingest", files=files).json()["job_id"]
     job2 = client.post("/ingest", files=files).json()["job_id"]
     assert job1 == job2
+    _wait_for_job(client, job1)
     assert app_monkeypatched.store.calls == 1
 
 
+def test_ingest_failure_marks_job_error(app_monkeypatched, monkeypatch):
+    def fail(path):
+        raise ValueError("corrupt file")
+
+    monkeypatch.setattr(app_monkeypatched, "parse_document", fail)
+    client = TestClient(app_monkeypatched.app)
+    files = {"file": ("test.pdf", b"broken", "application/pdf")}
+    job_id = client.post("/ingest", files=files).json()["job_id"]
+    status = _wait_for_job(client, job_id)
+    assert status["status"] == "error"
+    assert status["error"] == "corrupt file"
+    assert job_id not in app_monkeypatched.job_store.hashes.values()
+
+
+def test_ingest_rejects_unsupported_type(app_monkeypatched):
+    client = TestClient(app_monkeypatched.app)
+    files = {"file": ("notes.txt", b"text", "text/plain")}
+    resp = client.post("/ingest", files=files)
+    assert resp.status_code == 400
+
+
+def test_ingest_rejects_invalid_collection_before_queueing(app_monkeypatched):
+    client = TestClient(app_monkeypatched.app)
+    files = {"file": ("test.pdf", b"dummy", "application/pdf")}
+    resp = client.post("/ingest", files=files, data={"collection": "../x"})
+    assert resp.status_code == 422
+    assert app_monkeypatched.job_store.jobs == {}
+    assert list(app_monkeypatched.UPLOAD_DIR.glob("*.pdf")) == []
+    assert "../x" not in app_monkeypatched.registry._stores
+
+
+def test_ingest_rejects_when_queue_full(app_monkeypatched, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(
+        app_monkeypatched, "_ingest_slots", threading.BoundedSemaphore(1)
+    )
+    release = threading.Event()
+
+    def slow_parse(path):
+        release.wait(5)
+        return [DummyElement("hello world")]
+
+    monkeypatch.setattr(app_monkeypatched, "parse_document", slow_parse)
+    client = TestClient(app_monkeypatched.app)
+    first = client.post("/ingest", files={"file": ("a.pdf", b"a", "application/pdf")})
+    assert first.status_code == 202
+    second = client.post("/ingest", files={"file": ("b.pdf", b"b", "application/pdf")})
+    assert second.status_code == 503
+    release.set()
+    assert _wait_for_job(client, first.json()["job_id"])["status"] == "done"
+
+
 def test_ingest_requires_auth(app_with_auth):
     client = TestClient(app_with_auth.app)
     files = {"file": ("test.pdf", b"dummy", "application/pdf")}
@@ -126,3 +212,141 @@ def test_ingest_requires_auth(app_with_auth):
         "/ingest", files=files, headers={"Authorization": "Bearer secret"}
     )
     assert resp.status_code == 202
+    _wait_for_job(client, resp.json()["job_id"])
+
+
+def test_ingest_rejects_oversized_upload(app_monkeypatched, monkeypatch):
+    monkeypatch.setattr(app_monkeypatched, "MAX_UPLOAD_BYTES", 10)
+    monkeypatch.setattr(app_monkeypatched, "UPLOAD_BLOCK_BYTES", 4)
+    client = TestClient(app_monkeypatched.app)
+    files = {"file": ("big.pdf", b"x" * 11, "application/pdf")}
+    resp = client.post("/ingest", files=files)
+    assert resp.status_code == 413
+    assert not list(app_monkeypatched.UPLOAD_DIR.glob("*.part"))
+    assert app_monkeypatched.job_store.jobs == {}
+
+
+def test_oversized_body_is_rejected_before_it_is_parsed(
+    app_monkeypatched, monkeypatch
+):
+    monkeypatch.setattr(app_monkeypatched, "MAX_UPLOAD_BYTES", 100)
+    monkeypatch.setattr(app_monkeypatched, "UPLOAD_FORM_OVERHEAD_BYTES", 100)
+
+    async def unreachable(file):
+        raise AssertionError("the endpoint ran")
+
+    monkeypatch.setattr(app_monkeypatched, "_stream_upload", unreachable)
+    client = TestClient(app_monkeypatched.app)
+    files = {"file": ("big.pdf", b"x" * 1000, "application/pdf")}
+    assert client.post("/ingest", files=files).status_code == 413
+
+    # Without a Content-Length the body is cut off once it passes the limit.
+    head = b'--b\r\nContent-Disposition: form-data; name="file"; filename="a.pdf"'
+    chunks = [head + b"\r\n\r\n"] + [b"x" * 50] * 100
+    received = []
+    sent = []
+
+    async def receive():
+        received.append(chunks[len(received)])
+        return {"type": "http.request", "body": received[-1], "more_body": True}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/ingest",
+        "raw_path": b"/ingest",
+        "root_path": "",
+        "scheme": "http",
+        "query_string": b"",
+        "server": ("test", 80),
+        "client": ("test", 1),
+        "http_version": "1.1",
+        "headers": [(b"content-type", b"multipart/form-data; boundary=b")],
+    }
+    asyncio.run(app_monkeypatched.app(scope, receive, send))
+    assert sent[0]["status"] == 413
+    assert len(received) < 10
+    assert app_monkeypatched.job_store.jobs == {}
+
+
+def test_stream_upload_hashes_incrementally(app_monkeypatched, monkeypatch):
+    import asyncio
+    import hashlib
+    from io import BytesIO
+
+    from fastapi import HTTPException, UploadFile
+
+    monkeypatch.setattr(app_monkeypatched, "UPLOAD_BLOCK_BYTES", 3)
+    data = b"0123456789"
+    path, digest = asyncio.run(
+        app_monkeypatched._stream_upload(UploadFile(BytesIO(data), filename="a.pdf"))
+    )
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert path.read_bytes() == data
+
+    monkeypatch.setattr(app_monkeypatched, "MAX_UPLOAD_BYTES", 5)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(
+            app_monkeypatched._stream_upload(UploadFile(BytesIO(data), filename="b.pdf"))
+        )
+    assert exc.value.status_code == 413
+    assert list(app_monkeypatched.UPLOAD_DIR.glob("*.part")) == [path]
+
+
+def test_duplicate_upload_discards_temp_file(app_monkeypatched):
+    client = TestClient(app_monkeypatched.app)
+    files = {"file": ("test.pdf", b"dummy", "application/pdf")}
+    job1 = client.post("/ingest", files=files).json()["job_id"]
+    _wait_for_job(client, job1)
+    client.post("/ingest", files=files)
+    stored = [p.name for p in app_monkeypatched.UPLOAD_DIR.glob("*.pdf")]
+    assert stored == [f"{job1}.pdf"]
+    assert not list(app_monkeypatched.UPLOAD_DIR.glob("*.part"))
+
+
+def test_versioned_ingest_replaces_previous_version(app_monkeypatched):
+    client = TestClient(app_monkeypatched.app)
+    v1 = {"file": ("report.pdf", b"version 1", "application/pdf")}
+    v2 = {"file": ("report.pdf", b"version 2", "application/pdf")}
+    form = {"document_id": "weekly-report"}
+
+    job1 = client.post("/ingest", files=v1, data=form).json()["job_id"]
+    _wait_for_job(client, job1)
+    job2 = client.post("/ingest", files=v2, data=form).json()["job_id"]
+    status = _wait_for_job(client, job2)
+
+    assert job1 != job2
+    assert app_monkeypatched.store.replaced == "weekly-report"
+    assert {m["file_id"] for m in app_monkeypatched.store.metadatas} == {"weekly-report"}
+    assert status["artifacts"][0]["file_id"] == "weekly-report"
+    # Rolling back to version 1 must re-ingest rather than return the old job.
+    job3 = client.post("/ingest", files=v1, data=form).json()["job_id"]
+    assert job3 not in {job1, job2}
+    _wait_for_job(client, job3)
+
+
+def test_delete_document_forgets_jobs_and_hashes(app_monkeypatched):
+    main = app_monkeypatched
+    client = TestClient(main.app)
+    files = {"file": ("test.pdf", b"dummy", "application/pdf")}
+    job_id = client.post("/ingest", files=files).json()["job_id"]
+    _wait_for_job(client, job_id)
+    versioned = client.post(
+        "/ingest", files=files, data={"document_id": "report"}
+    ).json()["job_id"]
+    _wait_for_job(client, versioned)
+
+    resp = client.delete(f"/documents/{job_id}")
+    assert resp.status_code == 200
+    assert main.store.deleted == job_id
+    assert client.get(f"/ingest/{job_id}").status_code == 404
+    assert not (main.UPLOAD_DIR / f"{job_id}.pdf").exists()
+    assert client.post("/ingest", files=files).json()["job_id"] != job_id
+
+    assert client.delete("/documents/report").status_code == 200
+    assert "report" not in main.job_store.documents
+    assert versioned not in main.job_store.hashes.values()
+    assert client.delete("/documents/report").status_code == 404
@@ -0,0 +1,103 @@
+from datetime import UTC, datetime
+from pathlib import Path
+import json
+import sys
+
+# Ensure repository root on path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.job_store import JobStore
+from models.job import JobStatus
+
+
+def _job(status: str = "pending") -> JobStatus:
+    return JobStatus(status=status, started_at=datetime.now(UTC))
+
+
+def test_updates_append_and_replay(tmp_path):
+    path = tmp_path / "jobs.log"
+    store = JobStore(path)
+    store.save_job("j1", _job())
+    store.jobs["j1"].status = "done"
+    store.save_job("j1")
+    store.set_hash("abc", "j1")
+    store.set_hash("def", "j2")
+    store.drop_hash("def")
+
+    assert len(path.read_text().splitlines()) == 5
+    reloaded = JobStore(path)
+    assert reloaded.jobs["j1"].status == "done"
+    assert reloaded.hashes == {"abc": "j1"}
+
+
+def test_replay_skips_torn_last_line(tmp_path):
+    path = tmp_path / "jobs.log"
+    JobStore(path).set_hash("abc", "j1")
+    with path.open("a") as fh:
+        fh.write('{"hash": "de')
+    assert JobStore(path).hashes == {"abc": "j1"}
+
+
+def test_append_after_torn_last_line_is_not_lost(tmp_path):
+    path = tmp_path / "jobs.log"
+    JobStore(path).set_hash("abc", "j1")
+    with path.open("a") as fh:
+        fh.write('{"hash": "de')
+    JobStore(path).set_hash("ghi", "j3")
+    assert JobStore(path).hashes == {"abc": "j1", "ghi": "j3"}
+
+    with path.open("a") as fh:
+        fh.write(json.dumps({"hash": "jkl", "job": "j4"}))
+    JobStore(path).set_hash("mno", "j5")
+    assert JobStore(path).hashes == {
+        "abc": "j1",
+        "ghi": "j3",
+        "jkl": "j4",
+        "mno": "j5",
+    }
+    assert path.read_text().endswith("\n")
+
+
+def test_log_is_compacted(tmp_path):
+    path = tmp_path / "jobs.log"
+    store = JobStore(path, min_compact_records=4)
+    store.save_job("j1", _job())
+    for status in ["processing", "done", "done", "done"]:
+        store.jobs["j1"].status = status
+        store.save_job("j1")
+    assert len(path.read_text().splitlines()) <= 4
+    assert JobStore(path).jobs["j1"].status == "done"
+
+
+def test_import_legacy_json(tmp_path):
+    (tmp_path / "jobs.json").write_text(
+        json.dumps({"j1": _job("done").model_dump(mode="json")})
+    )
+    (tmp_path / "hashes.json").write_text(json.dumps({"abc": "j1"}))
+    store = JobStore(tmp_path / "jobs.log")
+    store.import_json(tmp_path / "jobs.json", tmp_path / "hashes.json")
+    reloaded = JobStore(tmp_path / "jobs.log")
+    assert reloaded.jobs["j1"].status == "done"
+    assert reloaded.hashes == {"abc": "j1"}
+
+
+def test_document_versions_survive_reload(tmp_path):
+    path = tmp_path / "jobs.log"
+    store = JobStore(path)
+    store.set_document("report", "report:abc")
+    store.set_document("report", "report:def")
+    assert JobStore(path).documents == {"report": "report:def"}
+
+
+def test_drop_job_and_document_survive_reload(tmp_path):
+    path = tmp_path / "jobs.log"
+    store = JobStore(path)
+    store.save_job("j1", _job("done"))
+    store.set_document("report", "report:abc")
+    store.drop_job("j1")
+    store.drop_document("report")
+    store.drop_job("missing")
+
+    reloaded = JobStore(path)
+    assert reloaded.jobs == {} and reloaded.documents == {}
+    assert len(path.read_text().splitlines()) == 4
@@ -0,0 +1,302 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+# Ensure the repository root is on the Python path for module resolution during tests.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from index.embedding_store import TextDoc
+from index.lexical import LexicalIndex
+from index.lexical_segment import decode_varints, encode_varints
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+TEXTS = [
+    "the quick brown fox",
+    "the lazy dog sleeps the whole day",
+    "quick thinking saves the day",
+    "a fox and a dog",
+    "the end",
+    "",
+]
+# "the" occurs in most documents, so its idf falls back to the epsilon floor.
+QUERIES = [["the"], ["quick", "fox"], ["dog", "dog", "day"], ["missing"], ["a"]]
+
+
+def _reference(texts):
+    return rank_bm25.BM25Okapi([t.split() for t in texts])
+
+
+def _docs(texts):
+    return [TextDoc(text=t) for t in texts]
+
+
+def test_scores_match_bm25okapi():
+    index = LexicalIndex(_docs(TEXTS))
+    reference = _reference(TEXTS)
+
+    assert index.avgdl == pytest.approx(reference.avgdl)
+    assert index.vocabulary_size == len(reference.idf)
+    for query in QUERIES:
+        expected = reference.get_scores(query)
+        np.testing.assert_allclose(index.get_scores(query), expected, rtol=1e-12)
+
+
+def test_appends_match_a_rebuilt_index():
+    index = LexicalIndex(_docs(TEXTS[:2]))
+    index.add(_docs(TEXTS[2:4]))
+    index.add(_docs(TEXTS[4:]))
+
+    assert index.add([]) == []
+    reference = _reference(TEXTS)
+    for query in QUERIES:
+        expected = reference.get_scores(query)
+        np.testing.assert_allclose(index.get_scores(query), expected, rtol=1e-12)
+
+
+def test_tombstones_leave_statistics_and_compaction_keeps_scores():
+    index = LexicalIndex(_docs(TEXTS))
+
+    assert index.delete([1, 3, 3, 99]) == 2
+    live = [t for i, t in enumerate(TEXTS) if i not in (1, 3)]
+    reference = _reference(live)
+    compacted = index.compact()
+    assert index.dead_count == 2 and compacted.size == len(live)
+    for query in QUERIES:
+        scores = index.get_scores(query)
+        assert scores[1] == scores[3] == 0
+        expected = reference.get_scores(query)
+        np.testing.assert_allclose(np.delete(scores, [1, 3]), expected, rtol=1e-12)
+        np.testing.assert_allclose(compacted.get_scores(query), expected, rtol=1e-12)
+    rows, freqs = index.postings("dog")
+    assert rows.tolist() == [] and freqs.tolist() == []
+
+
+def _full_ranking(index, terms, top_k, allowed=None):
+    scores = index.get_scores(terms)
+    rows = np.flatnonzero(index.live_mask() if allowed is None else allowed)
+    ranked = rows[np.argsort(-scores[rows], kind="stable")][:top_k]
+    return ranked, scores[ranked]
+
+
+def test_search_matches_a_full_ranking():
+    rng = np.random.default_rng(7)
+    vocabulary = [f"t{i}" for i in range(200)]
+    # Zipf-like term frequencies give long postings for common terms, so
+    # MaxScore stops adding rows once rare terms fill the top k.
+    weights = 1.0 / np.arange(1, len(vocabulary) + 1)
+    probabilities = weights / weights.sum()
+    texts = [
+        " ".join(rng.choice(vocabulary, size=rng.integers(5, 40), p=probabilities))
+        for _ in range(500)
+    ]
+    index = LexicalIndex(_docs(texts))
+    index.delete(range(0, 500, 7))
+    allowed = index.live_mask() & (np.arange(500) % 3 != 0)
+    queries = [["t0", "t150"], ["t1", "t2", "t3", "t199"], ["t5", "t5"], ["nope"]]
+
+    for terms in queries:
+        for top_k in (1, 10, 600):
+            rows, scores = index.search(terms, top_k)
+            expected_rows, expected_scores = _full_ranking(index, terms, top_k)
+            assert rows.tolist() == expected_rows.tolist()
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-9)
+
+            rows, scores = index.search(terms, top_k, accept=lambda r: allowed[r])
+            expected_rows, expected_scores = _full_ranking(index, terms, top_k, allowed)
+            assert rows.tolist() == expected_rows.tolist()
+            np.testing.assert_allclose(scores, expected_scores, rtol=1e-9)
+
+
+def test_search_pads_with_unmatched_rows_like_a_full_ranking():
+    # "beta" occurs in most documents, so its floored idf is negative here.
+    index = LexicalIndex(_docs(["alpha beta", "beta gamma", "gamma delta"]))
+
+    for terms in (["beta"], ["alpha"], ["missing"]):
+        rows, _ = index.search(terms, 2)
+        assert rows.tolist() == _full_ranking(index, terms, 2)[0].tolist()
+
+
+def test_varints_round_trip():
+    values = np.array([0, 1, 127, 128, 300, 2**40, 5])
+
+    encoded = encode_varints(values)
+
+    assert len(encoded) == 1 + 1 + 1 + 2 + 2 + 6 + 1
+    assert decode_varints(encoded).tolist() == values.tolist()
+
+
+def test_persistent_index_reopens_without_retokenising(tmp_path):
+    index = LexicalIndex.open(tmp_path)
+    index.add([TextDoc(text=t, tags={"n": i}) for i, t in enumerate(TEXTS[:4])])
+    index.delete([1])
+    index.save()
+    index.add(_docs(TEXTS[4:]))
+    index.delete([2])
+
+    reopened = LexicalIndex.open(tmp_path)
+
+    # Replaying the log decoded only the postings the logged "the end" appended
+    # to; the others stay encoded in the segment until first read.
+    decoded = [row_list is not None for row_list in reopened._rows]
+    assert sum(decoded) == 2 and len(decoded) > 10
+    assert reopened.size == index.size and reopened.live_count == index.live_count
+    assert reopened.live_mask().tolist() == index.live_mask().tolist()
+    assert reopened.docs[3].tags == {"n": 3}
+    for query in QUERIES:
+        np.testing.assert_array_equal(
+            reopened.get_scores(query), index.get_scores(query)
+        )
+        rows, _ = reopened.search(query, 3)
+        assert rows.tolist() == index.search(query, 3)[0].tolist()
+
+    reopened.add(_docs(["the fox returns"]))
+    reopened.save()
+    again = LexicalIndex.open(tmp_path)
+    assert [doc.text for doc in again.live_docs()] == [
+        doc.text for doc in reopened.live_docs()
+    ]
+    # Term ids are renumbered, so the average idf is summed in another order.
+    np.testing.assert_allclose(
+        again.get_scores(["fox", "the"]),
+        reopened.get_scores(["fox", "the"]),
+        rtol=1e-12,
+    )
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["segment.lex"]
+
+
+def test_compaction_replaces_the_persisted_index(tmp_path):
+    index = LexicalIndex.open(tmp_path)
+    index.add(_docs(TEXTS))
+    index.delete([0, 1, 2])
+
+    compacted = index.compact()
+    reopened = LexicalIndex.open(tmp_path)
+
+    assert reopened.size == compacted.size == len(TEXTS) - 3
+    assert [doc.text for doc in reopened.docs] == TEXTS[3:]
+    for query in QUERIES:
+        np.testing.assert_allclose(
+            reopened.get_scores(query), compacted.get_scores(query), rtol=1e-12
+        )
+
+
+def _tagged(texts, file_id):
+    return [TextDoc(text=t, tags={"file_id": file_id}) for t in texts]
+
+
+def test_file_rows_survive_checkpoints_and_log_replay(tmp_path):
+    index = LexicalIndex.open(tmp_path)
+    index.add(_tagged(TEXTS[:3], "a") + _tagged(TEXTS[3:5], "b"))
+    index.delete([1])
+    index.save()
+    index.add(_tagged(["a late chunk"], "a") + _docs(["untagged"]))
+
+    reopened = LexicalIndex.open(tmp_path)
+
+    assert reopened._segment.has_files
+    assert reopened.file_rows("a").tolist() == [0, 2, 5]
+    assert reopened.file_rows("b").tolist() == [3, 4]
+    assert reopened.file_rows("missing").tolist() == []
+    reopened.delete(reopened.file_rows("b"))
+    assert reopened.file_rows("b").tolist() == []
+
+    # A segment written before the file table is scanned once on first use.
+    reopened._segment.has_files = False
+    assert reopened.file_rows("a").tolist() == [0, 2, 5]
+    assert reopened._segment_files is not None
+    reopened.save()
+    again = LexicalIndex.open(tmp_path)
+    assert again._segment.has_files
+    assert again.file_rows("a").tolist() == [0, 2, 5]
+    assert again.file_rows("b").tolist() == []
+
+
+def test_compaction_applies_updates_made_while_it_builds(tmp_path):
+    index = LexicalIndex.open(tmp_path)
+    index.add(_tagged(TEXTS, "a"))
+    index.delete([0, 1])
+    size = index.size
+    live = index.live_mask(size)
+
+    compacted = index.start_compaction(size, live)
+    assert (tmp_path / "segment.lex.compact").exists()
+    index.delete([3])
+    index.add(_tagged(["fresh fox"], "b"))
+    index.finish_compaction(compacted, size, live)
+
+    expected = ["quick thinking saves the day", "the end", "", "fresh fox"]
+    assert [doc.text for doc in compacted.live_docs()] == expected
+    reopened = LexicalIndex.open(tmp_path)
+    assert [doc.text for doc in reopened.live_docs()] == expected
+    assert reopened.file_rows("b").tolist() == [compacted.size - 1]
+    for query in QUERIES:
+        np.testing.assert_allclose(
+            reopened.get_scores(query)[reopened.live_mask()],
+            compacted.get_scores(query)[compacted.live_mask()],
+            rtol=1e-12,
+        )
+    assert not (tmp_path / "segment.lex.compact").exists()
+
+
+def test_open_discards_a_staged_compaction(tmp_path):
+    index = LexicalIndex.open(tmp_path)
+    index.add(_docs(TEXTS))
+    index.delete([0])
+    index.save()
+    index.start_compaction(index.size, index.live_mask())
+
+    reopened = LexicalIndex.open(tmp_path)
+
+    assert not (tmp_path / "segment.lex.compact").exists()
+    assert reopened.size == len(TEXTS) and reopened.live_count == len(TEXTS) - 1
+
+
+def _reference_ranking(texts, live, terms, top_k):
+    scores = _reference([texts[i] for i in live]).get_scores(terms)
+    order = np.argsort(-scores, kind="stable")[:top_k]
+    return np.asarray(live)[order], scores[order]
+
+
+def test_search_keeps_rows_tied_with_the_kth_score():
+    # Rounding left the MaxScore bound slightly below 0 after the last term,
+    # which pruned the fourth row (0.0257) and padded with a zero-score row.
+    texts = [
+        "w1 w9 w7 w7 w6 w3 w4 w6 w1 w8 w3",
+        "w3 w8 w8 w11 w2 w6 w7 w10",
+        "w0 w1 w2 w0 w3 w1 w1 w2 w2",
+        "w2 w1 w0 w1 w2 w2 w1 w2",
+    ]
+    index = LexicalIndex(_docs(texts))
+    rows, scores = index.search(["w1", "w8", "w2", "w2"], 4)
+    expected_rows, expected_scores = _reference_ranking(
+        texts, range(4), ["w1", "w8", "w2", "w2"], 4
+    )
+    assert rows.tolist() == expected_rows.tolist()
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-12)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_search_matches_bm25okapi_with_duplicate_missing_and_deleted_terms(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(300):
+        size = int(rng.integers(2, 12))
+        texts = [
+            " ".join(f"w{t}" for t in rng.integers(0, 12, rng.integers(1, 12)))
+            for _ in range(size)
+        ]
+        index = LexicalIndex(_docs(texts))
+        # Deleting documents drops some terms to a document frequency of 0.
+        dead = rng.choice(size, int(rng.integers(0, size)), replace=False)
+        index.delete(dead)
+        live = [i for i in range(size) if i not in set(dead.tolist())]
+        # w12..w14 never occur, and terms repeat in most queries.
+        terms = [f"w{t}" for t in rng.integers(0, 15, rng.integers(1, 6))]
+        top_k = int(rng.integers(1, size + 2))
+
+        rows, scores = index.search(terms, top_k)
+        expected_rows, expected_scores = _reference_ranking(texts, live, terms, top_k)
+        np.testing.assert_allclose(scores, expected_scores, rtol=1e-9, atol=1e-12)
+        assert set(rows.tolist()) <= set(live)
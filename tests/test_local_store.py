@@ -0,0 +1,186 @@
+from pathlib import Path
+import hashlib
+import sys
+
+import numpy as np
+import pytest
+
+# Ensure the repository root is on the Python path for module resolution during tests.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.registry import CollectionRegistry
+import index.embedding_store as es
+from index.local_store import LocalEmbeddingStore
+
+
+class FakeModel:
+    """Deterministic pseudo-random 8-d embeddings keyed by text."""
+
+    def __init__(self, *_, **__):
+        self.calls = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 8
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=8).astype(np.float32)
+
+    def encode(self, texts, batch_size: int = 32):
+        self.calls += 1
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(t) for t in texts])
+
+
+@pytest.fixture
+def make_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+
+    def make(**kwargs):
+        return LocalEmbeddingStore(directory=tmp_path, **kwargs)
+
+    return make
+
+
+def test_add_search_and_deduplicate(make_store):
+    store = make_store()
+    ids = store.add_texts(["alpha", "beta", "alpha"], [{"n": 1}, {"n": 2}, {"n": 3}])
+
+    assert len(ids) == 2
+    assert store.add_texts(["beta"]) == []
+    hits = store.search("beta", top_k=2, with_payload=["text"])
+    assert hits[0].id == ids[1]
+    assert hits[0].score == pytest.approx(1.0, abs=1e-2)
+    assert hits[0].payload == {"text": "beta"}
+    assert [d.tags for d in store.query("alpha", top_k=1)] == [{"n": 1}]
+
+
+def test_reopened_store_keeps_vectors_and_payloads(make_store):
+    store = make_store(dtype="int8")
+    store.add_texts(["alpha", "beta", "gamma"], [{"file_id": "f"}] * 3)
+
+    reopened = make_store()
+    assert reopened.dtype == "int8"
+    assert reopened.count() == 3
+    hit = reopened.search("gamma", top_k=1)[0]
+    assert hit.payload["text"] == "gamma"
+    assert hit.score == pytest.approx(1.0, abs=2e-2)
+    assert reopened.file_point_ids("f") == {
+        es.point_id(t, "f") for t in ["alpha", "beta", "gamma"]
+    }
+
+
+def test_replace_file_and_delete_reuse_slots(make_store):
+    store = make_store()
+    store.add_texts(["a", "b"], [{"file_id": "f", "page": 1}] * 2)
+
+    added, kept, removed = store.replace_file(
+        "f", ["b", "c"], [{"file_id": "f", "page": 2}] * 2
+    )
+
+    assert added == [es.point_id("c", "f")]
+    assert kept == [es.point_id("b", "f")]
+    assert removed == [es.point_id("a", "f")]
+    assert store.search("b", top_k=1)[0].payload["tags"]["page"] == 2
+    assert all(hit.id != es.point_id("a", "f") for hit in store.search("a", top_k=5))
+    store.delete([es.point_id("b", "f")])
+    store.add_texts(["d"])
+    assert store.count() == 2
+    # "c" took a fresh slot before "a" was removed; "d" reuses a freed one.
+    assert store._size == 3
+    assert make_store().file_point_ids("f") == {es.point_id("c", "f")}
+
+
+def test_shared_chunk_text_is_stored_per_document(make_store):
+    store = make_store()
+    store.add_texts(["shared", "a only"], [{"file_id": "a"}] * 2)
+    store.add_texts(["shared"], [{"file_id": "b"}])
+
+    store.replace_file("a", ["a only"], [{"file_id": "a"}])
+
+    assert store.count() == 2
+    assert make_store().file_point_ids("b") == {es.point_id("shared", "b")}
+
+
+def test_text_only_ids_are_rekeyed_on_first_use(make_store):
+    store = make_store()
+    payloads = [
+        {"text": text, "tags": {"file_id": "doc"}, "hash": store._sha256(text)}
+        for text in ("intro", "body")
+    ]
+    store.upsert_points(
+        [p["hash"][:32] for p in payloads], np.eye(2, 8), payloads
+    )
+    store.add_texts(["body"], [{"file_id": "doc"}])
+
+    reopened = make_store()
+
+    intro, body = es.point_id("intro", "doc"), es.point_id("body", "doc")
+    assert reopened.file_point_ids("doc") == {intro, body}
+    assert reopened.count() == 2
+    hits = reopened.search("intro", top_k=2)
+    assert {h.id for h in hits} == {intro, body}
+    assert make_store().file_point_ids("doc") == {intro, body}
+
+
+def test_ivf_partitions_are_trained_and_probed(make_store):
+    store = make_store(nlist=2, nprobe=1)
+    texts = [f"chunk {i}" for i in range(100)]
+    store.add_texts(texts)
+
+    assert store._centroids is not None
+    assert (store._lists[: store._size] >= 0).all()
+    for text in texts[:10]:
+        assert store.search(text, top_k=1)[0].payload["text"] == text
+    exact = store.search("query", top_k=3, search_params={"exact": True})
+    flat = make_store(nlist=0).search_batch(["query"], top_k=3)[0]
+    assert [h.id for h in exact] == [h.id for h in flat]
+
+
+def test_collections_are_isolated_and_deletable(make_store):
+    store = make_store()
+    other = store.for_collection("other")
+    other.add_texts(["only here"])
+
+    assert store.search("only here", top_k=1) == []
+    assert store.list_collections() == ["documents", "other"]
+    assert store.model is other.model
+    other.delete_collection()
+    assert other.count() == 0
+    with pytest.raises(ValueError):
+        store.for_collection("../escape")
+
+
+def test_deleted_collection_stays_gone_until_written(make_store):
+    store = make_store()
+    store.add_texts(["kept"], [{"file_id": "f"}])
+    registry = CollectionRegistry(None, store)
+
+    store.delete_collection()
+
+    assert store.list_collections() == []
+    assert "documents" not in registry
+    assert store.search("kept", top_k=1) == []
+    assert store.file_point_ids("f") == set()
+    store.add_texts(["again"], [{"file_id": "g"}])
+    assert store.list_collections() == ["documents"]
+    assert make_store().file_point_ids("g") == {es.point_id("again", "g")}
+
+
+def test_filtered_search_scores_only_matching_chunks(make_store):
+    store = make_store(nlist=2, nprobe=1, filter_tags={"tags.even": "bool"})
+    texts = [f"chunk {i}" for i in range(100)]
+    store.add_texts(
+        texts,
+        [{"file_id": f"f{i % 4}", "page": i, "even": i % 2 == 0} for i in range(100)],
+    )
+
+    hits = store.search("chunk 7", top_k=100, filters={"file_id": ["f3"]})
+    assert len(hits) == 25
+    assert hits[0].payload["text"] == "chunk 7"
+    page_filter = {"page_from": 10, "page_to": 19, "tags": {"even": True}}
+    hits = store.search("chunk 7", top_k=100, filters=page_filter)
+    assert sorted(h.payload["tags"]["page"] for h in hits) == list(range(10, 20, 2))
+    with pytest.raises(ValueError, match="odd"):
+        store.search("chunk 7", filters={"tags": {"odd": True}})
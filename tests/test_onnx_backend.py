@@ -0,0 +1,35 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+# Ensure repository root on path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from index.onnx_backend import mean_pool, normalize, parity_report
+
+
+class FixedModel:
+    def __init__(self, vectors):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+
+    def encode(self, texts, batch_size: int = 32):
+        return self.vectors[: len(texts)]
+
+
+def test_mean_pool_ignores_padding():
+    hidden = np.array([[[1.0, 2.0], [3.0, 4.0], [100.0, 100.0]]])
+    mask = np.array([[1, 1, 0]])
+    assert np.allclose(mean_pool(hidden, mask), [[2.0, 3.0]])
+    assert np.allclose(np.linalg.norm(normalize(np.array([[3.0, 4.0]])), axis=1), 1.0)
+
+
+def test_parity_report_measures_cosine():
+    reference = FixedModel([[1.0, 0.0], [0.0, 2.0]])
+    candidate = FixedModel([[1.0, 0.0], [1.0, 1.0]])
+    report = parity_report(reference, candidate, ["a", "b"])
+    assert report["min_cosine"] == pytest.approx(np.sqrt(0.5))
+    assert report["mean_cosine"] == pytest.approx((1 + np.sqrt(0.5)) / 2)
+    with pytest.raises(ValueError):
+        parity_report(reference, FixedModel([[1.0, 0.0, 0.0]] * 2), ["a", "b"])
@@ -43,3 +43,91 @@ def test_parse_document_filters_elements(suffix: str) -> None:
 def test_parse_document_unsupported_extension() -> None:
     with pytest.raises(ValueError):
         parse_document(Path("unsupported.txt"))
+
+
+def test_parse_pdf_sharded_merges_pages_in_order(tmp_path, monkeypatch) -> None:
+    """Parallel PDF parsing keeps element order and document page numbers."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pypdf import PdfReader, PdfWriter
+
+    import ingest.parsers as parsers
+
+    writer = PdfWriter()
+    for _ in range(5):
+        writer.add_blank_page(width=72, height=72)
+    path = tmp_path / "doc.pdf"
+    writer.write(path)
+
+    def fake_partition(filename: str) -> list[Element]:
+        elements: list[Element] = []
+        for page in range(1, len(PdfReader(filename).pages) + 1):
+            el = Text(f"page {page}")
+            el.metadata.page_number = page
+            elements.extend([el, Image("img")])
+        return elements
+
+    monkeypatch.setattr(parsers, "_get_partitioner", lambda suffix: fake_partition)
+    monkeypatch.setattr(parsers, "_get_pool", lambda workers: ThreadPoolExecutor(workers))
+
+    result = parse_document(path, workers=2)
+
+    assert [el.metadata.page_number for el in result] == [1, 2, 3, 4, 5]
+    assert all(isinstance(el, Text) for el in result)
+
+
+def test_failed_sharded_parse_is_logged_and_parsed_sequentially(
+    tmp_path, monkeypatch, caplog
+) -> None:
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pypdf import PdfWriter
+
+    import ingest.parsers as parsers
+
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(width=72, height=72)
+    path = tmp_path / "doc.pdf"
+    writer.write(path)
+
+    def shard_fails(suffix, shard, offset):
+        raise RuntimeError("shard crashed")
+
+    monkeypatch.setattr(
+        parsers, "_get_partitioner", lambda suffix: lambda filename: [Text("whole")]
+    )
+    monkeypatch.setattr(parsers, "_partition_shard", shard_fails)
+    monkeypatch.setattr(
+        parsers, "_get_pool", lambda workers: ThreadPoolExecutor(workers)
+    )
+
+    with caplog.at_level("WARNING", logger="ingest.parsers"):
+        result = parse_document(path, workers=2)
+
+    assert [el.text for el in result] == ["whole"]
+    assert "parsing it sequentially" in caplog.text
+    assert "shard crashed" in caplog.text
+
+
+def test_parse_pool_is_replaced_and_shut_down() -> None:
+    import ingest.parsers as parsers
+
+    with parsers._pool_lock:
+        first = parsers._get_pool(2)
+        assert parsers._get_pool(2) is first
+        second = parsers._get_pool(3)
+    with pytest.raises(RuntimeError):
+        first.submit(int)
+
+    parsers.shutdown_pool()
+    assert parsers._pool is None
+    with pytest.raises(RuntimeError):
+        second.submit(int)
+
+
+def test_page_ranges_cover_document() -> None:
+    from ingest.parsers import _page_ranges
+
+    assert _page_ranges(5, 4) == [(0, 2), (2, 4), (4, 5)]
+    assert _page_ranges(1, 4) == [(0, 1)]
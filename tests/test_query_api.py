@@ -7,8 +7,10 @@ import importlib
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from fastapi.testclient import TestClient
+from retriever import base as retriever_base
 from retriever.base import BaseRetriever
-from index.embedding_store import TextDoc
+from index.embedding_store import SearchHit, TextDoc, point_id
+from index.filters import matches
 
 
 class FakeStore:
@@ -18,10 +20,32 @@ class FakeStore:
     def add_texts(self, texts, metadatas=None):
         pass
 
-    def query(self, query: str, top_k: int = 5):
-        matches = [d for d in self.docs if query in d.text]
-        matches.reverse()
-        return matches[:top_k]
+    def search(self, query: str, top_k: int = 5, search_params=None, filters=None):
+        hits = [
+            d for d in self.docs if query in d.text and matches(d.tags, filters)
+        ]
+        hits.reverse()
+        return [
+            SearchHit(
+                point_id(d.text, d.tags.get("file_id")),
+                1.0 / rank,
+                {"text": d.text, "tags": d.tags},
+            )
+            for rank, d in enumerate(hits[:top_k], start=1)
+        ]
+
+    def search_batch(self, queries, top_k: int = 5, search_params=None, filters=None):
+        return [self.search(q, top_k, search_params, filters) for q in queries]
+
+    async def asearch(
+        self, query: str, top_k: int = 5, search_params=None, filters=None
+    ):
+        return self.search(query, top_k, search_params, filters)
+
+    async def asearch_batch(
+        self, queries, top_k: int = 5, search_params=None, filters=None
+    ):
+        return self.search_batch(queries, top_k, search_params, filters)
 
 
 def _reload_app():
@@ -38,7 +62,7 @@ def test_query_returns_ranked_scores():
         TextDoc(text="gamma delta", tags={"file_id": "f3", "page": 3, "span": [0, 10]}),
     ]
     store = FakeStore(corpus)
-    main.retriever = BaseRetriever(store, corpus)
+    main.registry.register(BaseRetriever(store, corpus))
     client = TestClient(main.app)
 
     res = client.post(
@@ -52,6 +76,9 @@ def test_query_returns_ranked_scores():
     first = body["results"][0]
     assert first["rank"] == 1
     assert set(first["scores"].keys()) == {"semantic", "lexical"}
+    assert first["id"] == point_id(first["text"], first["file_id"])
+    semantic = {r["text"]: r["scores"]["semantic"] for r in body["results"]}
+    assert semantic == {"beta gamma": 1.0, "alpha beta": 0.5}
     assert first["file_id"] in {"f1", "f2"}
     assert first["page"] in {1, 2}
     assert first["span"] == [0, 10]
@@ -60,3 +87,172 @@ def test_query_returns_ranked_scores():
     assert citation["page"] == first["page"]
     assert citation["span"] == first["span"]
     assert citation["text"] == first["text"]
+
+
+def test_query_batch_matches_single_queries():
+    main = _reload_app()
+    corpus = [
+        TextDoc(text="alpha beta", tags={"file_id": "f1", "page": 1, "span": [0, 10]}),
+        TextDoc(text="beta gamma", tags={"file_id": "f2", "page": 2, "span": [0, 10]}),
+        TextDoc(text="gamma delta", tags={"file_id": "f3", "page": 3, "span": [0, 10]}),
+    ]
+    store = FakeStore(corpus)
+    calls: list[list[str]] = []
+
+    def search_batch(queries, top_k=5, search_params=None, filters=None):
+        calls.append(list(queries))
+        return [store.search(q, top_k) for q in queries]
+
+    store.search_batch = search_batch
+    main.registry.register(BaseRetriever(store, corpus))
+    client = TestClient(main.app)
+
+    res = client.post(
+        "/query/batch",
+        json={"queries": ["beta", "delta"], "top_k": 2, "provider": "none"},
+    )
+    assert res.status_code == 200
+    responses = res.json()["responses"]
+    assert calls == [["beta", "delta"]]
+    assert [r["query"] for r in responses] == ["beta", "delta"]
+    for body in responses:
+        single = client.post(
+            "/query", json={"query": body["query"], "top_k": 2, "provider": "none"}
+        ).json()
+        assert body["results"] == single["results"]
+        assert body["citations"] == single["citations"]
+
+
+def test_query_passes_latency_tier_and_search_params():
+    main = _reload_app()
+    corpus = [TextDoc(text="alpha beta", tags={"file_id": "f1"})]
+    store = FakeStore(corpus)
+    seen = []
+    search = store.search
+
+    def recording_search(query, top_k=5, search_params=None, filters=None):
+        seen.append(search_params)
+        return search(query, top_k)
+
+    store.search = recording_search
+    main.registry.register(BaseRetriever(store, corpus))
+    client = TestClient(main.app)
+
+    client.post("/query", json={"query": "beta", "mode": "semantic"})
+    client.post(
+        "/query",
+        json={
+            "query": "beta",
+            "mode": "semantic",
+            "latency_tier": "fast",
+            "search_params": {"hnsw_ef": 64},
+        },
+    )
+    res = client.post("/query", json={"query": "beta", "latency_tier": "instant"})
+
+    assert seen == [None, {"hnsw_ef": 64, "rescore": False}]
+    assert res.status_code == 422
+
+
+def test_query_filter_applies_to_both_retrievers(monkeypatch):
+    monkeypatch.setenv("FILTER_TAGS", "lang")
+    main = _reload_app()
+    corpus = [
+        TextDoc(text="beta one", tags={"file_id": "f1", "page": 1, "lang": "en"}),
+        TextDoc(text="beta two", tags={"file_id": "f1", "page": 5, "lang": "de"}),
+        TextDoc(text="beta three", tags={"file_id": "f2", "page": 2, "lang": "en"}),
+    ]
+    main.registry.register(BaseRetriever(FakeStore(corpus), corpus))
+    client = TestClient(main.app)
+
+    def texts(mode, flt):
+        body = {"query": "beta", "mode": mode, "filter": flt}
+        return {r["text"] for r in client.post("/query", json=body).json()["results"]}
+
+    for mode in ("semantic", "lexical", "hybrid"):
+        assert texts(mode, {"file_id": "f1"}) == {"beta one", "beta two"}
+        assert texts(mode, {"file_id": ["f1", "f2"], "page_to": 2}) == {
+            "beta one",
+            "beta three",
+        }
+        assert texts(mode, {"tags": {"lang": "en"}, "page_from": 2}) == {"beta three"}
+    batch = client.post(
+        "/query/batch", json={"queries": ["beta"], "filter": {"file_id": "f2"}}
+    ).json()
+    assert [r["text"] for r in batch["responses"][0]["results"]] == ["beta three"]
+    res = client.post("/query", json={"query": "beta", "filter": {"tags": {"x": 1}}})
+    assert res.status_code == 422
+
+
+def test_query_unknown_collection_returns_404():
+    main = _reload_app()
+    client = TestClient(main.app)
+
+    res = client.post("/query", json={"query": "beta", "collection": "missing"})
+    assert res.status_code == 404
+    res = client.post("/query/batch", json={"queries": ["a"], "collection": "missing"})
+    assert res.status_code == 404
+
+
+def test_query_batch_rejects_too_many_queries():
+    from models.query import MAX_BATCH_QUERIES
+
+    main = _reload_app()
+    client = TestClient(main.app)
+
+    res = client.post(
+        "/query/batch", json={"queries": ["a"] * (MAX_BATCH_QUERIES + 1)}
+    )
+    assert res.status_code == 422
+    res = client.post("/query/batch", json={"queries": ["a"] * MAX_BATCH_QUERIES})
+    assert res.status_code == 200
+
+
+def test_query_degrades_to_the_branch_that_answers():
+    import asyncio
+
+    main = _reload_app()
+    corpus = [
+        TextDoc(text="alpha beta", tags={"file_id": "f1"}),
+        TextDoc(text="beta gamma", tags={"file_id": "f2"}),
+    ]
+    store = FakeStore(corpus)
+
+    async def slow_asearch(query, top_k=5, search_params=None, filters=None):
+        await asyncio.sleep(5)
+
+    store.asearch = slow_asearch
+    retriever = BaseRetriever(
+        store, corpus, branch_timeouts={"semantic": 0.05, "lexical": 5}
+    )
+    main.registry.register(retriever)
+    client = TestClient(main.app)
+
+    body = client.post("/query", json={"query": "beta", "top_k": 2}).json()
+    assert body["degraded"] == ["semantic"]
+    assert {r["text"] for r in body["results"]} == {"alpha beta", "beta gamma"}
+    assert all(r["scores"]["semantic"] is None for r in body["results"])
+
+    def broken(*_, **__):
+        raise RuntimeError("lexical index unavailable")
+
+    retriever._lexical_search_batch = broken
+    body = client.post("/query/batch", json={"queries": ["gamma"], "top_k": 2}).json()
+    assert body["responses"][0]["degraded"] == ["lexical"]
+    assert [r["text"] for r in body["responses"][0]["results"]] == ["beta gamma"]
+
+    res = client.post("/query", json={"query": "beta", "mode": "semantic"})
+    assert res.status_code == 504
+
+
+def test_shutdown_stops_the_branch_pool():
+    main = _reload_app()
+    corpus = [TextDoc(text="alpha beta", tags={"file_id": "f1"})]
+    main.registry.register(BaseRetriever(FakeStore(corpus), corpus))
+
+    with TestClient(main.app) as client:
+        res = client.post("/query", json={"query": "beta", "mode": "lexical"})
+        assert res.status_code == 200
+        assert retriever_base._branch_pool is not None
+
+    assert retriever_base._branch_pool is None
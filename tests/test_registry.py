@@ -0,0 +1,106 @@
+from pathlib import Path
+import sys
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.registry import CollectionRegistry
+from index.embedding_store import TextDoc
+
+
+class FakeModel:
+    loads = 0
+
+    def __init__(self, *_, **__):
+        FakeModel.loads += 1
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 2
+
+    def encode(self, texts, batch_size: int = 32):
+        import numpy as np
+
+        if isinstance(texts, str):
+            return np.array([float(len(texts)), 1.0])
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+def _registry(monkeypatch):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    FakeModel.loads = 0
+    store = es.EmbeddingStore(location=":memory:")
+    return CollectionRegistry(store.client, store)
+
+
+def test_collections_share_model_and_client(monkeypatch):
+    registry = _registry(monkeypatch)
+    default = registry.store()
+    tenant = registry.store("tenant")
+
+    assert registry.store("tenant") is tenant
+    assert tenant.collection_name == "tenant"
+    assert tenant.model is default.model and tenant.client is default.client
+    assert FakeModel.loads == 1
+
+    registry.retriever("tenant").add_texts([TextDoc(text="only in tenant")])
+    assert registry.retriever().store.add_texts(["only in tenant"])
+    assert tenant.hash_index is not default.hash_index
+    docs, _ = registry.retriever("tenant").retrieve("tenant", mode="lexical")
+    assert [d.text for d in docs] == ["only in tenant"]
+
+
+def test_contains_and_drop(monkeypatch):
+    registry = _registry(monkeypatch)
+    client = registry.store().client
+    assert "documents" in registry
+    assert "missing" not in registry
+
+    retriever = registry.retriever("tenant")
+    client.delete_collection("tenant")
+    registry.drop("tenant")
+    assert "tenant" not in registry
+    assert registry.retriever("tenant") is not retriever
+    assert "tenant" in registry
+
+    # The kept default store forgets the hashes of the dropped collection.
+    default = registry.store()
+    default.add_texts(["dropped chunk"])
+    client.delete_collection("documents")
+    registry.drop("documents")
+    assert default._sha256("dropped chunk") not in default.hash_index
+
+
+def test_invalid_collection_name_creates_nothing(monkeypatch):
+    registry = _registry(monkeypatch)
+    with pytest.raises(ValueError, match="Invalid collection name"):
+        registry.store("../tenant")
+    assert "../tenant" not in registry
+    assert [c.name for c in registry.client.get_collections().collections] == [
+        "documents"
+    ]
+
+
+def test_lexical_indexes_survive_a_restart(monkeypatch, tmp_path):
+    import index.embedding_store as es
+
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:")
+    stored = ["stored before persistence", "also stored before"]
+    store.add_texts(stored)
+    registry = CollectionRegistry(store.client, store, lexical_dir=tmp_path)
+    registry.retriever().add_texts([TextDoc(text="persisted lexical chunk")])
+    registry.retriever("tenant").add_texts([TextDoc(text="tenant chunk")])
+
+    restarted = CollectionRegistry(store.client, store, lexical_dir=tmp_path)
+    docs, _ = restarted.retriever().retrieve("lexical", mode="lexical")
+    # Chunks stored before the directory existed were indexed once from Qdrant.
+    assert sorted(restarted.retriever().lexical_ids()) == sorted(
+        es.point_id(t) for t in stored + ["persisted lexical chunk"]
+    )
+    assert [d.text for d in docs][0] == "persisted lexical chunk"
+
+    restarted.drop("tenant")
+    assert not (tmp_path / "tenant").exists()
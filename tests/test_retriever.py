@@ -1,12 +1,15 @@
 from pathlib import Path
 import sys
-import hashlib
+import time
+
+import pytest
 
 # Ensure repository root on path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
+from retriever import base
 from retriever.base import BaseRetriever
-from index.embedding_store import TextDoc
+from index.embedding_store import SearchHit, TextDoc, point_id
 import networkx as nx
 
 
@@ -17,33 +20,49 @@ class FakeStore:
     def add_texts(self, texts, metadatas=None):
         pass
 
-    def query(self, query: str, top_k: int = 5):
+    def search(self, query: str, top_k: int = 5, search_params=None, filters=None):
         # naive semantic search: return docs containing the query word reversed order
         matches = [d for d in self.docs if query in d.text]
         matches.reverse()
-        return matches[:top_k]
+        return [
+            SearchHit(
+                point_id(d.text, d.tags.get("file_id")),
+                1.0 / rank,
+                {"text": d.text, "tags": d.tags},
+            )
+            for rank, d in enumerate(matches[:top_k], start=1)
+        ]
 
 
 class DummyStore:
     def __init__(self) -> None:
         self.texts: dict[str, TextDoc] = {}
 
-    def _sha256(self, text: str) -> str:
-        return hashlib.sha256(text.encode("utf-8")).hexdigest()
-
     def add_texts(self, texts, metadatas=None):
         metas = list(metadatas) if metadatas else [{} for _ in texts]
         ids = []
         for text, meta in zip(texts, metas):
-            full_hash = self._sha256(text)
-            uid = full_hash[:32]
+            uid = point_id(text, meta.get("file_id"))
             if uid in self.texts:
                 continue
             self.texts[uid] = TextDoc(text=text, tags=meta)
             ids.append(uid)
         return ids
 
-    def query(self, query: str, top_k: int = 5):
+    def replace_file(self, file_id, texts, metadatas=None):
+        old = {uid for uid, d in self.texts.items() if d.tags.get("file_id") == file_id}
+        new = {point_id(t, file_id) for t in texts}
+        for uid in old - new:
+            del self.texts[uid]
+        added = self.add_texts(texts, metadatas)
+        return added, sorted(old & new), sorted(old - new)
+
+    def delete_file(self, file_id):
+        self.texts = {
+            u: d for u, d in self.texts.items() if d.tags.get("file_id") != file_id
+        }
+
+    def search(self, query: str, top_k: int = 5, search_params=None, filters=None):
         return []
 
 
@@ -93,3 +112,194 @@ def test_add_texts_skips_existing_ids():
     retriever.add_texts([doc])
     retriever.add_texts([doc])
     assert len(retriever.corpus) == 1
+
+
+def test_replace_document_updates_lexical_corpus():
+    store = DummyStore()
+    retriever = BaseRetriever(store)
+    retriever.add_texts(
+        [
+            TextDoc(text="stale paragraph", tags={"file_id": "doc"}),
+            TextDoc(text="shared intro", tags={"file_id": "doc"}),
+            TextDoc(text="other file", tags={"file_id": "other"}),
+        ]
+    )
+
+    added, kept, removed = retriever.replace_document(
+        "doc",
+        [
+            TextDoc(text="shared intro", tags={"file_id": "doc"}),
+            TextDoc(text="fresh paragraph", tags={"file_id": "doc"}),
+        ],
+    )
+
+    assert len(added) == 1 and len(kept) == 1 and len(removed) == 1
+    # Two of five rows are tombstoned, which starts a background compaction.
+    deadline = time.monotonic() + 5
+    while retriever.lexical.dead_count and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert sorted(c.text for c in retriever.corpus) == [
+        "fresh paragraph",
+        "other file",
+        "shared intro",
+    ]
+    assert retriever._lexical_search("fresh", top_k=1)[0].doc.text == "fresh paragraph"
+
+
+def test_replace_document_touches_only_its_own_rows(monkeypatch):
+    retriever = BaseRetriever(DummyStore(), compact_ratio=0.9)
+    retriever.add_texts(
+        [TextDoc(text=f"other {i}", tags={"file_id": f"o{i}"}) for i in range(50)]
+        + [TextDoc(text=f"doc {i}", tags={"file_id": "doc"}) for i in range(3)]
+    )
+    lexical = retriever.lexical
+    deleted = []
+    monkeypatch.setattr(lexical, "delete", lambda rows: deleted.extend(rows))
+    monkeypatch.setattr(
+        lexical, "live_mask", lambda *a: pytest.fail("replace scanned the corpus")
+    )
+
+    retriever.replace_document("doc", [TextDoc(text="doc 0")])
+
+    assert deleted == [50, 51, 52]
+    assert [d.text for d in lexical.docs[53:]] == ["doc 0"]
+    assert retriever._bitmaps == (None, {})
+
+
+def test_retrieve_batch_matches_single_queries():
+    corpus = [
+        TextDoc(text="alpha beta", tags={"file_id": "f1"}),
+        TextDoc(text="beta gamma beta", tags={"file_id": "f2"}),
+        TextDoc(text="gamma delta", tags={"file_id": "f3"}),
+    ]
+    store = FakeStore(corpus)
+    store.search_batch = lambda queries, top_k=5, search_params=None, filters=None: [
+        store.search(q, top_k) for q in queries
+    ]
+    retriever = BaseRetriever(store, corpus)
+    queries = ["beta", "gamma beta", "missing"]
+
+    for mode in ("semantic", "lexical", "hybrid"):
+        batch = retriever.retrieve_batch(queries, top_k=2, mode=mode)
+        single = [retriever.retrieve(q, top_k=2, mode=mode) for q in queries]
+        assert [[d.text for d in docs] for docs, _ in batch] == [
+            [d.text for d in docs] for docs, _ in single
+        ]
+
+    lexical = retriever._lexical_search_batch(["gamma beta"], top_k=3)[0]
+    expected = retriever.lexical.get_scores(["gamma", "beta"])
+    assert [rd.score for rd in lexical] == sorted(expected, reverse=True)
+
+
+def test_lexical_filter_bitmaps_are_cached_per_corpus():
+    corpus = [
+        TextDoc(text="beta one", tags={"file_id": "f1", "page": 1}),
+        TextDoc(text="beta two", tags={"file_id": "f2", "page": 2}),
+    ]
+    retriever = BaseRetriever(DummyStore(), corpus)
+
+    hits = retriever._lexical_search("beta", 5, {"file_id": "f2"})
+    assert [h.doc.text for h in hits] == ["beta two"]
+    lexical, bitmaps = retriever._bitmaps
+    assert lexical is retriever.lexical and len(bitmaps) == 1
+    hits = retriever._lexical_search("beta", 5, {"file_id": "f2", "page_to": 1})
+    assert hits == []
+    assert len(retriever._bitmaps[1]) == 2
+
+    retriever.add_texts([TextDoc(text="beta three", tags={"file_id": "f2"})])
+    hits = retriever._lexical_search("beta", 5, {"file_id": "f2"})
+    assert {h.doc.text for h in hits} == {"beta two", "beta three"}
+    assert len(retriever._bitmaps[1]['{"file_id": ["f2"]}']) == 3
+
+
+def test_delete_document_tombstones_then_compacts():
+    store = DummyStore()
+    retriever = BaseRetriever(store, compact_ratio=0.5)
+    retriever.add_texts(
+        [TextDoc(text=f"beta {i}", tags={"file_id": f"f{i % 3}"}) for i in range(6)]
+    )
+    lexical = retriever.lexical
+
+    removed = retriever.delete_document("f0")
+
+    assert sorted(removed) == sorted(point_id(f"beta {i}", "f0") for i in (0, 3))
+    assert retriever.lexical is lexical and len(retriever.corpus) == 6
+    assert lexical.live_count == 4
+    assert len(store.texts) == 4
+    # Deletes read the file_id row map, not the query filter cache.
+    assert retriever._bitmaps == (None, {})
+    hits = retriever._lexical_search("beta", top_k=10)
+    assert sorted(h.doc.text for h in hits) == ["beta 1", "beta 2", "beta 4", "beta 5"]
+    assert retriever.delete_document("f0") == []
+
+    retriever.delete_document("f1")
+    deadline = time.monotonic() + 5
+    while retriever.lexical is lexical and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert [c.text for c in retriever.corpus] == ["beta 2", "beta 5"]
+    assert retriever.lexical.dead_count == 0
+
+
+def test_hybrid_retrieve_degrades_when_a_branch_fails_or_times_out():
+    corpus = [TextDoc(text=t) for t in ("alpha beta", "beta gamma", "delta epsilon")]
+    store = FakeStore(corpus)
+    retriever = BaseRetriever(
+        store, corpus, branch_timeouts={"semantic": 0.05, "lexical": 5}
+    )
+    expected = [d.text for d in retriever.retrieve("gamma", top_k=1)[0]]
+
+    def slow_search(*_, **__):
+        time.sleep(1)
+        return []
+
+    store.search = slow_search
+    start = time.monotonic()
+    docs, _ = retriever.retrieve("gamma", top_k=1)
+    assert time.monotonic() - start < 0.5
+    assert [d.text for d in docs] == expected == ["beta gamma"]
+
+    def broken(*_, **__):
+        raise RuntimeError("lexical index unavailable")
+
+    retriever._lexical_search = broken
+    with pytest.raises(TimeoutError):
+        retriever.retrieve("gamma", top_k=1)
+
+
+def test_branch_pool_is_bounded_and_restarts_after_shutdown(monkeypatch):
+    corpus = [TextDoc(text=t) for t in ("alpha beta", "beta gamma")]
+    retriever = BaseRetriever(FakeStore(corpus), corpus)
+    monkeypatch.setenv("RETRIEVAL_BRANCH_WORKERS", "2")
+    base.shutdown_branch_pool()
+
+    assert [d.text for d in retriever.retrieve("gamma", top_k=1)[0]] == ["beta gamma"]
+    pool = base._branch_pool
+    assert pool is not None and pool._max_workers == 2
+
+    base.shutdown_branch_pool()
+    assert base._branch_pool is None
+    assert retriever.retrieve("gamma", top_k=1)[0]
+    assert base._branch_pool is not pool
+    base.shutdown_branch_pool()
+
+
+def test_lexical_results_are_padded_with_zero_score_documents():
+    corpus = [
+        TextDoc(text=t, tags={"file_id": f})
+        for t, f in [("alpha", "a"), ("beta", "b"), ("gamma", "a"), ("delta", "a")]
+    ]
+    retriever = BaseRetriever(DummyStore(), corpus)
+    retriever.delete_document("b")
+
+    (hits,) = retriever._lexical_search_batch(["gamma"], top_k=3)
+    assert [(h.doc.text, h.score) for h in hits][1:] == [
+        ("alpha", 0.0),
+        ("delta", 0.0),
+    ]
+    assert hits[0].doc.text == "gamma" and hits[0].score > 0
+
+    (hits,) = retriever._lexical_search_batch(
+        ["beta"], top_k=5, filters={"file_id": "a"}
+    )
+    assert [h.doc.text for h in hits] == ["alpha", "gamma", "delta"]
+    assert all(h.score == 0 for h in hits)
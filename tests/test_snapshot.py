@@ -0,0 +1,147 @@
+from pathlib import Path
+import hashlib
+import sys
+
+import networkx as nx
+import numpy as np
+import pytest
+
+# Ensure the repository root is on the Python path for module resolution during tests.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import index.embedding_store as es
+from index.local_store import LocalEmbeddingStore
+from index.snapshot import Snapshot, export_collection, import_collection
+from retriever.base import BaseRetriever
+
+
+class FakeModel:
+    """Deterministic pseudo-random embeddings keyed by text."""
+
+    dim = 8
+
+    def __init__(self, *_, **__):
+        self.calls = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _vector(self, text: str) -> np.ndarray:
+        seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+        return np.random.default_rng(seed).normal(size=self.dim).astype(np.float32)
+
+    def encode(self, texts, batch_size: int = 32):
+        self.calls += 1
+        if isinstance(texts, str):
+            return self._vector(texts)
+        return np.stack([self._vector(t) for t in texts])
+
+
+@pytest.fixture(autouse=True)
+def fake_model(monkeypatch):
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+
+
+def _docs(n: int):
+    return [
+        es.TextDoc(
+            text=f"chunk {i} about Alice", tags={"file_id": f"f{i % 3}", "page": i}
+        )
+        for i in range(n)
+    ]
+
+
+def test_local_round_trip_restores_vectors_lexical_corpus_and_graph(tmp_path):
+    source = BaseRetriever(
+        LocalEmbeddingStore(directory=tmp_path / "src"),
+        graph=nx.Graph([("Alice", "Bob")]),
+    )
+    source.add_texts(_docs(10))
+    source.delete_document("f0")
+    path = tmp_path / "snap" / "documents.snap"
+
+    header = export_collection(source.store, path, retriever=source, batch_size=3)
+
+    assert header["count"] == 6
+    assert header["lexical"]["documents"] == 6
+    snapshot = Snapshot(path)
+    assert isinstance(snapshot.vectors, np.memmap)
+    assert snapshot.vectors.shape == (6, FakeModel.dim)
+
+    target_store = LocalEmbeddingStore(directory=tmp_path / "dst")
+    target = BaseRetriever(target_store)
+    calls = target_store.model.calls
+    import_collection(target_store, path, retriever=target, batch_size=4)
+
+    assert target_store.model.calls == calls
+    assert target_store.count() == 6
+    assert target.lexical_ids() == source.lexical_ids()
+    assert set(target.graph.edges) == {("Alice", "Bob")}
+    hit = target_store.search("chunk 4 about Alice", top_k=1)[0]
+    assert hit.payload["tags"] == {"file_id": "f1", "page": 4}
+    assert target_store.add_texts(["chunk 4 about Alice"], [{"file_id": "f1"}]) == []
+
+
+def test_qdrant_export_float16_and_import_into_new_collection(tmp_path):
+    store = es.EmbeddingStore(location=":memory:")
+    store.add_texts([d.text for d in _docs(5)], [d.tags for d in _docs(5)])
+    path = tmp_path / "documents.snap"
+
+    export_collection(store, path, dtype="float16", batch_size=2)
+    other = store.for_collection("restored")
+    header = import_collection(other, path)
+
+    assert header["collection"] == "documents"
+    assert header["sections"]["vectors"]["dtype"] == "float16"
+    assert other.client.count("restored").count == 5
+    hit = other.search("chunk 2 about Alice", top_k=1)[0]
+    assert hit.payload["text"] == "chunk 2 about Alice"
+    assert hit.score == pytest.approx(1.0, abs=1e-3)
+    assert other.add_texts(["chunk 2 about Alice"], [{"file_id": "f2"}]) == []
+
+
+def test_import_rejects_foreign_files_and_dimension_mismatch(tmp_path, monkeypatch):
+    store = LocalEmbeddingStore(directory=tmp_path / "vectors")
+    store.add_texts(["alpha"])
+    path = tmp_path / "documents.snap"
+    export_collection(store, path)
+    (tmp_path / "bogus.snap").write_bytes(b"not a snapshot at all")
+
+    with pytest.raises(ValueError):
+        import_collection(store, tmp_path / "bogus.snap")
+    monkeypatch.setattr(FakeModel, "dim", 4)
+    with pytest.raises(ValueError):
+        import_collection(store.for_collection("small"), path)
+
+
+def test_command_line_records_and_rebuilds_the_persisted_lexical_index(
+    tmp_path, monkeypatch
+):
+    import runpy
+
+    from app.registry import CollectionRegistry
+
+    monkeypatch.setenv("VECTOR_BACKEND", "local")
+    monkeypatch.setenv("LOCAL_INDEX_DIR", str(tmp_path / "vectors"))
+    monkeypatch.setenv("LEXICAL_INDEX_DIR", str(tmp_path / "lexical"))
+    source = CollectionRegistry(
+        None, LocalEmbeddingStore(), lexical_dir=tmp_path / "lexical"
+    ).retriever("src")
+    source.add_texts(_docs(6))
+    source.delete_document("f0")
+    path = tmp_path / "src.snap"
+
+    def run(*argv):
+        monkeypatch.setattr(sys, "argv", ["index.snapshot", *argv])
+        monkeypatch.delitem(sys.modules, "index.snapshot", raising=False)
+        runpy.run_module("index.snapshot", run_name="__main__")
+
+    run("export", "src", str(path))
+    run("import", str(path), "--collection", "dst")
+
+    assert Snapshot(path).lexical_ids() == source.lexical_ids()
+    restored = CollectionRegistry(
+        None, LocalEmbeddingStore(), lexical_dir=tmp_path / "lexical"
+    ).retriever("dst")
+    assert restored.lexical_ids() == source.lexical_ids()
+    assert (tmp_path / "lexical" / "dst").is_dir()
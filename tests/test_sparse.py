@@ -0,0 +1,114 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+
+# Ensure the repository root is on the Python path for module resolution during tests.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import index.embedding_store as es
+from index import sparse
+from index.embedding_store import TextDoc, point_id
+from index.snapshot import Snapshot, export_collection
+from retriever.base import BaseRetriever
+
+
+class FakeModel:
+    def __init__(self, *_, **__):
+        pass
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return 2
+
+    def encode(self, texts, batch_size: int = 32):
+        if isinstance(texts, str):
+            return np.array([float(len(texts)), 1.0])
+        return np.array([[float(len(t)), 1.0] for t in texts])
+
+
+DOCS = [
+    TextDoc(text="alpha beta gamma", tags={"file_id": "f0"}),
+    TextDoc(text="delta epsilon", tags={"file_id": "f1"}),
+    TextDoc(text="beta beta zeta eta theta", tags={"file_id": "f1"}),
+    TextDoc(text="iota kappa", tags={"file_id": "f2"}),
+]
+
+
+@pytest.fixture
+def retriever(monkeypatch):
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    store = es.EmbeddingStore(location=":memory:", sparse_vectors=True)
+    retriever = BaseRetriever(store)
+    retriever.add_texts(DOCS)
+    return retriever
+
+
+def test_document_vector_holds_bm25_term_factors():
+    vector = sparse.document_vector("beta beta zeta")
+    weights = dict(zip(vector.indices, vector.values))
+    norm = sparse.DEFAULT_K1 * (
+        1 - sparse.DEFAULT_B + sparse.DEFAULT_B * 3 / sparse.AVGDL
+    )
+    assert weights[sparse.term_index("beta")] == pytest.approx(
+        2 * (sparse.DEFAULT_K1 + 1) / (2 + norm)
+    )
+    assert vector.indices == sorted(vector.indices)
+    query = sparse.query_vector("beta beta")
+    assert query.indices == [sparse.term_index("beta")] and query.values == [2.0]
+
+
+def test_qdrant_backend_keeps_no_lexical_state(retriever):
+    assert retriever.lexical_backend == "qdrant"
+    assert retriever.corpus == [] and retriever.lexical_ids() == []
+
+    hits = retriever._lexical_search("beta", top_k=5)
+    assert [h.doc.text for h in hits] == [DOCS[2].text, DOCS[0].text]
+    assert hits[0].id == point_id(DOCS[2].text, "f1")
+    filtered = retriever._lexical_search("beta", top_k=5, filters={"file_id": "f0"})
+    assert [h.doc.text for h in filtered] == [DOCS[0].text]
+
+
+def test_hybrid_query_is_fused_by_qdrant(retriever):
+    ((fused, sem, lex),) = retriever._hybrid_search_batch(["iota"], top_k=2)
+    assert lex[0].doc.text == "iota kappa"
+    assert len(sem) == 2
+    assert {h.id for h in fused} <= {h.id for h in sem + lex}
+    assert "iota kappa" in [h.doc.text for h in fused]
+
+    docs, _ = retriever.retrieve("iota", top_k=2)
+    assert [d.text for d in docs] == [h.doc.text for h in fused]
+    batch = retriever.retrieve_batch(["iota", "beta"], top_k=2)
+    assert [d.text for d in batch[0][0]] == [d.text for d in docs]
+
+
+def test_replace_and_delete_update_sparse_vectors(retriever):
+    retriever.replace_document("f0", [TextDoc(text="omega", tags={"file_id": "f0"})])
+    assert [h.doc.text for h in retriever._lexical_search("beta", 5)] == [
+        DOCS[2].text
+    ]
+    assert retriever._lexical_search("omega", 5)[0].doc.text == "omega"
+
+    assert retriever.delete_document("f1") == sorted(
+        point_id(d.text, "f1") for d in DOCS[1:3]
+    )
+    assert retriever._lexical_search("beta", 5) == []
+    assert retriever.delete_document("f1") == []
+
+
+def test_snapshot_of_qdrant_backend_has_no_lexical_section(retriever, tmp_path):
+    header = export_collection(retriever.store, tmp_path / "s.snap", retriever=retriever)
+    assert header["lexical"] is None
+    assert Snapshot(tmp_path / "s.snap").lexical_ids() is None
+
+
+def test_existing_collection_without_sparse_vectors_is_rejected(monkeypatch):
+    monkeypatch.setattr(es, "SentenceTransformer", FakeModel)
+    client = QdrantClient(location=":memory:")
+    store = es.EmbeddingStore(client=client, sparse_vectors=False)
+    assert BaseRetriever(store).lexical_backend == "memory"
+    with pytest.raises(ValueError, match="snapshot"):
+        BaseRetriever(store, lexical_backend="qdrant")
+    with pytest.raises(ValueError, match="snapshot"):
+        es.EmbeddingStore(client=client, sparse_vectors=True)
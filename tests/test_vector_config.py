@@ -0,0 +1,92 @@
+from pathlib import Path
+import sys
+
+import pytest
+from qdrant_client.http import models as rest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from index.vector_config import (
+    VectorConfig,
+    estimate_ram,
+    migrate,
+    resolve_search_params,
+)
+
+
+def test_default_config_keeps_qdrant_defaults():
+    config = VectorConfig()
+    assert config.vector_params(8) == rest.VectorParams(
+        size=8, distance=rest.Distance.COSINE
+    )
+    assert config.hnsw_config() is None
+    assert config.quantization_config() is None
+    assert config.search_params() is None
+
+
+def test_quantized_config_rescores_and_pins_quantized_vectors():
+    config = VectorConfig(quantization="binary", on_disk=True, hnsw_m=32)
+    assert config.vector_params(8).on_disk is True
+    assert config.hnsw_config() == rest.HnswConfigDiff(m=32)
+    assert config.quantization_config().binary.always_ram is True
+    assert config.search_params().quantization.rescore is True
+    with pytest.raises(ValueError):
+        VectorConfig(quantization="product")
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("QDRANT_QUANTIZATION", "Scalar")
+    monkeypatch.setenv("QDRANT_ON_DISK", "true")
+    monkeypatch.setenv("HNSW_EF_CONSTRUCT", "200")
+    assert VectorConfig.from_env() == VectorConfig(
+        quantization="scalar", on_disk=True, hnsw_ef_construct=200
+    )
+
+
+def test_estimate_ram_shrinks_with_quantization_on_disk():
+    before = estimate_ram(1_000_000, 384, VectorConfig())
+    after = estimate_ram(
+        1_000_000, 384, VectorConfig(quantization="scalar", on_disk=True)
+    )
+    assert before["original_bytes"] == 1_000_000 * 384 * 4
+    assert after["original_bytes"] == 0
+    assert after["quantized_bytes"] == 1_000_000 * 384
+    assert after["total_bytes"] < before["total_bytes"] / 2
+
+
+def test_migrate_updates_existing_collection():
+    class Client:
+        def update_collection(self, **kwargs):
+            self.kwargs = kwargs
+
+    client = Client()
+    migrate(client, "docs", VectorConfig(on_disk=True))
+    assert client.kwargs["collection_name"] == "docs"
+    assert client.kwargs["vectors_config"][""].on_disk is True
+    assert client.kwargs["quantization_config"] == rest.Disabled.DISABLED
+
+
+def test_search_params_overrides():
+    plain = VectorConfig()
+    params = plain.search_params(hnsw_ef=64)
+    assert params.hnsw_ef == 64 and not params.exact and params.quantization is None
+    assert plain.search_params(oversampling=2.0) is None
+
+    quantized = VectorConfig(quantization="scalar")
+    params = quantized.search_params(exact=True, oversampling=3.0, rescore=False)
+    assert params.exact is True
+    assert params.quantization == rest.QuantizationSearchParams(
+        rescore=False, oversampling=3.0
+    )
+
+
+def test_resolve_search_params_merges_tier_and_overrides():
+    assert resolve_search_params() is None
+    assert resolve_search_params("exact") == {"exact": True}
+    assert resolve_search_params("fast", {"hnsw_ef": 16, "exact": None}) == {
+        "hnsw_ef": 16,
+        "rescore": False,
+    }
+    assert resolve_search_params(None, {"oversampling": 2.0}) == {"oversampling": 2.0}
+    with pytest.raises(ValueError):
+        resolve_search_params("instant")